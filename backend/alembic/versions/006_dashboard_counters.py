@@ -0,0 +1,43 @@
+"""Add materialized dashboard counters
+
+Revision ID: 006_dashboard_counters
+Revises: 005_expand_rbac_roles
+Create Date: 2026-10-17
+
+Adds dashboard_counters (per-scope running totals) and dashboard_runs_daily
+(per-scope daily run rollup). The backend backfills both tables from the
+source tables on first start.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dashboard_counters',
+        sa.Column('scope', sa.String(64), primary_key=True),
+        sa.Column('workspaces_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('sessions_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('runs_total', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('runs_completed', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('runs_error', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        'dashboard_runs_daily',
+        sa.Column('scope', sa.String(64), primary_key=True),
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('runs_count', sa.Integer, nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dashboard_runs_daily')
+    op.drop_table('dashboard_counters')
@@ -0,0 +1,45 @@
+"""Add import_jobs table
+
+Revision ID: 007_import_jobs
+Revises: 006_dashboard_counters
+Create Date: 2026-10-17
+
+Workspace imports (git clone / local copy) now run as background jobs.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'import_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('source_type', sa.String(50), nullable=False),
+        sa.Column('source_uri', sa.Text, nullable=False),
+        sa.Column('display_name', sa.Text, nullable=False),
+        sa.Column('local_path', sa.Text, nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('progress', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('message', sa.Text, nullable=True),
+        sa.Column('error', sa.Text, nullable=True),
+        sa.Column('workspace_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('workspaces.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+    op.create_index('ix_import_job_status', 'import_jobs', ['status'])
+    op.create_index('ix_import_job_tenant', 'import_jobs', ['tenant_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_import_job_tenant', table_name='import_jobs')
+    op.drop_index('ix_import_job_status', table_name='import_jobs')
+    op.drop_table('import_jobs')
@@ -0,0 +1,28 @@
+"""Add storage_mode to import_jobs
+
+Revision ID: 008_import_storage_mode
+Revises: 007_import_jobs
+Create Date: 2026-10-17
+
+Local imports can be materialised as a copy, reflink clone or hardlink
+farm; the job carries the mode through to the created workspace.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'import_jobs',
+        sa.Column('storage_mode', sa.String(50), nullable=False, server_default='managed_copy'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'storage_mode')
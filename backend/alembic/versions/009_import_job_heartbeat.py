@@ -0,0 +1,27 @@
+"""Add owner and heartbeat_at to import_jobs
+
+Revision ID: 009_import_job_heartbeat
+Revises: 008_import_storage_mode
+Create Date: 2026-10-17
+
+Each replica stamps the jobs it holds; only jobs whose heartbeat has gone
+stale are failed on startup, not ones other live replicas are running.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('owner', sa.String(255), nullable=True))
+    op.add_column('import_jobs', sa.Column('heartbeat_at', sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'heartbeat_at')
+    op.drop_column('import_jobs', 'owner')
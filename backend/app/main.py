@@ -1,17 +1,15 @@
 import asyncio
+import base64
 import json
 import os
 import pathlib
 import re
-import shutil
-import subprocess
 import uuid
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import AsyncIterator, Literal, Optional
+from typing import AsyncIterator, BinaryIO, Literal, Optional
 
-import httpx
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
@@ -20,13 +18,23 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from .database import engine, async_session_maker, Base, get_db
-from .repositories import WorkspaceRepository, SessionRepository, RunRepository, MessageRepository
-from .models import User, Workspace
+from .repositories import WorkspaceRepository, SessionRepository, RunRepository, MessageRepository, ImportJobRepository
+from .models import ImportJob, User, Workspace
 from .auth.router import router as auth_router
 from .auth.security import get_password_hash
 from .auth.dependencies import get_current_user, get_current_user_optional
 from .auth.rbac import tenant_filter, is_super_admin, has_min_role
 from .admin.router import router as admin_router
+from .services.event_sink import event_sink
+from .services.run_hub import run_hubs, format_persisted_event
+from .services.runner_client import runner_clients, ROUTE_TIMEOUTS
+from .services import stats_service
+from .services import git_service
+from .services.git_mirror import git_mirrors
+from .services.import_jobs import import_jobs, job_snapshot
+from .services.workspace_storage import StorageMode, WORKSPACE_STORAGE_MODE, storage_mode_allowed
+from .services import file_service
+from .services.upload_service import UploadStore, UploadKind, UploadSizeLimit
 
 
 WORKSPACES_ROOT = os.environ.get("WORKSPACES_ROOT", "/workspaces")
@@ -63,20 +71,11 @@ async def scan_and_import_existing_workspaces():
                 continue
             
             # Try to get git remote URL
-            try:
-                result = subprocess.run(
-                    ["git", "remote", "get-url", "origin"],
-                    cwd=str(repo_path),
-                    capture_output=True,
-                    text=True
-                )
-                if result.returncode == 0:
-                    source_uri = result.stdout.strip()
-                    source_type = "github" if "github.com" in source_uri else "local"
-                else:
-                    source_uri = str(repo_path)
-                    source_type = "local"
-            except Exception:
+            git_remote = await git_service.get_remote_url(str(repo_path))
+            if git_remote:
+                source_uri = git_remote
+                source_type = "github" if "github.com" in source_uri else "local"
+            else:
                 source_uri = str(repo_path)
                 source_type = "local"
             
@@ -187,13 +186,49 @@ async def lifespan(app: FastAPI):
     # Create initial admin user
     await create_initial_admin()
     
+    # Backfill dashboard counters on first start (before any new rows are counted)
+    async with async_session_maker() as db:
+        await stats_service.ensure_counters(db)
+    
     # Scan and import existing workspaces
     await scan_and_import_existing_workspaces()
     
+    # Start the write-behind run event writer
+    event_sink.start()
+    
+    # Background workspace import workers and git mirror refresh
+    await import_jobs.start()
+    git_mirrors.start()
+    
+    # Pooled keep-alive clients for runner traffic
+    runner_clients.open([RUNNER_CODEX_URL, RUNNER_CLAUDE_URL])
+    
     yield
+    
+    await import_jobs.stop()
+    await git_mirrors.stop()
+    await run_hubs.close_all()
+    await event_sink.stop()
+    await runner_clients.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
+# Added before CORS so its 413s still carry CORS headers
+app.add_middleware(
+    UploadSizeLimit,
+    limits=[
+        (
+            r"/api/workspaces/upload$",
+            file_service.MAX_UPLOAD_SIZE,
+            f"Upload too large. Maximum size: {file_service.MAX_UPLOAD_SIZE // 1024 // 1024 // 1024}GB"
+        ),
+        (
+            r"/api/workspaces/[^/]+/files/upload$",
+            file_service.MAX_SINGLE_FILE_UPLOAD,
+            f"File too large. Maximum size: {file_service.MAX_SINGLE_FILE_UPLOAD // 1024 // 1024}MB"
+        ),
+    ]
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -215,6 +250,21 @@ class ImportWorkspaceRequest(BaseModel):
     source_type: SourceType
     source_uri: str
     display_name: Optional[str] = None
+    storage_mode: Optional[StorageMode] = None  # local imports only; defaults to WORKSPACE_STORAGE_MODE
+
+
+class ImportJobResponse(BaseModel):
+    job_id: str
+    status: str
+    progress: int
+    message: Optional[str] = None
+    error: Optional[str] = None
+    workspace_id: Optional[str] = None
+    source_type: str
+    source_uri: str
+    display_name: str
+    created_at: str
+    finished_at: Optional[str] = None
 
 
 class WorkspaceResponse(BaseModel):
@@ -224,6 +274,8 @@ class WorkspaceResponse(BaseModel):
     source_uri: str
     local_path: str
     created_at: str
+    storage_mode: Optional[str] = None
+    import_stats: Optional[dict] = None  # seconds, bytes_written, ... of the initial import
 
 
 class WorkspaceListResponse(BaseModel):
@@ -260,10 +312,13 @@ class SessionResponse(BaseModel):
     thread_id: str
     created_at: str
     run_count: int = 0
+    last_run_status: Optional[str] = None
+    last_run_at: Optional[str] = None
 
 
 class SessionListResponse(BaseModel):
     items: list[SessionResponse]
+    next_cursor: Optional[str] = None
 
 
 class CreateSessionResponse(BaseModel):
@@ -276,6 +331,8 @@ class CreateSessionResponse(BaseModel):
 
 class PromptRequest(BaseModel):
     prompt: str
+    # Ask the runner for one assistant delta event per model token instead of coalesced ones
+    token_streaming: bool = False
 
 
 class PromptResponse(BaseModel):
@@ -360,74 +417,138 @@ def _format_datetime(dt: datetime) -> str:
     return dt.isoformat().replace("+00:00", "Z")
 
 
+def _encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.get("/health")
 async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
-@app.post("/api/workspaces/import", response_model=WorkspaceResponse)
+@app.get("/api/metrics")
+async def get_metrics() -> dict:
+    """In-process performance metrics for the backend."""
+    return {
+        "event_sink": event_sink.stats(),
+        "run_hub": run_hubs.stats(),
+        "runner_pool": runner_clients.stats(),
+        "import_jobs": import_jobs.stats(),
+        "git_mirrors": git_mirrors.stats(),
+    }
+
+
+@app.post("/api/workspaces/import", response_model=ImportJobResponse, status_code=202)
 async def import_workspace(
     req: ImportWorkspaceRequest,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
-) -> WorkspaceResponse:
+) -> ImportJobResponse:
+    """Queue a clone/copy and return the import job; follow it via /api/workspaces/import-jobs/{id}."""
     repo = WorkspaceRepository(db)
     
     existing = await repo.get_by_source(req.source_type, req.source_uri)
     if existing:
         await repo.update_last_accessed(existing.id)
-        return WorkspaceResponse(
-            workspace_id=str(existing.id),
-            display_name=existing.display_name,
+        job = await ImportJobRepository(db).create(
             source_type=existing.source_type,
             source_uri=existing.source_uri,
+            display_name=existing.display_name,
             local_path=existing.local_path,
-            created_at=_format_datetime(existing.created_at)
+            tenant_id=user.tenant_id if user else None,
+            status="completed",
+            workspace_id=existing.id
         )
+        return _import_job_response(job)
 
-    workspace_id = str(uuid.uuid4())
-    display_name = req.display_name or _derive_display_name(req.source_type, req.source_uri)
-    local_path = _workspace_dir_for_id(workspace_id)
-    local_path = _ensure_under_workspaces_root(local_path)
-
-    parent = pathlib.Path(local_path).parent
-    parent.mkdir(parents=True, exist_ok=True)
-
-    if req.source_type == "github":
-        result = subprocess.run(
-            ["git", "clone", "--depth", "1", req.source_uri, local_path],
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode != 0:
-            raise HTTPException(status_code=400, detail=f"git clone failed: {result.stderr.strip()}")
-    elif req.source_type == "local":
+    storage_mode = "managed_copy"
+    if req.source_type == "local":
         source_path = pathlib.Path(req.source_uri)
         if not source_path.exists():
             raise HTTPException(status_code=400, detail=f"Source path does not exist: {req.source_uri}")
-        if source_path.is_dir():
-            shutil.copytree(str(source_path), local_path)
-        else:
+        if not source_path.is_dir():
             raise HTTPException(status_code=400, detail="Source path must be a directory")
+        if req.storage_mode and not storage_mode_allowed(req.storage_mode):
+            raise HTTPException(
+                status_code=403,
+                detail=f"storage_mode '{req.storage_mode}' can only be enabled by the server (WORKSPACE_STORAGE_MODE)"
+            )
+        storage_mode = req.storage_mode or WORKSPACE_STORAGE_MODE
 
-    workspace = await repo.create(
+    workspace_id = str(uuid.uuid4())
+    display_name = req.display_name or _derive_display_name(req.source_type, req.source_uri)
+    local_path = _workspace_dir_for_id(workspace_id)
+    local_path = _ensure_under_workspaces_root(local_path)
+
+    job = await import_jobs.submit(
         source_type=req.source_type,
         source_uri=req.source_uri,
         display_name=display_name,
         local_path=local_path,
-        tenant_id=user.tenant_id if user else None,
+        storage_mode=storage_mode,
+        tenant_id=user.tenant_id if user else None
     )
-
-    return WorkspaceResponse(
-        workspace_id=str(workspace.id),
-        display_name=workspace.display_name,
-        source_type=workspace.source_type,
-        source_uri=workspace.source_uri,
-        local_path=workspace.local_path,
-        created_at=_format_datetime(workspace.created_at)
+    return _import_job_response(job)
+
+
+def _import_job_response(job: ImportJob) -> ImportJobResponse:
+    snapshot = import_jobs.live_snapshot(job.id) or job_snapshot(job)
+    return ImportJobResponse(
+        **snapshot,
+        source_type=job.source_type,
+        source_uri=job.source_uri,
+        display_name=job.display_name,
+        created_at=_format_datetime(job.created_at),
+        finished_at=_format_datetime(job.finished_at) if job.finished_at else None
     )
 
 
+async def _get_import_job(job_id: str, db: AsyncSession) -> ImportJob:
+    if not _is_valid_uuid(job_id):
+        raise HTTPException(status_code=404, detail="Import job not found")
+    job = await ImportJobRepository(db).get_by_id(uuid.UUID(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@app.get("/api/workspaces/import-jobs/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(job_id: str, db: AsyncSession = Depends(get_db)) -> ImportJobResponse:
+    return _import_job_response(await _get_import_job(job_id, db))
+
+
+@app.get("/api/workspaces/import-jobs/{job_id}/events")
+async def import_job_events(job_id: str, db: AsyncSession = Depends(get_db)):
+    """SSE stream of import progress; ends once the job completes, fails or is cancelled."""
+    job = await _get_import_job(job_id, db)
+
+    async def gen() -> AsyncIterator[bytes]:
+        async for event in import_jobs.subscribe(job):
+            yield f"data: {json.dumps(event)}\n\n".encode("utf-8")
+
+    return StreamingResponse(gen(), media_type="text/event-stream")
+
+
+@app.post("/api/workspaces/import-jobs/{job_id}/cancel", response_model=ImportJobResponse)
+async def cancel_import_job(job_id: str, db: AsyncSession = Depends(get_db)) -> ImportJobResponse:
+    job = await _get_import_job(job_id, db)
+    if not await import_jobs.cancel(job.id):
+        raise HTTPException(status_code=409, detail=f"Import job already {job.status}")
+    # A running job finishes cancelling in its worker; report the latest state
+    await db.refresh(job)
+    return _import_job_response(job)
+
+
 @app.get("/api/workspaces/scan", response_model=ScanWorkspacesResponse)
 async def scan_workspaces(db: AsyncSession = Depends(get_db)) -> ScanWorkspacesResponse:
     """Scan /workspaces for unregistered folders."""
@@ -460,18 +581,9 @@ async def scan_workspaces(db: AsyncSession = Depends(get_db)) -> ScanWorkspacesR
         suggested_name = folder.name
         
         if has_git:
-            try:
-                result = subprocess.run(
-                    ["git", "remote", "get-url", "origin"],
-                    cwd=str(repo_path),
-                    capture_output=True,
-                    text=True
-                )
-                if result.returncode == 0:
-                    git_remote = result.stdout.strip()
-                    suggested_name = _derive_display_name("github", git_remote)
-            except Exception:
-                pass
+            git_remote = await git_service.get_remote_url(path_str)
+            if git_remote:
+                suggested_name = _derive_display_name("github", git_remote)
         
         discovered.append(DiscoveredFolder(
             folder_name=folder.name,
@@ -520,18 +632,9 @@ async def import_local_workspace(
     source_type = "local"
     
     if has_git:
-        try:
-            result = subprocess.run(
-                ["git", "remote", "get-url", "origin"],
-                cwd=str(folder_path),
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                git_remote = result.stdout.strip()
-                source_type = "github" if "github.com" in git_remote else "local"
-        except Exception:
-            pass
+        git_remote = await git_service.get_remote_url(str(folder_path))
+        if git_remote:
+            source_type = "github" if "github.com" in git_remote else "local"
     
     source_uri = git_remote or local_path
     display_name = req.display_name or (
@@ -576,7 +679,9 @@ async def list_workspaces(
             source_type=ws.source_type,
             source_uri=ws.source_uri,
             local_path=ws.local_path,
-            created_at=_format_datetime(ws.created_at)
+            created_at=_format_datetime(ws.created_at),
+            storage_mode=ws.storage_mode,
+            import_stats=(ws.metadata_json or {}).get("import")
         )
         for ws in workspaces
         if pathlib.Path(ws.local_path).exists()
@@ -599,7 +704,9 @@ async def get_workspace(
         source_type=ws.source_type,
         source_uri=ws.source_uri,
         local_path=ws.local_path,
-        created_at=_format_datetime(ws.created_at)
+        created_at=_format_datetime(ws.created_at),
+        storage_mode=ws.storage_mode,
+        import_stats=(ws.metadata_json or {}).get("import")
     )
 
 
@@ -628,6 +735,8 @@ async def delete_workspace(
 @app.get("/api/workspaces/{workspace_id}/sessions", response_model=SessionListResponse)
 async def list_workspace_sessions(
     workspace_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ) -> SessionListResponse:
     ws_repo = WorkspaceRepository(db)
@@ -636,22 +745,32 @@ async def list_workspace_sessions(
         raise HTTPException(status_code=404, detail="Workspace not found")
     
     session_repo = SessionRepository(db)
-    run_repo = RunRepository(db)
-    sessions = await session_repo.list_by_workspace(uuid.UUID(workspace_id))
+    rows = await session_repo.list_by_workspace_with_run_stats(
+        uuid.UUID(workspace_id),
+        limit=limit,
+        before=_decode_cursor(cursor) if cursor else None
+    )
     
-    items = []
-    for s in sessions:
-        runs = await run_repo.list_by_session(s.id)
-        items.append(SessionResponse(
+    items = [
+        SessionResponse(
             session_id=str(s.id),
             workspace_id=str(s.workspace_id),
             runner_type=s.runner_type,
             thread_id=s.runner_thread_id,
             created_at=_format_datetime(s.created_at),
-            run_count=len(runs)
-        ))
+            run_count=run_count,
+            last_run_status=last_run_status,
+            last_run_at=_format_datetime(last_run_at) if last_run_at else None
+        )
+        for s, run_count, last_run_status, last_run_at in rows
+    ]
+    
+    next_cursor = None
+    if limit and len(rows) == limit:
+        last_session = rows[-1][0]
+        next_cursor = _encode_cursor(last_session.created_at, last_session.id)
     
-    return SessionListResponse(items=items)
+    return SessionListResponse(items=items, next_cursor=next_cursor)
 
 
 @app.post("/api/sessions", response_model=CreateSessionResponse)
@@ -680,13 +799,10 @@ async def create_session(
         parent = pathlib.Path(repo_path).parent
         parent.mkdir(parents=True, exist_ok=True)
 
-        result = subprocess.run(
-            ["git", "clone", "--depth", "1", req.repo_url, repo_path],
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode != 0:
-            raise HTTPException(status_code=400, detail=f"git clone failed: {result.stderr.strip()}")
+        try:
+            await git_mirrors.clone(req.repo_url, repo_path)
+        except git_service.GitError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         workspace = await ws_repo.create(
             source_type="github",
@@ -699,16 +815,15 @@ async def create_session(
     else:
         raise HTTPException(status_code=400, detail="Either workspace_id or repo_url is required")
 
-    runner_url = _get_runner_url(req.runner_type)
-
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.post(
-            f"{runner_url}/threads",
-            json={"workingDirectory": repo_path, "skipGitRepoCheck": True},
-        )
-        if r.status_code >= 400:
-            raise HTTPException(status_code=502, detail=f"runner error: {r.text}")
-        data = r.json()
+    client = runner_clients.get(_get_runner_url(req.runner_type))
+    r = await client.post(
+        "/threads",
+        json={"workingDirectory": repo_path, "skipGitRepoCheck": True},
+        timeout=ROUTE_TIMEOUTS["threads"],
+    )
+    if r.status_code >= 400:
+        raise HTTPException(status_code=502, detail=f"runner error: {r.text}")
+    data = r.json()
 
     thread_id = data.get("threadId")
     if not thread_id:
@@ -743,7 +858,7 @@ async def get_session(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    runs = await run_repo.list_by_session(session.id)
+    run_count = await run_repo.count_by_session(session.id)
     
     return SessionResponse(
         session_id=str(session.id),
@@ -751,7 +866,7 @@ async def get_session(
         runner_type=session.runner_type,
         thread_id=session.runner_thread_id,
         created_at=_format_datetime(session.created_at),
-        run_count=len(runs)
+        run_count=run_count
     )
 
 
@@ -798,48 +913,62 @@ async def prompt(
     if not session:
         raise HTTPException(status_code=404, detail="session not found")
 
-    runner_type = session.runner_type
-    runner_url = _get_runner_url(runner_type)
+    client = runner_clients.get(_get_runner_url(session.runner_type))
     thread_id = session.runner_thread_id
-
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.post(
-            f"{runner_url}/runs",
-            json={"threadId": thread_id, "prompt": req.prompt},
+    run_body = {
+        "threadId": thread_id,
+        "prompt": req.prompt,
+        "tenantId": str(session.tenant_id) if session.tenant_id else None,
+        "tokenStreaming": req.token_streaming,
+    }
+
+    r = await client.post(
+        "/runs",
+        json=run_body,
+        timeout=ROUTE_TIMEOUTS["runs"],
+    )
+    
+    # If thread not found (404), try to recreate it
+    if r.status_code == 404 and "thread not found" in r.text.lower():
+        # Get workspace path for thread recreation
+        workspace = await ws_repo.get_by_id(session.workspace_id) if session.workspace_id else None
+        if not workspace:
+            raise HTTPException(status_code=502, detail="Session thread expired and workspace not found for recovery")
+        
+        # Recreate thread
+        thread_r = await client.post(
+            "/threads",
+            json={"workingDirectory": workspace.local_path, "skipGitRepoCheck": False},
+            timeout=ROUTE_TIMEOUTS["threads"],
         )
+        if thread_r.status_code >= 400:
+            raise HTTPException(status_code=502, detail=f"Failed to recreate thread: {thread_r.text}")
         
-        # If thread not found (404), try to recreate it
-        if r.status_code == 404 and "thread not found" in r.text.lower():
-            # Get workspace path for thread recreation
-            workspace = await ws_repo.get_by_id(session.workspace_id) if session.workspace_id else None
-            if not workspace:
-                raise HTTPException(status_code=502, detail="Session thread expired and workspace not found for recovery")
-            
-            # Recreate thread
-            thread_r = await client.post(
-                f"{runner_url}/threads",
-                json={"workingDirectory": workspace.local_path, "skipGitRepoCheck": False},
-            )
-            if thread_r.status_code >= 400:
-                raise HTTPException(status_code=502, detail=f"Failed to recreate thread: {thread_r.text}")
-            
-            new_thread_id = thread_r.json().get("threadId")
-            if not new_thread_id:
-                raise HTTPException(status_code=502, detail="Runner did not return threadId on recovery")
-            
-            # Update session with new thread ID
-            await session_repo.update_thread_id(session.id, new_thread_id)
-            thread_id = new_thread_id
-            
-            # Retry the run with new thread
-            r = await client.post(
-                f"{runner_url}/runs",
-                json={"threadId": thread_id, "prompt": req.prompt},
-            )
+        new_thread_id = thread_r.json().get("threadId")
+        if not new_thread_id:
+            raise HTTPException(status_code=502, detail="Runner did not return threadId on recovery")
+        
+        # Update session with new thread ID
+        await session_repo.update_thread_id(session.id, new_thread_id)
+        thread_id = new_thread_id
         
-        if r.status_code >= 400:
-            raise HTTPException(status_code=502, detail=f"runner error: {r.text}")
-        data = r.json()
+        # Retry the run with new thread
+        r = await client.post(
+            "/runs",
+            json={**run_body, "threadId": thread_id},
+            timeout=ROUTE_TIMEOUTS["runs"],
+        )
+    
+    if r.status_code == 429:
+        # Runner queue is full: pass the backpressure on to the client
+        raise HTTPException(
+            status_code=429,
+            detail="Runner is at capacity, please retry shortly",
+            headers={"Retry-After": r.headers.get("Retry-After", "5")}
+        )
+    if r.status_code >= 400:
+        raise HTTPException(status_code=502, detail=f"runner error: {r.text}")
+    data = r.json()
 
     runner_run_id = data.get("runId")
     if not runner_run_id:
@@ -848,7 +977,8 @@ async def prompt(
     run = await run_repo.create(
         session_id=session.id,
         runner_run_id=runner_run_id,
-        prompt=req.prompt
+        prompt=req.prompt,
+        tenant_id=session.tenant_id
     )
 
     return PromptResponse(run_id=str(run.id))
@@ -970,6 +1100,7 @@ async def get_run_transcript(
 @app.get("/api/runs/{run_id}/events")
 async def run_events(
     run_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
     db: AsyncSession = Depends(get_db)
 ) -> StreamingResponse:
     run_repo = RunRepository(db)
@@ -979,64 +1110,46 @@ async def run_events(
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
+    # Event ids are RunEvent.seq values; resume after the last one the client saw
+    after_seq: Optional[int] = None
+    if last_event_id and last_event_id.strip().isdigit():
+        after_seq = int(last_event_id.strip())
+    
+    if run.status != "running":
+        # Finished runs are replayed from the database without contacting the runner
+        events = await run_repo.get_events_after(run.id, after_seq if after_seq is not None else -1)
+        status = run.status
+        
+        async def replay() -> AsyncIterator[bytes]:
+            yield b": connected\n\n"
+            for e in events:
+                yield format_persisted_event(e.seq, e.raw_json)
+            closed = {"type": "stream.closed", "runId": run_id, "status": status}
+            yield f"data: {json.dumps(closed)}\n\n".encode("utf-8")
+        
+        return StreamingResponse(
+            replay(),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache, no-transform",
+                "Connection": "keep-alive",
+                "X-Accel-Buffering": "no",
+            },
+        )
+    
     session = await session_repo.get_by_id(run.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    runner_type = session.runner_type
-    runner_url = _get_runner_url(runner_type)
-    runner_run_id = run.runner_run_id
+    runner_url = _get_runner_url(session.runner_type)
+
+    # All viewers of this run share one upstream connection to the runner
+    hub = await run_hubs.get_or_create(run.id, runner_url, f"/runs/{run.runner_run_id}/events")
 
     async def stream() -> AsyncIterator[bytes]:
         yield b": connected\n\n"
-        seq = 0
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream(
-                "GET",
-                f"{runner_url}/runs/{runner_run_id}/events",
-                headers={"Accept": "text/event-stream"},
-            ) as r:
-                if r.status_code >= 400:
-                    yield f"data: {{\"type\":\"error\",\"message\":{r.text!r}}}\n\n".encode("utf-8")
-                    return
-                
-                buffer = ""
-                async for chunk in r.aiter_text():
-                    buffer += chunk
-                    while "\n\n" in buffer:
-                        event_str, buffer = buffer.split("\n\n", 1)
-                        yield (event_str + "\n\n").encode("utf-8")
-                        
-                        for line in event_str.split("\n"):
-                            if line.startswith("data: "):
-                                try:
-                                    event_data = json.loads(line[6:])
-                                    event_type = event_data.get("type")
-                                    
-                                    async with async_session_maker() as event_db:
-                                        event_run_repo = RunRepository(event_db)
-                                        await event_run_repo.add_event(
-                                            run_id=run.id,
-                                            seq=seq,
-                                            event_type=event_type,
-                                            raw_json=event_data
-                                        )
-                                        seq += 1
-                                        
-                                        if event_type in ("run.completed", "stream.closed"):
-                                            await event_run_repo.update_status(
-                                                run.id,
-                                                "completed",
-                                                datetime.now(timezone.utc)
-                                            )
-                                        elif event_type == "error":
-                                            await event_run_repo.update_status(
-                                                run.id,
-                                                "error",
-                                                datetime.now(timezone.utc)
-                                            )
-                                except json.JSONDecodeError:
-                                    pass
+        async for chunk in hub.stream(after_seq):
+            yield chunk
 
     return StreamingResponse(
         stream(),
@@ -1141,57 +1254,17 @@ class SystemHealthResponse(BaseModel):
 
 
 @app.get("/api/stats/dashboard", response_model=DashboardStatsResponse)
-async def get_dashboard_stats(db: AsyncSession = Depends(get_db)) -> DashboardStatsResponse:
-    """Get aggregated dashboard statistics."""
-    from sqlalchemy import select, func
-    from .models import Workspace, Session, Run
-    
-    # Count workspaces (only those with existing folders)
-    workspaces_result = await db.execute(select(Workspace))
-    all_workspaces = workspaces_result.scalars().all()
-    workspaces_count = sum(1 for ws in all_workspaces if pathlib.Path(ws.local_path).exists())
-    
-    # Count sessions
-    sessions_result = await db.execute(select(func.count(Session.id)))
-    sessions_count = sessions_result.scalar() or 0
-    
-    # Count runs today
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    runs_today_result = await db.execute(
-        select(func.count(Run.id)).where(Run.created_at >= today_start)
-    )
-    runs_today = runs_today_result.scalar() or 0
-    
-    # Count total runs
-    runs_total_result = await db.execute(select(func.count(Run.id)))
-    runs_total = runs_total_result.scalar() or 0
-    
-    # Recent activity (last 10 runs)
-    recent_runs_result = await db.execute(
-        select(Run, Session, Workspace)
-        .join(Session, Run.session_id == Session.id)
-        .join(Workspace, Session.workspace_id == Workspace.id)
-        .order_by(Run.created_at.desc())
-        .limit(10)
-    )
-    recent_activity = []
-    for run, session, workspace in recent_runs_result.all():
-        recent_activity.append({
-            "type": "run",
-            "status": run.status,
-            "workspace_name": workspace.display_name,
-            "runner_type": session.runner_type,
-            "prompt_preview": run.prompt[:50] + "..." if len(run.prompt) > 50 else run.prompt,
-            "created_at": _format_datetime(run.created_at)
-        })
-    
-    return DashboardStatsResponse(
-        workspaces_count=workspaces_count,
-        sessions_count=sessions_count,
-        runs_today=runs_today,
-        runs_total=runs_total,
-        recent_activity=recent_activity
-    )
+async def get_dashboard_stats(
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user_optional),
+) -> DashboardStatsResponse:
+    """Get aggregated dashboard statistics from the materialized counters."""
+    snapshot = await stats_service.get_dashboard_snapshot(db, user)
+    recent_activity = [
+        {**activity, "created_at": _format_datetime(activity["created_at"])}
+        for activity in snapshot["recent_activity"]
+    ]
+    return DashboardStatsResponse(**{**snapshot, "recent_activity": recent_activity})
 
 
 @app.get("/api/health/services", response_model=SystemHealthResponse)
@@ -1202,13 +1275,12 @@ async def get_system_health(db: AsyncSession = Depends(get_db)) -> SystemHealthR
     async def check_service(name: str, url: str) -> ServiceHealthResponse:
         try:
             start = datetime.now()
-            async with httpx.AsyncClient(timeout=5) as client:
-                r = await client.get(f"{url}/health")
-                latency = int((datetime.now() - start).total_seconds() * 1000)
-                if r.status_code == 200:
-                    return ServiceHealthResponse(service=name, status="healthy", latency_ms=latency)
-                else:
-                    return ServiceHealthResponse(service=name, status="unhealthy", latency_ms=latency)
+            r = await runner_clients.get(url).get("/health", timeout=ROUTE_TIMEOUTS["health"])
+            latency = int((datetime.now() - start).total_seconds() * 1000)
+            if r.status_code == 200:
+                return ServiceHealthResponse(service=name, status="healthy", latency_ms=latency)
+            else:
+                return ServiceHealthResponse(service=name, status="unhealthy", latency_ms=latency)
         except Exception:
             return ServiceHealthResponse(service=name, status="unreachable", latency_ms=None)
     
@@ -1235,9 +1307,8 @@ async def get_system_health(db: AsyncSession = Depends(get_db)) -> SystemHealthR
 # v0.5.0 File Operations API
 # ─────────────────────────────────────────────────────────────────────────────
 
-from fastapi import File, UploadFile, Form
+from fastapi import File, UploadFile, Form, Request
 from fastapi.responses import FileResponse
-from .services import file_service
 
 
 class FileInfo(BaseModel):
@@ -1330,18 +1401,20 @@ async def download_workspace_file(
 async def download_workspace_folder_zip(
     workspace_id: str,
     path: str = "/",
+    compression: file_service.ZipCompression = "deflate",
+    level: int = Query(6, ge=0, le=9),
     db: AsyncSession = Depends(get_db)
 ) -> StreamingResponse:
-    """Download a folder as a ZIP archive."""
+    """Download a folder as a ZIP archive, streamed as it is compressed."""
     ws_repo = WorkspaceRepository(db)
     ws = await ws_repo.get_by_id(uuid.UUID(workspace_id))
     if not ws:
         raise HTTPException(status_code=404, detail="Workspace not found")
     
-    buffer, filename = file_service.create_zip_from_directory(ws.local_path, path)
+    chunks, filename = file_service.stream_zip_from_directory(ws.local_path, path, compression, level)
     
     return StreamingResponse(
-        buffer,
+        chunks,
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
@@ -1360,42 +1433,27 @@ async def upload_file_to_workspace(
     if not ws:
         raise HTTPException(status_code=404, detail="Workspace not found")
     
-    content = await file.read()
-    result = file_service.save_uploaded_file(ws.local_path, path, file.filename, content)
+    # Stream from the spooled upload instead of reading it into memory
+    result = await asyncio.to_thread(
+        file_service.save_uploaded_file, ws.local_path, path, file.filename, file.file
+    )
     
     return FileInfo(**result)
 
 
-@app.post("/api/workspaces/upload", response_model=WorkspaceResponse)
-async def upload_workspace(
-    file: UploadFile = File(...),
-    display_name: str = Form(...),
-    db: AsyncSession = Depends(get_db)
+async def _create_uploaded_workspace(
+    source: BinaryIO,
+    display_name: str,
+    db: AsyncSession
 ) -> WorkspaceResponse:
-    """
-    Upload a zipped folder as a new workspace.
-    
-    - Maximum size: 1GB
-    - Extracts to /workspaces/{workspace_id}/repo/
-    - Registers with source_type="upload"
-    """
-    # Read file content
-    content = await file.read()
-    
-    # Validate size
-    if len(content) > file_service.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=413,
-            detail=f"Upload too large. Maximum size: {file_service.MAX_UPLOAD_SIZE // 1024 // 1024 // 1024}GB"
-        )
-    
+    """Extract an uploaded ZIP into a new workspace and register it."""
     # Generate workspace ID and path
     workspace_id = str(uuid.uuid4())
     local_path = _workspace_dir_for_id(workspace_id)
     local_path = _ensure_under_workspaces_root(local_path)
     
-    # Extract ZIP
-    file_count = file_service.extract_uploaded_workspace(content, local_path)
+    # Extract ZIP off the event loop
+    await asyncio.to_thread(file_service.extract_uploaded_workspace, source, local_path)
     
     # Create workspace record
     repo = WorkspaceRepository(db)
@@ -1416,3 +1474,124 @@ async def upload_workspace(
         local_path=workspace.local_path,
         created_at=_format_datetime(workspace.created_at)
     )
+
+
+@app.post("/api/workspaces/upload", response_model=WorkspaceResponse)
+async def upload_workspace(
+    file: UploadFile = File(...),
+    display_name: str = Form(...),
+    db: AsyncSession = Depends(get_db)
+) -> WorkspaceResponse:
+    """
+    Upload a zipped folder as a new workspace.
+    
+    - Maximum size: 1GB
+    - Extracts to /workspaces/{workspace_id}/repo/
+    - Registers with source_type="upload"
+    """
+    # Validate size before touching the content
+    if file.size is not None and file.size > file_service.MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload too large. Maximum size: {file_service.MAX_UPLOAD_SIZE // 1024 // 1024 // 1024}GB"
+        )
+    
+    return await _create_uploaded_workspace(file.file, display_name, db)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Resumable Chunked Uploads API
+# ─────────────────────────────────────────────────────────────────────────────
+
+upload_store = UploadStore(WORKSPACES_ROOT)
+
+
+class CreateUploadRequest(BaseModel):
+    filename: str
+    total_size: int
+    kind: UploadKind = "workspace"
+
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    filename: str
+    kind: str
+    total_size: int
+    offset: int
+
+
+class CompleteWorkspaceUploadRequest(BaseModel):
+    display_name: str
+
+
+class CompleteFileUploadRequest(BaseModel):
+    workspace_id: str
+    path: str = "/"
+
+
+@app.post("/api/uploads", response_model=UploadSessionResponse)
+async def create_upload(req: CreateUploadRequest) -> UploadSessionResponse:
+    """Open a resumable upload session."""
+    if req.total_size <= 0:
+        raise HTTPException(status_code=400, detail="total_size must be positive")
+    upload = upload_store.create(req.filename, req.total_size, req.kind)
+    return UploadSessionResponse(**upload)
+
+
+@app.get("/api/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload(upload_id: str) -> UploadSessionResponse:
+    """Get the current offset of an upload, to resume after an interruption."""
+    return UploadSessionResponse(**upload_store.get(upload_id))
+
+
+@app.put("/api/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def append_upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+) -> UploadSessionResponse:
+    """Append the request body at `Upload-Offset`. Returns the new offset."""
+    upload = await upload_store.append(upload_id, upload_offset, request.stream())
+    return UploadSessionResponse(**upload)
+
+
+@app.delete("/api/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    upload_store.get(upload_id)
+    upload_store.discard(upload_id)
+    return {"status": "deleted", "upload_id": upload_id}
+
+
+@app.post("/api/uploads/{upload_id}/workspace", response_model=WorkspaceResponse)
+async def complete_workspace_upload(
+    upload_id: str,
+    req: CompleteWorkspaceUploadRequest,
+    db: AsyncSession = Depends(get_db)
+) -> WorkspaceResponse:
+    """Extract a completed ZIP upload into a new workspace."""
+    _, part_path = upload_store.open_completed(upload_id, "workspace")
+    with open(part_path, "rb") as source:
+        response = await _create_uploaded_workspace(source, req.display_name, db)
+    upload_store.discard(upload_id)
+    return response
+
+
+@app.post("/api/uploads/{upload_id}/file", response_model=FileInfo)
+async def complete_file_upload(
+    upload_id: str,
+    req: CompleteFileUploadRequest,
+    db: AsyncSession = Depends(get_db)
+) -> FileInfo:
+    """Save a completed single-file upload into a workspace directory."""
+    ws_repo = WorkspaceRepository(db)
+    ws = await ws_repo.get_by_id(uuid.UUID(req.workspace_id))
+    if not ws:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+    
+    upload, part_path = upload_store.open_completed(upload_id, "file")
+    with open(part_path, "rb") as source:
+        result = await asyncio.to_thread(
+            file_service.save_uploaded_file, ws.local_path, req.path, upload["filename"], source
+        )
+    upload_store.discard(upload_id)
+    return FileInfo(**result)
@@ -1,8 +1,8 @@
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 
-from sqlalchemy import String, Text, ForeignKey, Index, UniqueConstraint
+from sqlalchemy import Date, String, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -21,7 +21,7 @@ class Workspace(Base):
     owner_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     source_type: Mapped[str] = mapped_column(String(50), nullable=False)  # github, local, upload
     source_uri: Mapped[str] = mapped_column(Text, nullable=False)
-    storage_mode: Mapped[str] = mapped_column(String(50), nullable=False, default="managed_copy")
+    storage_mode: Mapped[str] = mapped_column(String(50), nullable=False, default="managed_copy")  # managed_copy, reflink, hardlink
     display_name: Mapped[str] = mapped_column(Text, nullable=False)
     local_path: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, default=utcnow)
@@ -114,6 +114,57 @@ class Message(Base):
     )
 
 
+class ImportJob(Base):
+    """Background workspace import (git clone or local copy)."""
+    __tablename__ = "import_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    tenant_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    source_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    source_uri: Mapped[str] = mapped_column(Text, nullable=False)
+    display_name: Mapped[str] = mapped_column(Text, nullable=False)
+    local_path: Mapped[str] = mapped_column(Text, nullable=False)
+    storage_mode: Mapped[str] = mapped_column(String(50), nullable=False, default="managed_copy")
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")  # queued, running, completed, failed, cancelled
+    progress: Mapped[int] = mapped_column(nullable=False, default=0)
+    message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    workspace_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("workspaces.id", ondelete="SET NULL"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, default=utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    # Replica running the job and its last sign of life; stale unfinished jobs are failed
+    owner: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_import_job_status", "status"),
+        Index("ix_import_job_tenant", "tenant_id"),
+    )
+
+
+class DashboardCounter(Base):
+    """Incrementally maintained dashboard counters for one scope ("global" or a tenant)."""
+    __tablename__ = "dashboard_counters"
+
+    scope: Mapped[str] = mapped_column(String(64), primary_key=True)
+    workspaces_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    sessions_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    runs_total: Mapped[int] = mapped_column(nullable=False, default=0)
+    runs_completed: Mapped[int] = mapped_column(nullable=False, default=0)
+    runs_error: Mapped[int] = mapped_column(nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, default=utcnow)
+
+
+class DashboardRunsDaily(Base):
+    """Daily rollup of run creations per scope, used for "runs today"."""
+    __tablename__ = "dashboard_runs_daily"
+
+    scope: Mapped[str] = mapped_column(String(64), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    runs_count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
 class User(Base):
     """User accounts for authentication and RBAC."""
     __tablename__ = "users"
@@ -2,5 +2,7 @@ from .workspace_repo import WorkspaceRepository
 from .session_repo import SessionRepository
 from .run_repo import RunRepository
 from .message_repo import MessageRepository
+from .stats_repo import StatsRepository
+from .import_job_repo import ImportJobRepository
 
-__all__ = ["WorkspaceRepository", "SessionRepository", "RunRepository", "MessageRepository"]
+__all__ = ["WorkspaceRepository", "SessionRepository", "RunRepository", "MessageRepository", "StatsRepository", "ImportJobRepository"]
@@ -0,0 +1,81 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import ImportJob
+
+
+class ImportJobRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(
+        self,
+        source_type: str,
+        source_uri: str,
+        display_name: str,
+        local_path: str,
+        storage_mode: str = "managed_copy",
+        tenant_id: Optional[uuid.UUID] = None,
+        status: str = "queued",
+        workspace_id: Optional[uuid.UUID] = None,
+        owner: Optional[str] = None
+    ) -> ImportJob:
+        now = datetime.now(timezone.utc)
+        job = ImportJob(
+            id=uuid.uuid4(),
+            tenant_id=tenant_id,
+            source_type=source_type,
+            source_uri=source_uri,
+            display_name=display_name,
+            local_path=local_path,
+            storage_mode=storage_mode,
+            status=status,
+            progress=100 if status == "completed" else 0,
+            workspace_id=workspace_id,
+            created_at=now,
+            finished_at=now if status == "completed" else None,
+            owner=owner,
+            heartbeat_at=now
+        )
+        self.db.add(job)
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def get_by_id(self, job_id: uuid.UUID) -> Optional[ImportJob]:
+        result = await self.db.execute(
+            select(ImportJob).where(ImportJob.id == job_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def update(self, job_id: uuid.UUID, **fields) -> None:
+        await self.db.execute(
+            update(ImportJob).where(ImportJob.id == job_id).values(**fields)
+        )
+        await self.db.commit()
+
+    async def heartbeat(self, job_ids: list[uuid.UUID], owner: str) -> None:
+        """Stamp the unfinished jobs `owner` is still holding as alive."""
+        await self.db.execute(
+            update(ImportJob)
+            .where(ImportJob.id.in_(job_ids), ImportJob.status.in_(("queued", "running")))
+            .values(owner=owner, heartbeat_at=datetime.now(timezone.utc))
+        )
+        await self.db.commit()
+
+    async def fail_stale(self, cutoff: datetime, error: str) -> int:
+        """Mark queued/running jobs with no heartbeat since `cutoff` as failed."""
+        result = await self.db.execute(
+            update(ImportJob)
+            .where(
+                ImportJob.status.in_(("queued", "running")),
+                func.coalesce(ImportJob.heartbeat_at, ImportJob.created_at) < cutoff
+            )
+            .values(status="failed", error=error, finished_at=datetime.now(timezone.utc))
+        )
+        await self.db.commit()
+        return result.rowcount
@@ -3,9 +3,11 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import Run, RunEvent
+from .stats_repo import StatsRepository
 
 
 class RunRepository:
@@ -29,6 +31,9 @@ class RunRepository:
             created_at=datetime.now(timezone.utc)
         )
         self.db.add(run)
+        stats_repo = StatsRepository(self.db)
+        await stats_repo.increment(tenant_id, runs=1)
+        await stats_repo.increment_runs_daily(tenant_id, run.created_at.date())
         await self.db.commit()
         await self.db.refresh(run)
         return run
@@ -49,14 +54,22 @@ class RunRepository:
         self,
         run_id: uuid.UUID,
         status: str,
-        completed_at: Optional[datetime] = None
+        completed_at: Optional[datetime] = None,
+        commit: bool = True
     ) -> None:
         run = await self.get_by_id(run_id)
         if run:
+            if run.status == "running" and status in ("completed", "error"):
+                await StatsRepository(self.db).increment(
+                    run.tenant_id,
+                    runs_completed=1 if status == "completed" else 0,
+                    runs_error=1 if status == "error" else 0,
+                )
             run.status = status
             if completed_at:
                 run.completed_at = completed_at
-            await self.db.commit()
+            if commit:
+                await self.db.commit()
 
     async def list_by_session(self, session_id: uuid.UUID) -> list[Run]:
         result = await self.db.execute(
@@ -66,6 +79,12 @@ class RunRepository:
         )
         return list(result.scalars().all())
 
+    async def count_by_session(self, session_id: uuid.UUID) -> int:
+        result = await self.db.execute(
+            select(func.count(Run.id)).where(Run.session_id == session_id)
+        )
+        return result.scalar() or 0
+
     async def add_event(
         self,
         run_id: uuid.UUID,
@@ -87,6 +106,24 @@ class RunRepository:
         await self.db.refresh(event)
         return event
 
+    async def add_events(self, events: list[dict], commit: bool = True) -> int:
+        """
+        Insert many events with one multi-row INSERT. Duplicate (run_id, seq) rows are skipped.
+
+        With commit=False the caller commits, e.g. together with a status update.
+        """
+        if not events:
+            return 0
+        stmt = (
+            pg_insert(RunEvent)
+            .values(events)
+            .on_conflict_do_nothing(constraint="uq_run_event_seq")
+        )
+        await self.db.execute(stmt)
+        if commit:
+            await self.db.commit()
+        return len(events)
+
     async def get_events(self, run_id: uuid.UUID) -> list[RunEvent]:
         result = await self.db.execute(
             select(RunEvent)
@@ -95,6 +132,25 @@ class RunRepository:
         )
         return list(result.scalars().all())
 
+    async def get_events_after(
+        self,
+        run_id: uuid.UUID,
+        after_seq: int = -1,
+        through_seq: Optional[int] = None
+    ) -> list[RunEvent]:
+        """Events with seq greater than `after_seq` (and at most `through_seq`), served from ix_run_event_run_seq."""
+        query = select(RunEvent).where(RunEvent.run_id == run_id, RunEvent.seq > after_seq)
+        if through_seq is not None:
+            query = query.where(RunEvent.seq <= through_seq)
+        result = await self.db.execute(query.order_by(RunEvent.seq))
+        return list(result.scalars().all())
+
+    async def count_events(self, run_id: uuid.UUID) -> int:
+        result = await self.db.execute(
+            select(func.count(RunEvent.id)).where(RunEvent.run_id == run_id)
+        )
+        return result.scalar() or 0
+
     async def get_next_seq(self, run_id: uuid.UUID) -> int:
         result = await self.db.execute(
             select(func.coalesce(func.max(RunEvent.seq), 0))
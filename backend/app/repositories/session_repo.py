@@ -2,10 +2,11 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, func, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models import Session
+from ..models import Session, Run
+from .stats_repo import StatsRepository
 
 
 class SessionRepository:
@@ -30,6 +31,7 @@ class SessionRepository:
             created_at=datetime.now(timezone.utc)
         )
         self.db.add(session)
+        await StatsRepository(self.db).increment(tenant_id, sessions=1)
         await self.db.commit()
         await self.db.refresh(session)
         return session
@@ -48,6 +50,50 @@ class SessionRepository:
         )
         return list(result.scalars().all())
 
+    async def list_by_workspace_with_run_stats(
+        self,
+        workspace_id: uuid.UUID,
+        limit: Optional[int] = None,
+        before: Optional[tuple[datetime, uuid.UUID]] = None
+    ) -> list[tuple[Session, int, Optional[str], Optional[datetime]]]:
+        """
+        Sessions for a workspace with run count and last run status/time, in one query.
+
+        Ordered newest first on ix_session_workspace_created. Pass the
+        (created_at, id) of the last row of a page as `before` to fetch the
+        next page (keyset pagination).
+        """
+        last_run_status = (
+            select(Run.status)
+            .where(Run.session_id == Session.id)
+            .order_by(Run.created_at.desc())
+            .limit(1)
+            .correlate(Session)
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                Session,
+                func.count(Run.id),
+                last_run_status,
+                func.max(Run.created_at),
+            )
+            .outerjoin(Run, Run.session_id == Session.id)
+            .where(Session.workspace_id == workspace_id)
+            .group_by(Session.id)
+            .order_by(Session.created_at.desc(), Session.id.desc())
+        )
+        if before:
+            before_created_at, before_id = before
+            query = query.where(or_(
+                Session.created_at < before_created_at,
+                and_(Session.created_at == before_created_at, Session.id < before_id),
+            ))
+        if limit:
+            query = query.limit(limit)
+        result = await self.db.execute(query)
+        return [tuple(row) for row in result.all()]
+
     async def update_thread_id(self, session_id: uuid.UUID, new_thread_id: str) -> None:
         """Update the runner_thread_id for a session (used for thread recovery)."""
         result = await self.db.execute(
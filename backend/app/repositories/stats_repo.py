@@ -0,0 +1,172 @@
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select, func, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import DashboardCounter, DashboardRunsDaily, Workspace, Session, Run
+
+
+GLOBAL_SCOPE = "global"
+
+COUNTER_NAMES = ("workspaces_count", "sessions_count", "runs_total", "runs_completed", "runs_error")
+
+# pg_advisory_xact_lock key serialising counter rebuilds across replicas
+_REBUILD_LOCK_KEY = 6_001
+
+
+def tenant_scope(tenant_id: Optional[uuid.UUID]) -> str:
+    """Counter scope for a tenant; resources without a tenant share one scope."""
+    return f"tenant:{tenant_id}" if tenant_id else "tenant:none"
+
+
+class StatsRepository:
+    """
+    Dashboard counters, maintained incrementally.
+
+    Every change is applied to the global scope and to the owning tenant's
+    scope. Methods only stage the upserts; the caller commits them together
+    with the row that triggered the change.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def increment(
+        self,
+        tenant_id: Optional[uuid.UUID],
+        workspaces: int = 0,
+        sessions: int = 0,
+        runs: int = 0,
+        runs_completed: int = 0,
+        runs_error: int = 0
+    ) -> None:
+        deltas = {
+            "workspaces_count": workspaces,
+            "sessions_count": sessions,
+            "runs_total": runs,
+            "runs_completed": runs_completed,
+            "runs_error": runs_error,
+        }
+        now = datetime.now(timezone.utc)
+        for scope in (GLOBAL_SCOPE, tenant_scope(tenant_id)):
+            stmt = pg_insert(DashboardCounter).values(scope=scope, updated_at=now, **deltas)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DashboardCounter.scope],
+                set_={
+                    **{name: getattr(DashboardCounter, name) + delta for name, delta in deltas.items() if delta},
+                    "updated_at": now,
+                },
+            )
+            await self.db.execute(stmt)
+
+    async def increment_runs_daily(self, tenant_id: Optional[uuid.UUID], day: date, runs: int = 1) -> None:
+        for scope in (GLOBAL_SCOPE, tenant_scope(tenant_id)):
+            stmt = pg_insert(DashboardRunsDaily).values(scope=scope, day=day, runs_count=runs)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DashboardRunsDaily.scope, DashboardRunsDaily.day],
+                set_={"runs_count": DashboardRunsDaily.runs_count + runs},
+            )
+            await self.db.execute(stmt)
+
+    async def get_counters(self, scopes: list[str]) -> dict[str, int]:
+        """Sum the counters of the given scopes."""
+        result = await self.db.execute(
+            select(
+                func.coalesce(func.sum(DashboardCounter.workspaces_count), 0),
+                func.coalesce(func.sum(DashboardCounter.sessions_count), 0),
+                func.coalesce(func.sum(DashboardCounter.runs_total), 0),
+                func.coalesce(func.sum(DashboardCounter.runs_completed), 0),
+                func.coalesce(func.sum(DashboardCounter.runs_error), 0),
+            ).where(DashboardCounter.scope.in_(scopes))
+        )
+        workspaces, sessions, runs_total, runs_completed, runs_error = result.one()
+        return {
+            "workspaces_count": int(workspaces),
+            "sessions_count": int(sessions),
+            "runs_total": int(runs_total),
+            "runs_completed": int(runs_completed),
+            "runs_error": int(runs_error),
+        }
+
+    async def get_runs_on(self, scopes: list[str], day: date) -> int:
+        result = await self.db.execute(
+            select(func.coalesce(func.sum(DashboardRunsDaily.runs_count), 0))
+            .where(DashboardRunsDaily.scope.in_(scopes), DashboardRunsDaily.day == day)
+        )
+        return int(result.scalar() or 0)
+
+    async def has_counters(self) -> bool:
+        result = await self.db.execute(
+            select(DashboardCounter.scope).where(DashboardCounter.scope == GLOBAL_SCOPE)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def lock_rebuild(self) -> None:
+        """Take the rebuild lock for the rest of this transaction."""
+        await self.db.execute(select(func.pg_advisory_xact_lock(_REBUILD_LOCK_KEY)))
+
+    async def rebuild(self) -> None:
+        """
+        Recompute every counter from the source tables (one-off backfill).
+
+        Counters are written as absolute values recounted in this
+        transaction, not as increments, so running it twice cannot double
+        anything. Callers also hold lock_rebuild() so replicas take turns.
+        """
+        counters: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTER_NAMES, 0))
+        daily: dict[tuple[str, date], int] = defaultdict(int)
+        # Make sure the global row exists even on an empty database
+        counters[GLOBAL_SCOPE] = dict.fromkeys(COUNTER_NAMES, 0)
+
+        def add(tenant_id: Optional[uuid.UUID], name: str, count: int) -> None:
+            for scope in (GLOBAL_SCOPE, tenant_scope(tenant_id)):
+                counters[scope][name] += count
+
+        workspace_rows = await self.db.execute(
+            select(Workspace.tenant_id, func.count(Workspace.id)).group_by(Workspace.tenant_id)
+        )
+        for tenant_id, count in workspace_rows.all():
+            add(tenant_id, "workspaces_count", count)
+
+        session_rows = await self.db.execute(
+            select(Session.tenant_id, func.count(Session.id)).group_by(Session.tenant_id)
+        )
+        for tenant_id, count in session_rows.all():
+            add(tenant_id, "sessions_count", count)
+
+        run_rows = await self.db.execute(
+            select(Run.tenant_id, Run.status, func.count(Run.id)).group_by(Run.tenant_id, Run.status)
+        )
+        for tenant_id, status, count in run_rows.all():
+            add(tenant_id, "runs_total", count)
+            if status == "completed":
+                add(tenant_id, "runs_completed", count)
+            elif status == "error":
+                add(tenant_id, "runs_error", count)
+
+        run_day = func.date(func.timezone("UTC", Run.created_at))
+        daily_rows = await self.db.execute(
+            select(Run.tenant_id, run_day, func.count(Run.id)).group_by(Run.tenant_id, run_day)
+        )
+        for tenant_id, day, count in daily_rows.all():
+            for scope in (GLOBAL_SCOPE, tenant_scope(tenant_id)):
+                daily[(scope, day)] += count
+
+        now = datetime.now(timezone.utc)
+        await self.db.execute(delete(DashboardCounter).where(DashboardCounter.scope.not_in(list(counters))))
+        for scope, values in counters.items():
+            stmt = pg_insert(DashboardCounter).values(scope=scope, updated_at=now, **values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DashboardCounter.scope],
+                set_={**values, "updated_at": now},
+            )
+            await self.db.execute(stmt)
+
+        await self.db.execute(delete(DashboardRunsDaily))
+        for (scope, day), count in daily.items():
+            await self.db.execute(pg_insert(DashboardRunsDaily).values(scope=scope, day=day, runs_count=count))
+        await self.db.commit()
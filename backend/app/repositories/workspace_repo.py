@@ -2,10 +2,11 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models import Workspace
+from ..models import Workspace, Session, Run
+from .stats_repo import StatsRepository
 
 
 class WorkspaceRepository:
@@ -34,6 +35,7 @@ class WorkspaceRepository:
             metadata_json=metadata_json
         )
         self.db.add(workspace)
+        await StatsRepository(self.db).increment(tenant_id, workspaces=1)
         await self.db.commit()
         await self.db.refresh(workspace)
         return workspace
@@ -70,7 +72,25 @@ class WorkspaceRepository:
         """Delete a workspace. Cascade delete will handle sessions, runs, events."""
         workspace = await self.get_by_id(workspace_id)
         if workspace:
+            sessions_count = (await self.db.execute(
+                select(func.count(Session.id)).where(Session.workspace_id == workspace_id)
+            )).scalar() or 0
+            run_rows = (await self.db.execute(
+                select(Run.status, func.count(Run.id))
+                .join(Session, Run.session_id == Session.id)
+                .where(Session.workspace_id == workspace_id)
+                .group_by(Run.status)
+            )).all()
+            runs_by_status = {status: count for status, count in run_rows}
             await self.db.delete(workspace)
+            await StatsRepository(self.db).increment(
+                workspace.tenant_id,
+                workspaces=-1,
+                sessions=-sessions_count,
+                runs=-sum(runs_by_status.values()),
+                runs_completed=-runs_by_status.get("completed", 0),
+                runs_error=-runs_by_status.get("error", 0),
+            )
             await self.db.commit()
             return True
         return False
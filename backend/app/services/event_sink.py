@@ -0,0 +1,298 @@
+"""
+Write-behind sink for run event persistence.
+
+The SSE relay hands every runner event to the sink and moves on. A single
+background writer drains the in-process queue and flushes events to
+Postgres as multi-row INSERTs once a batch fills up or the flush interval
+elapses. Terminal events (run.completed, stream.closed, error) force an
+immediate flush; the batch's rows and the run status update are committed
+in one transaction.
+
+Ordering: events are written in the order they are enqueued, which is the
+order of `seq` for each run, because there is exactly one writer.
+
+A batch that fails to write is retried with exponential backoff before
+anything queued after it. Connection errors are retried until the
+database is back; other errors EVENT_SINK_MAX_RETRIES times, after which
+the rows are dropped (counted in `events_dropped`) but the run status
+updates of any terminal events are still written on their own.
+
+The queue holds at most EVENT_SINK_MAX_QUEUE events. When it is full
+(the database is slow or down), enqueue() waits for room, which pauses
+the relay reading that run's runner stream rather than growing memory;
+`backpressure_waits` counts how often that happened.
+
+Events relayed with an SSE `event:` type header arrive as raw JSON text;
+the writer decodes them when it flushes, off the relay's hot path.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import exc as sa_exc
+
+from ..database import async_session_maker
+from ..repositories import RunRepository
+
+
+EVENT_SINK_BATCH_SIZE = int(os.environ.get("EVENT_SINK_BATCH_SIZE", "200"))
+EVENT_SINK_FLUSH_INTERVAL_MS = int(os.environ.get("EVENT_SINK_FLUSH_INTERVAL_MS", "250"))
+EVENT_SINK_MAX_QUEUE = int(os.environ.get("EVENT_SINK_MAX_QUEUE", "10000"))
+EVENT_SINK_MAX_RETRIES = int(os.environ.get("EVENT_SINK_MAX_RETRIES", "5"))
+EVENT_SINK_RETRY_BASE_MS = int(os.environ.get("EVENT_SINK_RETRY_BASE_MS", "500"))
+EVENT_SINK_RETRY_MAX_MS = int(os.environ.get("EVENT_SINK_RETRY_MAX_MS", "30000"))
+# How long shutdown waits for queued events before giving up on them
+EVENT_SINK_STOP_TIMEOUT_SECONDS = float(os.environ.get("EVENT_SINK_STOP_TIMEOUT_SECONDS", "10"))
+
+# Event types that end a run and map to a final run status
+TERMINAL_EVENT_STATUS = {
+    "run.completed": "completed",
+    "stream.closed": "completed",
+    "error": "error",
+}
+
+
+@dataclass
+class PendingEvent:
+    run_id: uuid.UUID
+    seq: int
+    event_type: Optional[str]
+    raw_json: dict | str
+    at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    source: str = "runner"
+
+
+@dataclass
+class _FlushMarker:
+    done: asyncio.Future
+
+
+class RunEventSink:
+    """In-process queue plus a single background writer for RunEvent rows."""
+
+    def __init__(
+        self,
+        batch_size: int = EVENT_SINK_BATCH_SIZE,
+        flush_interval_ms: int = EVENT_SINK_FLUSH_INTERVAL_MS,
+        max_queue: int = EVENT_SINK_MAX_QUEUE,
+        max_retries: int = EVENT_SINK_MAX_RETRIES,
+        retry_base_ms: int = EVENT_SINK_RETRY_BASE_MS,
+        retry_max_ms: int = EVENT_SINK_RETRY_MAX_MS,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0, flush_interval_ms) / 1000
+        self.max_queue = max(1, max_queue)
+        self.max_retries = max(1, max_retries)
+        self.retry_base = max(0, retry_base_ms) / 1000
+        self.retry_max = max(0, retry_max_ms) / 1000
+        self._queue: asyncio.Queue[PendingEvent | _FlushMarker] = asyncio.Queue()
+        # Events (not flush markers) in the queue, bounded by max_queue
+        self._queued = 0
+        self._room = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._events_written = 0
+        self._batches_written = 0
+        self._errors = 0
+        self._retries = 0
+        self._events_dropped = 0
+        self._backpressure_waits = 0
+        self._backpressure_ms = 0.0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything that is still queued and stop the writer."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), EVENT_SINK_STOP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"Stopping the run event sink with {self._queue.qsize()} events unwritten")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def enqueue(
+        self,
+        run_id: uuid.UUID,
+        seq: int,
+        event_type: Optional[str],
+        raw_json: dict | str,
+        source: str = "runner",
+    ) -> None:
+        """Queue an event for persistence; waits only while the queue is full."""
+        event = PendingEvent(
+            run_id=run_id,
+            seq=seq,
+            event_type=event_type,
+            raw_json=raw_json,
+            source=source,
+        )
+        if self._queued >= self.max_queue:
+            self._backpressure_waits += 1
+            started = time.perf_counter()
+            while self._queued >= self.max_queue:
+                self._room.clear()
+                await self._room.wait()
+            self._backpressure_ms += (time.perf_counter() - started) * 1000
+        self._queued += 1
+        self._queue.put_nowait(event)
+
+    async def flush(self) -> None:
+        """Wait until every event enqueued before this call has been written."""
+        if self._task is None or self._task.done():
+            return
+        done = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_FlushMarker(done))
+        await done
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queued,
+            "max_queue": self.max_queue,
+            "backpressure_waits": self._backpressure_waits,
+            "backpressure_ms": round(self._backpressure_ms, 2),
+            "events_written": self._events_written,
+            "batches_written": self._batches_written,
+            "errors": self._errors,
+            "retries": self._retries,
+            "events_dropped": self._events_dropped,
+            "last_flush_ms": round(self._last_flush_ms, 2),
+            "max_flush_ms": round(self._max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self._batches_written, 2) if self._batches_written else 0.0,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._take()
+            batch: list[PendingEvent] = []
+            markers: list[_FlushMarker] = []
+            deadline = loop.time() + self.flush_interval
+
+            while True:
+                if isinstance(item, _FlushMarker):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size or item.event_type in TERMINAL_EVENT_STATUS:
+                    break
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._take(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            if batch:
+                await self._write_with_retry(batch)
+            for marker in markers:
+                if not marker.done.done():
+                    marker.done.set_result(None)
+
+    async def _take(self) -> PendingEvent | _FlushMarker:
+        item = await self._queue.get()
+        if isinstance(item, PendingEvent):
+            self._queued -= 1
+            self._room.set()
+        return item
+
+    async def _write_with_retry(self, batch: list[PendingEvent]) -> None:
+        if await self._retry(lambda: self._write_batch(batch), f"{len(batch)} run events"):
+            return
+        self._events_dropped += len(batch)
+        terminal = [e for e in batch if e.event_type in TERMINAL_EVENT_STATUS]
+        if terminal:
+            await self._retry(lambda: self._write_statuses(terminal), f"{len(terminal)} run status updates")
+
+    async def _retry(self, write: Callable[[], Awaitable[None]], what: str) -> bool:
+        """Run `write` until it succeeds; False once a non-connection error has failed max_retries times."""
+        attempt = 0
+        while True:
+            try:
+                await write()
+                return True
+            except Exception as exc:
+                self._errors += 1
+                attempt += 1
+                if attempt >= self.max_retries and not _is_connection_error(exc):
+                    print(f"Giving up on {what} after {attempt} attempts: {exc}")
+                    return False
+                delay = min(self.retry_max, self.retry_base * 2 ** min(attempt - 1, 16))
+                print(f"Failed to persist {what} (attempt {attempt}), retrying in {delay:.1f}s: {exc}")
+                self._retries += 1
+                await asyncio.sleep(delay)
+
+    async def _write_batch(self, batch: list[PendingEvent]) -> None:
+        started = time.perf_counter()
+        async with async_session_maker() as db:
+            run_repo = RunRepository(db)
+            await run_repo.add_events([
+                {
+                    "run_id": e.run_id,
+                    "seq": e.seq,
+                    "at": e.at,
+                    "source": e.source,
+                    "event_type": e.event_type,
+                    "raw_json": _decode(e),
+                }
+                for e in batch
+            ], commit=False)
+            for e in batch:
+                status = TERMINAL_EVENT_STATUS.get(e.event_type or "")
+                if status:
+                    await run_repo.update_status(e.run_id, status, e.at, commit=False)
+            await db.commit()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._events_written += len(batch)
+        self._batches_written += 1
+        self._last_flush_ms = elapsed_ms
+        self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    async def _write_statuses(self, events: list[PendingEvent]) -> None:
+        async with async_session_maker() as db:
+            run_repo = RunRepository(db)
+            for e in events:
+                await run_repo.update_status(e.run_id, TERMINAL_EVENT_STATUS[e.event_type], e.at, commit=False)
+            await db.commit()
+
+
+def _is_connection_error(exc: Exception) -> bool:
+    """Errors that go away once the database is reachable again."""
+    if isinstance(exc, sa_exc.DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(exc, (sa_exc.OperationalError, sa_exc.InterfaceError, OSError, asyncio.TimeoutError))
+
+
+def _decode(event: PendingEvent) -> dict:
+    if not isinstance(event.raw_json, str):
+        return event.raw_json
+    try:
+        return json.loads(event.raw_json)
+    except json.JSONDecodeError:
+        # Keep the row (and the seq sequence) even if the runner sent bad JSON
+        return {"type": event.event_type, "unparsed": event.raw_json}
+
+
+event_sink = RunEventSink()
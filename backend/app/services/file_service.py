@@ -3,12 +3,15 @@ File operations service for workspace file browsing, upload, and download.
 v0.5.0 feature implementation.
 """
 
-import io
+import asyncio
 import os
 import pathlib
+import shutil
+import tempfile
+import threading
 import zipfile
 from datetime import datetime, timezone
-from typing import Optional, Literal
+from typing import AsyncIterator, BinaryIO, Callable, Optional, Literal
 
 from fastapi import HTTPException
 
@@ -18,6 +21,21 @@ MAX_UPLOAD_SIZE = 1 * 1024 * 1024 * 1024  # 1GB for workspace upload
 MAX_SINGLE_FILE_UPLOAD = 100 * 1024 * 1024  # 100MB for single file
 MAX_VIEW_SIZE = 1 * 1024 * 1024  # 1MB for in-browser viewing
 
+# Streaming uploads and ZIP extraction limits
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_EXTRACTED_SIZE = int(os.environ.get("MAX_EXTRACTED_SIZE", str(5 * 1024 * 1024 * 1024)))  # 5GB
+MAX_COMPRESSION_RATIO = int(os.environ.get("MAX_COMPRESSION_RATIO", "200"))
+MAX_ZIP_ENTRIES = int(os.environ.get("MAX_ZIP_ENTRIES", "100000"))
+
+# Streaming ZIP downloads
+ZIP_STREAM_CHUNK_SIZE = 256 * 1024  # Flush compressed output once this much is buffered
+ZIP_STREAM_QUEUE_CHUNKS = 8  # Chunks built ahead of a slow client
+ZIP_DOWNLOAD_CONCURRENCY = int(os.environ.get("ZIP_DOWNLOAD_CONCURRENCY", "4"))
+
+ZipCompression = Literal["deflate", "store"]
+
+_zip_download_slots = asyncio.Semaphore(ZIP_DOWNLOAD_CONCURRENCY)
+
 # File extensions that can be viewed in browser
 VIEWABLE_EXTENSIONS = {
     ".md", ".txt", ".json", ".yaml", ".yml", ".xml",
@@ -217,16 +235,85 @@ def get_file_for_download(workspace_path: str, relative_path: str) -> tuple[path
     return target, target.name
 
 
-def create_zip_from_directory(workspace_path: str, relative_path: str = "/") -> tuple[io.BytesIO, str]:
+class _ZipStreamClosed(Exception):
+    """The client went away; the archive producer stops."""
+
+
+class _ZipChunkWriter:
+    """Write-only, non-seekable sink handing ZIP output to `emit` in ZIP_STREAM_CHUNK_SIZE pieces."""
+    
+    def __init__(self, emit: Callable[[bytes], None]):
+        self._emit = emit
+        self._chunks: list[bytes] = []
+        self.size = 0
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        if self.size >= ZIP_STREAM_CHUNK_SIZE:
+            self.emit_pending()
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def emit_pending(self) -> None:
+        if self.size:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            self.size = 0
+            self._emit(data)
+
+
+def _write_zip(target: pathlib.Path, sink: _ZipChunkWriter, compression: int, compresslevel: Optional[int]) -> None:
     """
-    Create a ZIP archive from a directory.
+    Write a ZIP archive of `target` to `sink`.
+    
+    ZipFile.write copies each file in small blocks, so memory use is bounded
+    by the sink's chunk size rather than the archive size.
+    """
+    with zipfile.ZipFile(sink, "w", compression, compresslevel=compresslevel) as zf:
+        for root, dirs, files in os.walk(target):
+            # Skip hidden directories
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            
+            for file in files:
+                if file.startswith("."):
+                    continue
+                
+                file_path = pathlib.Path(root) / file
+                try:
+                    zf.write(file_path, file_path.relative_to(target))
+                except OSError:
+                    # Skip files we can't access
+                    continue
+    
+    # Central directory written on close
+    sink.emit_pending()
+
+
+def stream_zip_from_directory(
+    workspace_path: str,
+    relative_path: str = "/",
+    compression: ZipCompression = "deflate",
+    compresslevel: int = 6
+) -> tuple[AsyncIterator[bytes], str]:
+    """
+    Stream a directory as a ZIP archive without buffering the whole archive.
+    
+    Compression runs in one worker thread per archive, which stays at most
+    ZIP_STREAM_QUEUE_CHUNKS chunks ahead of the client, and at most
+    ZIP_DOWNLOAD_CONCURRENCY archives are built at once. If the client goes
+    away the thread stops at its next chunk, and its slot is freed then.
     
     Args:
         workspace_path: The workspace's local_path
         relative_path: Path relative to workspace root
+        compression: "deflate" or "store" (no compression)
+        compresslevel: Deflate level 0-9
     
     Returns:
-        Tuple of (BytesIO buffer, suggested filename)
+        Tuple of (async byte iterator, suggested filename)
     """
     target = validate_path_under_workspace(workspace_path, relative_path)
     
@@ -236,22 +323,50 @@ def create_zip_from_directory(workspace_path: str, relative_path: str = "/") ->
     if not target.is_dir():
         raise HTTPException(status_code=400, detail="Path is not a directory")
     
-    buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        for root, dirs, files in os.walk(target):
-            # Skip hidden directories
-            dirs[:] = [d for d in dirs if not d.startswith(".")]
-            
-            for file in files:
-                if file.startswith("."):
-                    continue
-                    
-                file_path = pathlib.Path(root) / file
-                arcname = file_path.relative_to(target)
-                zf.write(file_path, arcname)
-    
-    buffer.seek(0)
+    if compression == "store":
+        compression_type, level = zipfile.ZIP_STORED, None
+    else:
+        compression_type, level = zipfile.ZIP_DEFLATED, compresslevel
+    
+    async def stream() -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue[Optional[bytes]] = asyncio.Queue()
+        room = threading.Semaphore(ZIP_STREAM_QUEUE_CHUNKS)
+        closed = threading.Event()
+        
+        def emit(chunk: bytes) -> None:
+            if closed.is_set():
+                raise _ZipStreamClosed()
+            room.acquire()
+            if closed.is_set():
+                raise _ZipStreamClosed()
+            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+        
+        def produce() -> None:
+            try:
+                _write_zip(target, _ZipChunkWriter(emit), compression_type, level)
+            except _ZipStreamClosed:
+                pass
+            finally:
+                # The slot is freed only once compression has actually stopped
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+                loop.call_soon_threadsafe(_zip_download_slots.release)
+        
+        await _zip_download_slots.acquire()
+        producer = asyncio.ensure_future(asyncio.to_thread(produce))
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                room.release()
+                yield chunk
+            await producer  # Raise any error that cut the archive short
+        finally:
+            if not producer.done():
+                # Client disconnected: unblock the producer so it sees `closed` and stops
+                closed.set()
+                room.release(ZIP_STREAM_QUEUE_CHUNKS)
     
     # Generate filename
     if relative_path == "/" or not relative_path:
@@ -259,34 +374,53 @@ def create_zip_from_directory(workspace_path: str, relative_path: str = "/") ->
     else:
         zip_name = target.name + ".zip"
     
-    return buffer, zip_name
+    return stream(), zip_name
+
+
+def copy_stream_limited(source: BinaryIO, dest: BinaryIO, max_size: int, too_large_detail: str) -> int:
+    """
+    Copy `source` to `dest` in UPLOAD_CHUNK_SIZE blocks, enforcing `max_size` as bytes arrive.
+    
+    Returns:
+        Number of bytes copied
+    
+    Raises:
+        HTTPException: 413 as soon as the limit is exceeded
+    """
+    copied = 0
+    while True:
+        block = source.read(UPLOAD_CHUNK_SIZE)
+        if not block:
+            break
+        copied += len(block)
+        if copied > max_size:
+            raise HTTPException(status_code=413, detail=too_large_detail)
+        dest.write(block)
+    return copied
 
 
 def save_uploaded_file(
     workspace_path: str, 
     relative_path: str, 
     filename: str, 
-    content: bytes
+    source: BinaryIO
 ) -> dict:
     """
     Save an uploaded file to the workspace.
     
+    The upload is streamed to a temporary file next to the target and
+    renamed into place, so a rejected upload never leaves a partial file.
+    Blocking; call it from a worker thread.
+    
     Args:
         workspace_path: The workspace's local_path
         relative_path: Target directory path
         filename: Name of the file
-        content: File content as bytes
+        source: Readable binary stream with the file content
     
     Returns:
         Dictionary with file info
     """
-    # Validate size
-    if len(content) > MAX_SINGLE_FILE_UPLOAD:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size: {MAX_SINGLE_FILE_UPLOAD // 1024 // 1024}MB"
-        )
-    
     # Validate target directory
     target_dir = validate_path_under_workspace(workspace_path, relative_path)
     
@@ -303,7 +437,19 @@ def save_uploaded_file(
     
     # Write file
     file_path = target_dir / safe_filename
-    file_path.write_bytes(content)
+    fd, tmp_name = tempfile.mkstemp(dir=target_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as dest:
+            copy_stream_limited(
+                source,
+                dest,
+                MAX_SINGLE_FILE_UPLOAD,
+                f"File too large. Maximum size: {MAX_SINGLE_FILE_UPLOAD // 1024 // 1024}MB"
+            )
+        os.replace(tmp_name, file_path)
+    except BaseException:
+        pathlib.Path(tmp_name).unlink(missing_ok=True)
+        raise
     
     stat = file_path.stat()
     base = pathlib.Path(workspace_path).resolve()
@@ -318,16 +464,42 @@ def save_uploaded_file(
     }
 
 
+def _check_zip_members(zf: zipfile.ZipFile) -> None:
+    """Reject unsafe paths and zip bombs before anything is written."""
+    members = zf.infolist()
+    if len(members) > MAX_ZIP_ENTRIES:
+        raise HTTPException(status_code=400, detail=f"Invalid ZIP: more than {MAX_ZIP_ENTRIES} entries")
+    
+    total_size = 0
+    for info in members:
+        name = info.filename
+        if name.startswith("/") or ".." in pathlib.PurePosixPath(name).parts:
+            raise HTTPException(status_code=400, detail="Invalid ZIP: contains unsafe paths")
+        
+        total_size += info.file_size
+        if total_size > MAX_EXTRACTED_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"ZIP expands beyond {MAX_EXTRACTED_SIZE // 1024 // 1024 // 1024}GB"
+            )
+        if info.compress_size and info.file_size / info.compress_size > MAX_COMPRESSION_RATIO:
+            raise HTTPException(status_code=400, detail=f"Invalid ZIP: suspicious compression ratio for {name}")
+
+
 def extract_uploaded_workspace(
-    zip_content: bytes,
+    zip_source: BinaryIO,
     workspace_path: str,
     max_size: int = MAX_UPLOAD_SIZE
 ) -> int:
     """
     Extract an uploaded ZIP file to create a new workspace.
     
+    Entries are streamed to disk and their real decompressed size is
+    counted, so headers that under-report sizes cannot bypass the
+    MAX_EXTRACTED_SIZE limit. Blocking; call it from a worker thread.
+    
     Args:
-        zip_content: ZIP file content as bytes
+        zip_source: Seekable binary stream with the ZIP content
         workspace_path: Target workspace path
         max_size: Maximum allowed size
     
@@ -337,32 +509,50 @@ def extract_uploaded_workspace(
     Raises:
         HTTPException: If extraction fails
     """
-    if len(zip_content) > max_size:
+    zip_source.seek(0, os.SEEK_END)
+    if zip_source.tell() > max_size:
         raise HTTPException(
             status_code=413,
             detail=f"Upload too large. Maximum size: {max_size // 1024 // 1024 // 1024}GB"
         )
+    zip_source.seek(0)
     
     # Create target directory
     target = pathlib.Path(workspace_path)
     target.mkdir(parents=True, exist_ok=True)
+    base = target.resolve()
     
     try:
-        with zipfile.ZipFile(io.BytesIO(zip_content), "r") as zf:
-            # Security: check for path traversal in zip
-            for name in zf.namelist():
-                if name.startswith("/") or ".." in name:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Invalid ZIP: contains unsafe paths"
-                    )
+        with zipfile.ZipFile(zip_source, "r") as zf:
+            _check_zip_members(zf)
             
-            # Extract all files
-            zf.extractall(target)
+            extracted_bytes = 0
+            for info in zf.infolist():
+                dest_path = (base / info.filename).resolve()
+                if not str(dest_path).startswith(str(base)):
+                    raise HTTPException(status_code=400, detail="Invalid ZIP: contains unsafe paths")
+                
+                if info.is_dir():
+                    dest_path.mkdir(parents=True, exist_ok=True)
+                    continue
+                
+                dest_path.parent.mkdir(parents=True, exist_ok=True)
+                with zf.open(info) as src, open(dest_path, "wb") as dest:
+                    extracted_bytes += copy_stream_limited(
+                        src,
+                        dest,
+                        MAX_EXTRACTED_SIZE - extracted_bytes,
+                        f"ZIP expands beyond {MAX_EXTRACTED_SIZE // 1024 // 1024 // 1024}GB"
+                    )
             
             return len(zf.namelist())
-            
+    
+    except HTTPException:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
     except zipfile.BadZipFile:
+        shutil.rmtree(target, ignore_errors=True)
         raise HTTPException(status_code=400, detail="Invalid ZIP file")
     except Exception as e:
+        shutil.rmtree(target, ignore_errors=True)
         raise HTTPException(status_code=400, detail=f"Failed to extract: {str(e)}")
@@ -0,0 +1,264 @@
+"""
+Local bare-mirror cache for repeated clones.
+
+The first clone of a remote URL creates a bare mirror of its branches and
+tags under GIT_MIRROR_ROOT (<WORKSPACES_ROOT>/.mirrors by default). Unlike
+`git clone --mirror` it leaves out refs/pull/*, refs/changes/* and other
+review refs, which on busy hosted repos can outweigh the branches. Later clones of
+the same URL are local clones from the mirror, which hardlink the object
+files instead of downloading them again; origin is then pointed back at
+the real remote. Checkouts do not borrow objects through --shared or
+--reference, so evicting a mirror never breaks an existing workspace.
+
+A mirror that has not been fetched for GIT_MIRROR_REFRESH_SECONDS is
+fetched before it is cloned from, and a background task keeps recently
+used mirrors fresh so that wait is rare. Once the cache grows past
+GIT_MIRROR_MAX_BYTES the least recently used mirrors are deleted.
+
+If the mirror cannot be created (network error, disk full, ...) the
+clone falls back to a direct shallow clone.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import time
+from typing import Callable, Optional
+
+from . import git_service
+from .git_service import GitError, GIT_CLONE_TIMEOUT_SECONDS
+
+
+GIT_MIRROR_ENABLED = os.environ.get("GIT_MIRROR_ENABLED", "true").lower() == "true"
+GIT_MIRROR_ROOT = os.environ.get(
+    "GIT_MIRROR_ROOT",
+    os.path.join(os.environ.get("WORKSPACES_ROOT", "/workspaces"), ".mirrors")
+)
+GIT_MIRROR_MAX_BYTES = int(os.environ.get("GIT_MIRROR_MAX_BYTES", str(10 * 1024 * 1024 * 1024)))
+GIT_MIRROR_REFRESH_SECONDS = float(os.environ.get("GIT_MIRROR_REFRESH_SECONDS", "300"))
+# Only mirrors used within this window are refreshed in the background
+GIT_MIRROR_ACTIVE_SECONDS = float(os.environ.get("GIT_MIRROR_ACTIVE_SECONDS", str(24 * 3600)))
+
+MIRROR_REFSPECS = ["+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]
+
+
+def _dir_size(path: pathlib.Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class GitMirrorCache:
+    """Bare mirrors keyed by remote URL: <key>.git holds the repo, <key>.json its metadata."""
+
+    def __init__(self, root: str, max_bytes: int = GIT_MIRROR_MAX_BYTES, enabled: bool = GIT_MIRROR_ENABLED):
+        self.root = pathlib.Path(root)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fallbacks = 0
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:24]
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    def _mirror_path(self, key: str) -> pathlib.Path:
+        return self.root / f"{key}.git"
+
+    def _meta_path(self, key: str) -> pathlib.Path:
+        return self.root / f"{key}.json"
+
+    def _read_meta(self, key: str) -> Optional[dict]:
+        try:
+            return json.loads(self._meta_path(key).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, key: str, meta: dict) -> None:
+        self._meta_path(key).write_text(json.dumps(meta))
+
+    def _entries(self) -> list[tuple[str, dict]]:
+        if not self.root.exists():
+            return []
+        entries = []
+        for meta_path in self.root.glob("*.json"):
+            meta = self._read_meta(meta_path.stem)
+            if meta is not None:
+                entries.append((meta_path.stem, meta))
+        return entries
+
+    def start(self) -> None:
+        if self.enabled and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def clone(
+        self,
+        url: str,
+        dest: str,
+        on_progress: Optional[Callable[[str, int], None]] = None
+    ) -> None:
+        """Check out `url` into `dest`, going through the mirror when possible."""
+        if not self.enabled:
+            await git_service.clone(url, dest, on_progress=on_progress)
+            return
+
+        key = self._key(url)
+        async with self._lock(key):
+            try:
+                mirror = await self._ensure(key, url, on_progress)
+            except GitError as e:
+                print(f"Git mirror unavailable for {url}, cloning directly: {e}")
+                mirror = None
+            if mirror is not None:
+                await git_service.run_git_checked(
+                    ["clone", "--progress", str(mirror), dest],
+                    timeout=GIT_CLONE_TIMEOUT_SECONDS,
+                    on_progress=on_progress
+                )
+
+        if mirror is None:
+            self.fallbacks += 1
+            await git_service.clone(url, dest, on_progress=on_progress)
+            return
+
+        await git_service.run_git_checked(["remote", "set-url", "origin", url], cwd=dest)
+        await self._evict()
+
+    async def _ensure(
+        self,
+        key: str,
+        url: str,
+        on_progress: Optional[Callable[[str, int], None]]
+    ) -> pathlib.Path:
+        """Create or refresh the mirror for `url`. Must be called with the key's lock held."""
+        mirror = self._mirror_path(key)
+        meta = self._read_meta(key)
+        now = time.time()
+
+        if meta is None or not mirror.exists():
+            self.misses += 1
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.root / f"{key}.tmp"
+            await asyncio.to_thread(shutil.rmtree, tmp, True)
+            try:
+                await git_service.run_git_checked(["init", "--quiet", "--bare", str(tmp)])
+                await git_service.run_git_checked(["config", "remote.origin.url", url], cwd=str(tmp))
+                await self._fetch_refs(tmp, on_progress)
+            except BaseException:
+                await asyncio.to_thread(shutil.rmtree, tmp, True)
+                raise
+            await asyncio.to_thread(shutil.rmtree, mirror, True)
+            os.rename(tmp, mirror)
+            meta = {
+                "url": url,
+                "last_fetch": now,
+                "size": await asyncio.to_thread(_dir_size, mirror),
+            }
+        else:
+            self.hits += 1
+            if now - meta["last_fetch"] > GIT_MIRROR_REFRESH_SECONDS:
+                await self._fetch(key, meta)
+
+        meta["last_used"] = now
+        self._write_meta(key, meta)
+        return mirror
+
+    async def _fetch(self, key: str, meta: dict) -> None:
+        """Bring a mirror up to date; a failed fetch leaves the (stale) mirror usable."""
+        mirror = self._mirror_path(key)
+        try:
+            await self._fetch_refs(mirror)
+        except GitError as e:
+            print(f"Failed to refresh git mirror for {meta['url']}: {e}")
+            return
+        meta["last_fetch"] = time.time()
+        meta["size"] = await asyncio.to_thread(_dir_size, mirror)
+        self._write_meta(key, meta)
+
+    async def _fetch_refs(
+        self,
+        mirror: pathlib.Path,
+        on_progress: Optional[Callable[[str, int], None]] = None
+    ) -> None:
+        """Fetch origin's branches and tags into `mirror` and point HEAD at its default branch."""
+        await git_service.run_git_checked(
+            ["fetch", "--prune", "--progress", "origin", *MIRROR_REFSPECS],
+            cwd=str(mirror),
+            timeout=GIT_CLONE_TIMEOUT_SECONDS,
+            on_progress=on_progress
+        )
+        head = await git_service.run_git_checked(["ls-remote", "--symref", "origin", "HEAD"], cwd=str(mirror))
+        for line in head.splitlines():
+            if line.startswith("ref: ") and line.endswith("\tHEAD"):
+                await git_service.run_git_checked(["symbolic-ref", "HEAD", line[5:-5]], cwd=str(mirror))
+                break
+
+    async def _evict(self) -> None:
+        """Delete least recently used mirrors until the cache fits in max_bytes."""
+        entries = sorted(self._entries(), key=lambda e: e[1].get("last_used", 0))
+        total = sum(meta.get("size", 0) for _, meta in entries)
+        for key, meta in entries:
+            if total <= self.max_bytes:
+                break
+            lock = self._lock(key)
+            if lock.locked():
+                continue
+            async with lock:
+                self._meta_path(key).unlink(missing_ok=True)
+                await asyncio.to_thread(shutil.rmtree, self._mirror_path(key), True)
+            self._locks.pop(key, None)
+            total -= meta.get("size", 0)
+            self.evictions += 1
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(GIT_MIRROR_REFRESH_SECONDS)
+            now = time.time()
+            for key, meta in self._entries():
+                if now - meta.get("last_used", 0) > GIT_MIRROR_ACTIVE_SECONDS:
+                    continue
+                if now - meta.get("last_fetch", 0) < GIT_MIRROR_REFRESH_SECONDS:
+                    continue
+                async with self._lock(key):
+                    current = self._read_meta(key)
+                    if current is not None:
+                        await self._fetch(key, current)
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            "enabled": self.enabled,
+            "mirrors": len(entries),
+            "bytes": sum(meta.get("size", 0) for _, meta in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "fallbacks": self.fallbacks,
+        }
+
+
+git_mirrors = GitMirrorCache(GIT_MIRROR_ROOT)
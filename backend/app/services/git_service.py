@@ -0,0 +1,144 @@
+"""
+Non-blocking git helpers.
+
+git runs as an asyncio subprocess so a slow clone never stalls the event
+loop. stderr is read incrementally (git rewrites progress lines with \\r),
+which lets callers report clone progress as it happens. If the awaiting
+task is cancelled or the timeout expires, the child process is killed.
+"""
+
+import asyncio
+import os
+import re
+from typing import Callable, Optional
+
+
+GIT_CLONE_TIMEOUT_SECONDS = float(os.environ.get("GIT_CLONE_TIMEOUT_SECONDS", "900"))
+GIT_COMMAND_TIMEOUT_SECONDS = float(os.environ.get("GIT_COMMAND_TIMEOUT_SECONDS", "30"))
+
+_PROGRESS_RE = re.compile(r"^(?:remote: )?([A-Za-z ]+):\s+(\d+)%")
+_STDERR_READ_SIZE = 4096
+
+
+class GitError(Exception):
+    """A git command failed or timed out."""
+
+
+def parse_progress(line: str) -> Optional[tuple[str, int]]:
+    """Return (phase, percent) for a git progress line such as 'Receiving objects:  42% (...)'."""
+    match = _PROGRESS_RE.match(line)
+    if not match:
+        return None
+    return match.group(1).strip(), int(match.group(2))
+
+
+async def _read_stderr(stream: asyncio.StreamReader, on_line: Optional[Callable[[str], None]]) -> str:
+    chunks: list[str] = []
+    pending = ""
+    while True:
+        data = await stream.read(_STDERR_READ_SIZE)
+        if not data:
+            break
+        text = data.decode("utf-8", errors="replace")
+        chunks.append(text)
+        pending += text
+        *lines, pending = re.split(r"[\r\n]", pending)
+        if on_line:
+            for line in lines:
+                if line:
+                    on_line(line)
+    if on_line and pending:
+        on_line(pending)
+    return "".join(chunks)
+
+
+async def run_git(
+    args: list[str],
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = GIT_COMMAND_TIMEOUT_SECONDS,
+    on_stderr_line: Optional[Callable[[str], None]] = None
+) -> tuple[int, str, str]:
+    """Run `git <args>` and return (returncode, stdout, stderr)."""
+    proc = await asyncio.create_subprocess_exec(
+        "git", *args,
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+    )
+
+    async def communicate() -> tuple[bytes, str]:
+        stdout, stderr = await asyncio.gather(
+            proc.stdout.read(),
+            _read_stderr(proc.stderr, on_stderr_line),
+        )
+        await proc.wait()
+        return stdout, stderr
+
+    try:
+        stdout, stderr = await asyncio.wait_for(communicate(), timeout)
+    except asyncio.TimeoutError:
+        await _kill(proc)
+        raise GitError(f"git {args[0]} timed out after {timeout:.0f}s")
+    except asyncio.CancelledError:
+        await _kill(proc)
+        raise
+
+    return proc.returncode, stdout.decode("utf-8", errors="replace"), stderr
+
+
+async def _kill(proc: asyncio.subprocess.Process) -> None:
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+
+async def run_git_checked(
+    args: list[str],
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = GIT_COMMAND_TIMEOUT_SECONDS,
+    on_progress: Optional[Callable[[str, int], None]] = None
+) -> str:
+    """Run `git <args>`, reporting (phase, percent) through `on_progress`; raise GitError on failure."""
+    def on_line(line: str) -> None:
+        progress = parse_progress(line)
+        if progress and on_progress:
+            on_progress(*progress)
+
+    returncode, stdout, stderr = await run_git(args, cwd=cwd, timeout=timeout, on_stderr_line=on_line)
+    if returncode != 0:
+        details = "\n".join(
+            l for l in re.split(r"[\r\n]", stderr)
+            if l and not parse_progress(l) and not l.startswith("Cloning into")
+        )
+        raise GitError(f"git {args[0]} failed: {details.strip()}")
+    return stdout
+
+
+async def clone(
+    url: str,
+    dest: str,
+    depth: Optional[int] = 1,
+    on_progress: Optional[Callable[[str, int], None]] = None
+) -> None:
+    """Clone `url` into `dest`, reporting (phase, percent) through `on_progress`."""
+    args = ["clone", "--progress"]
+    if depth:
+        args += ["--depth", str(depth)]
+    args += [url, dest]
+    await run_git_checked(args, timeout=GIT_CLONE_TIMEOUT_SECONDS, on_progress=on_progress)
+
+
+async def get_remote_url(repo_path: str) -> Optional[str]:
+    """URL of the `origin` remote, or None if there is none (or git is unavailable)."""
+    try:
+        returncode, stdout, _ = await run_git(["remote", "get-url", "origin"], cwd=repo_path)
+    except (OSError, GitError):
+        return None
+    if returncode != 0:
+        return None
+    return stdout.strip() or None
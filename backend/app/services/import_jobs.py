@@ -0,0 +1,368 @@
+"""
+Background workspace imports.
+
+POST /api/workspaces/import records an ImportJob and returns right away;
+a fixed pool of IMPORT_WORKERS tasks picks jobs off a queue and runs the
+git clone (as an asyncio subprocess) or local copy (in a thread). A burst
+of imports therefore queues up instead of tying up request handlers, and
+at most IMPORT_WORKERS clones hit the disk and network at once.
+
+Progress is published as events that clients follow over SSE. A job can be
+cancelled while queued or running; a running clone is killed and its
+partial checkout removed. Once the checkout is complete and its workspace
+row is being created, cancels are refused.
+
+Jobs live in the memory of the replica that accepted them, which stamps
+their heartbeat_at every IMPORT_HEARTBEAT_SECONDS. A queued or running job
+whose heartbeat is older than IMPORT_STALE_SECONDS lost its replica (crash
+or restart) and is marked failed by whichever replica sweeps next, so one
+replica starting never fails the imports another is still running.
+"""
+
+import asyncio
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+from ..database import async_session_maker
+from ..models import ImportJob
+from ..repositories import ImportJobRepository, WorkspaceRepository
+from .git_mirror import git_mirrors
+from . import workspace_storage
+
+
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", "2"))
+IMPORT_HEARTBEAT_SECONDS = float(os.environ.get("IMPORT_HEARTBEAT_SECONDS", "15"))
+IMPORT_STALE_SECONDS = float(os.environ.get("IMPORT_STALE_SECONDS", "120"))
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Share of the overall progress bar given to each git clone phase
+_CLONE_PHASES = {
+    "Receiving objects": (0, 80),
+    "Resolving deltas": (80, 95),
+    "Updating files": (95, 100),
+}
+
+
+def _remove_checkout(local_path: str) -> None:
+    """Remove an import target: the repo/ folder and its per-workspace parent."""
+    shutil.rmtree(os.path.dirname(local_path), ignore_errors=True)
+
+
+def job_snapshot(job: ImportJob) -> dict:
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.message,
+        "error": job.error,
+        "workspace_id": str(job.workspace_id) if job.workspace_id else None,
+    }
+
+
+class _JobState:
+    """In-memory state of a queued or running job."""
+
+    def __init__(self, job: ImportJob):
+        self.snapshot = job_snapshot(job)
+        self.source_key = (job.source_type, job.source_uri)
+        self.events: list[dict] = []
+        self.subscribers: set[asyncio.Queue[dict | None]] = set()
+        self.task: Optional[asyncio.Task] = None
+        # queued -> starting -> importing -> finishing; only "importing" is cancelled in place
+        self.phase = "queued"
+        self.cancel_requested = False
+        self.copy_cancelled = threading.Event()
+
+
+class ImportJobManager:
+    """Job queue plus a bounded pool of import workers."""
+
+    def __init__(
+        self,
+        workers: int = IMPORT_WORKERS,
+        heartbeat_seconds: float = IMPORT_HEARTBEAT_SECONDS,
+        stale_seconds: float = IMPORT_STALE_SECONDS
+    ):
+        self.workers = workers
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._queue: asyncio.Queue[uuid.UUID] = asyncio.Queue()
+        self._jobs: dict[uuid.UUID, _JobState] = {}
+        self._by_source: dict[tuple[str, str], uuid.UUID] = {}
+        self._worker_tasks: list[asyncio.Task] = []
+        self.stale_failed = 0
+
+    async def start(self) -> None:
+        await self._fail_stale()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._worker_tasks.append(asyncio.create_task(self._heartbeat_loop()))
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def submit(
+        self,
+        source_type: str,
+        source_uri: str,
+        display_name: str,
+        local_path: str,
+        storage_mode: str = "managed_copy",
+        tenant_id: Optional[uuid.UUID] = None
+    ) -> ImportJob:
+        """Queue an import, or return the job already importing the same source."""
+        async with async_session_maker() as db:
+            repo = ImportJobRepository(db)
+            active_id = self._by_source.get((source_type, source_uri))
+            if active_id:
+                job = await repo.get_by_id(active_id)
+                if job and job.status not in TERMINAL_STATUSES:
+                    return job
+
+            job = await repo.create(
+                source_type=source_type,
+                source_uri=source_uri,
+                display_name=display_name,
+                local_path=local_path,
+                storage_mode=storage_mode,
+                tenant_id=tenant_id,
+                owner=self.owner
+            )
+
+        state = _JobState(job)
+        self._jobs[job.id] = state
+        self._by_source[state.source_key] = job.id
+        self._emit(job.id, "import.queued")
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def cancel(self, job_id: uuid.UUID) -> bool:
+        """Cancel a queued or running job. Returns False if it already finished (or is finishing)."""
+        state = self._jobs.get(job_id)
+        if state is None or state.phase == "finishing":
+            return False
+        if state.cancel_requested:
+            return True
+        state.cancel_requested = True
+        if state.phase == "importing":
+            state.task.cancel()
+        elif state.phase == "queued":
+            # The worker skips jobs with cancel_requested set
+            await self._finish(job_id, status="cancelled", error="Cancelled")
+        # "starting": _run sees cancel_requested before it starts importing
+        return True
+
+    def live_snapshot(self, job_id: uuid.UUID) -> Optional[dict]:
+        state = self._jobs.get(job_id)
+        return dict(state.snapshot) if state else None
+
+    async def subscribe(self, job: ImportJob) -> AsyncIterator[dict]:
+        """Events of a job so far, then live ones until it finishes."""
+        state = self._jobs.get(job.id)
+        if state is None:
+            yield {"type": f"import.{job.status}", **job_snapshot(job)}
+            return
+
+        queue: asyncio.Queue[dict | None] = asyncio.Queue()
+        backlog = list(state.events)
+        state.subscribers.add(queue)
+        try:
+            for event in backlog:
+                yield event
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            state.subscribers.discard(queue)
+
+    def stats(self) -> dict:
+        running = sum(1 for s in self._jobs.values() if s.task is not None)
+        return {
+            "workers": self.workers,
+            "queued": len(self._jobs) - running,
+            "running": running,
+            "owner": self.owner,
+            "stale_failed": self.stale_failed,
+        }
+
+    def _emit(self, job_id: uuid.UUID, event_type: str, **changes) -> None:
+        state = self._jobs.get(job_id)
+        if state is None:
+            return
+        state.snapshot.update(changes)
+        event = {"type": event_type, **state.snapshot}
+        state.events.append(event)
+        for queue in state.subscribers:
+            queue.put_nowait(event)
+
+    async def _finish(self, job_id: uuid.UUID, status: str, **fields) -> None:
+        fields = {"status": status, "finished_at": datetime.now(timezone.utc), **fields}
+        async with async_session_maker() as db:
+            await ImportJobRepository(db).update(job_id, **fields)
+
+        changes = {k: v for k, v in fields.items() if k in ("status", "progress", "error")}
+        if fields.get("workspace_id"):
+            changes["workspace_id"] = str(fields["workspace_id"])
+        self._emit(job_id, f"import.{status}", **changes)
+
+        state = self._jobs.pop(job_id, None)
+        if state is None:
+            return
+        if self._by_source.get(state.source_key) == job_id:
+            del self._by_source[state.source_key]
+        for queue in state.subscribers:
+            queue.put_nowait(None)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            state = self._jobs.get(job_id)
+            if state is None or state.cancel_requested:
+                continue
+            state.task = asyncio.create_task(self._run(job_id, state))
+            try:
+                await state.task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise  # Backend shutdown
+                print(f"Import job {job_id} was cancelled outside its import")
+            except Exception as e:
+                print(f"Import job {job_id} crashed: {e}")
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                if self._jobs:
+                    async with async_session_maker() as db:
+                        await ImportJobRepository(db).heartbeat(list(self._jobs), self.owner)
+                await self._fail_stale()
+            except Exception as e:
+                print(f"Import job heartbeat failed: {e}")
+
+    async def _fail_stale(self) -> None:
+        """Fail queued/running jobs whose replica stopped heartbeating."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.stale_seconds)
+        async with async_session_maker() as db:
+            failed = await ImportJobRepository(db).fail_stale(cutoff, "Interrupted: the backend running it stopped")
+        if failed:
+            self.stale_failed += failed
+            print(f"Marked {failed} interrupted import job(s) as failed")
+
+    async def _run(self, job_id: uuid.UUID, state: _JobState) -> None:
+        state.phase = "starting"
+        async with async_session_maker() as db:
+            repo = ImportJobRepository(db)
+            job = await repo.get_by_id(job_id)
+            if job is None or job.status != "queued":
+                self._jobs.pop(job_id, None)
+                return
+            await repo.update(job_id, status="running", started_at=datetime.now(timezone.utc))
+        if state.cancel_requested:
+            # Cancelled while the job was being started; nothing is on disk yet
+            await self._finish(job_id, status="cancelled", error="Cancelled")
+            return
+        self._emit(job_id, "import.started", status="running")
+
+        state.phase = "importing"
+        try:
+            import_stats = await self._import(job, state)
+        except asyncio.CancelledError:
+            state.phase = "finishing"
+            await asyncio.to_thread(_remove_checkout, job.local_path)
+            await self._finish(job_id, status="cancelled", error="Cancelled")
+            if not state.cancel_requested:
+                # Backend shutdown rather than a user cancel
+                raise
+            return
+        except Exception as e:
+            state.phase = "finishing"
+            print(f"Import job {job_id} failed: {e}")
+            await asyncio.to_thread(_remove_checkout, job.local_path)
+            await self._finish(job_id, status="failed", error=str(e))
+            return
+
+        # No cancels from here on: the checkout is about to belong to a workspace row
+        state.phase = "finishing"
+        try:
+            await asyncio.shield(self._complete(job, import_stats))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Import job {job_id} failed to complete: {e}")
+            await self._finish(job_id, status="failed", error=str(e))
+
+    async def _import(self, job: ImportJob, state: _JobState) -> dict:
+        """Clone or copy the job's source into its local_path; returns the import stats."""
+        os.makedirs(os.path.dirname(job.local_path), exist_ok=True)
+        started = time.monotonic()
+
+        if job.source_type == "github":
+            def on_progress(phase: str, percent: int) -> None:
+                start, end = _CLONE_PHASES.get(phase, (None, None))
+                progress = state.snapshot["progress"]
+                if start is not None:
+                    progress = start + (end - start) * percent // 100
+                message = f"{phase}: {percent}%"
+                if message != state.snapshot["message"]:
+                    self._emit(job.id, "import.progress", progress=progress, message=message)
+
+            await git_mirrors.clone(job.source_uri, job.local_path, on_progress=on_progress)
+            import_stats = {"storage_mode": "git_clone", "seconds": round(time.monotonic() - started, 3)}
+        else:
+            self._emit(job.id, "import.progress", message="Copying files")
+            copy = asyncio.ensure_future(asyncio.to_thread(
+                workspace_storage.materialize,
+                job.source_uri, job.local_path, job.storage_mode, state.copy_cancelled
+            ))
+            try:
+                import_stats = (await asyncio.shield(copy)).as_dict()
+            except asyncio.CancelledError:
+                # Let the copy threads stop before the partial tree is removed
+                state.copy_cancelled.set()
+                await asyncio.gather(copy, return_exceptions=True)
+                raise
+            print(f"Imported {job.source_uri} ({job.storage_mode}): {import_stats}")
+
+        return import_stats
+
+    async def _complete(self, job: ImportJob, import_stats: dict) -> None:
+        """Create the workspace for a finished checkout and complete the job."""
+        async with async_session_maker() as db:
+            ws_repo = WorkspaceRepository(db)
+            workspace = await ws_repo.get_by_source(job.source_type, job.source_uri)
+            if workspace is not None:
+                # Imported by another request while this job was running
+                await asyncio.to_thread(_remove_checkout, job.local_path)
+            else:
+                try:
+                    workspace = await ws_repo.create(
+                        source_type=job.source_type,
+                        source_uri=job.source_uri,
+                        display_name=job.display_name,
+                        local_path=job.local_path,
+                        storage_mode=job.storage_mode,
+                        tenant_id=job.tenant_id,
+                        metadata_json={"import": import_stats}
+                    )
+                except Exception:
+                    # No workspace row refers to the checkout
+                    await asyncio.to_thread(_remove_checkout, job.local_path)
+                    raise
+
+        await self._finish(job.id, status="completed", progress=100, workspace_id=workspace.id)
+
+
+import_jobs = ImportJobManager()
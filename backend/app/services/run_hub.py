@@ -0,0 +1,287 @@
+"""
+Per-run broadcast hub for the SSE relay.
+
+Every browser tab watching the same run shares one upstream connection to
+the runner. The hub reads the runner stream once, persists each event once
+through the write-behind event sink, and fans the raw SSE blocks out to
+local subscribers through bounded queues.
+
+Every data event is tagged with an SSE `id:` equal to its RunEvent.seq, so
+a reconnecting EventSource sends Last-Event-ID and only receives the
+events it missed.
+
+The Claude runner names each event's type in an SSE `event:` field, so
+the hub persists and forwards those events without parsing their JSON.
+Events are re-framed without the name for the browser, whose EventSource
+only dispatches unnamed events to onmessage.
+
+The hub keeps the most recent RUN_HUB_HISTORY_MAX_BYTES of events for
+late joiners and reconnects. Anyone who needs older events (a new viewer
+of a long run, or a Last-Event-ID from before the retained window) gets
+them from the database first, then continues from the retained history.
+
+A subscriber that falls more than RUN_HUB_SUBSCRIBER_QUEUE_SIZE events
+behind is disconnected instead of slowing down the hub; the browser's
+EventSource reconnects and catches up from the hub history.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from ..database import async_session_maker
+from ..repositories import RunRepository
+from .event_sink import event_sink
+from .runner_client import runner_clients, ROUTE_TIMEOUTS
+
+
+RUN_HUB_SUBSCRIBER_QUEUE_SIZE = int(os.environ.get("RUN_HUB_SUBSCRIBER_QUEUE_SIZE", "1000"))
+RUN_HUB_HISTORY_MAX_BYTES = int(os.environ.get("RUN_HUB_HISTORY_MAX_BYTES", str(4 * 1024 * 1024)))
+
+
+class RunHub:
+    """One upstream runner stream for a run, fanned out to N subscribers."""
+
+    def __init__(
+        self,
+        run_id: uuid.UUID,
+        runner_url: str,
+        stream_path: str,
+        persisted_count: int = 0,
+        history_max_bytes: int = RUN_HUB_HISTORY_MAX_BYTES
+    ):
+        self.run_id = run_id
+        self.runner_url = runner_url
+        self.stream_path = stream_path
+        # The runner replays its whole buffer on connect, so the first
+        # `persisted_count` events have already been stored by an earlier hub.
+        self.persisted_count = persisted_count
+        self.history: deque[tuple[Optional[int], bytes]] = deque()
+        self.history_max_bytes = history_max_bytes
+        self.history_bytes = 0
+        # Highest seq dropped from history (-1: nothing dropped yet)
+        self.evicted_seq = -1
+        self.subscribers: set[asyncio.Queue[tuple[Optional[int], bytes] | None]] = set()
+        self.closed = False
+        self.dropped_subscribers = 0
+        self._seq = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def stream(self, after_seq: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Yield the events seen so far, then live events until the run ends.
+
+        With `after_seq` (the client's Last-Event-ID), only events with a
+        higher seq are sent. Events no longer in history are read from the
+        database.
+        """
+        queue: Optional[asyncio.Queue[tuple[Optional[int], bytes] | None]] = None
+        if not self.closed:
+            # Subscribe before taking the snapshot so nothing published meanwhile is missed
+            queue = asyncio.Queue(maxsize=RUN_HUB_SUBSCRIBER_QUEUE_SIZE)
+            self.subscribers.add(queue)
+            self._ensure_started()
+        backlog = list(self.history)
+        evicted_seq = self.evicted_seq
+        try:
+            if evicted_seq >= 0 and _wanted(evicted_seq, after_seq):
+                async for chunk in self._persisted(after_seq, evicted_seq):
+                    yield chunk
+            for seq, chunk in backlog:
+                if _wanted(seq, after_seq):
+                    yield chunk
+            while queue is not None:
+                item = await queue.get()
+                if item is None:
+                    break
+                seq, chunk = item
+                if _wanted(seq, after_seq):
+                    yield chunk
+        finally:
+            if queue is not None:
+                self.subscribers.discard(queue)
+
+    async def _persisted(self, after_seq: Optional[int], through_seq: int) -> AsyncIterator[bytes]:
+        """Stored events after `after_seq` up to `through_seq`, for what history no longer holds."""
+        # Evicted events were enqueued before they were evicted; make sure they are written
+        await event_sink.flush()
+        async with async_session_maker() as db:
+            events = await RunRepository(db).get_events_after(
+                self.run_id, after_seq if after_seq is not None else -1, through_seq
+            )
+        for e in events:
+            yield format_persisted_event(e.seq, e.raw_json)
+
+    async def close(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _ensure_started(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._pump())
+
+    def _publish(self, chunk: bytes, seq: Optional[int] = None) -> None:
+        item = (seq, chunk)
+        self.history.append(item)
+        self.history_bytes += len(chunk)
+        while self.history_bytes > self.history_max_bytes and len(self.history) > 1:
+            old_seq, old_chunk = self.history.popleft()
+            self.history_bytes -= len(old_chunk)
+            if old_seq is not None:
+                self.evicted_seq = old_seq
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # Slow consumer: drop it rather than stall everyone else
+                self.subscribers.discard(queue)
+                self.dropped_subscribers += 1
+                _close_queue(queue)
+
+    async def _relay(self, event_str: str) -> None:
+        """Assign a seq to a runner event, persist it once and publish it."""
+        event_type = None
+        data = None
+        for line in event_str.split("\n"):
+            if line.startswith("event: "):
+                event_type = line[7:]
+            elif line.startswith("data: "):
+                data = line[6:]
+                break
+
+        raw_json = data
+        if data is not None and event_type is None:
+            # Runners without `event:` framing: the type is only in the JSON
+            try:
+                raw_json = json.loads(data)
+            except json.JSONDecodeError:
+                raw_json = None
+            if isinstance(raw_json, dict):
+                event_type = raw_json.get("type")
+            else:
+                data = None
+
+        if data is None:
+            # Comments and unparsable blocks are relayed but not resumable
+            self._publish((event_str + "\n\n").encode("utf-8"))
+            return
+
+        seq = self._seq
+        self._seq += 1
+        # Browsers listen with EventSource.onmessage, which only sees unnamed events
+        self._publish(f"id: {seq}\ndata: {data}\n\n".encode("utf-8"), seq)
+        if seq >= self.persisted_count:
+            # Waits while the sink is full, which stops reading the runner stream
+            await event_sink.enqueue(
+                run_id=self.run_id,
+                seq=seq,
+                event_type=event_type,
+                raw_json=raw_json
+            )
+
+    async def _pump(self) -> None:
+        try:
+            client = runner_clients.get_stream(self.runner_url)
+            async with client.stream(
+                "GET",
+                self.stream_path,
+                headers={"Accept": "text/event-stream"},
+                timeout=ROUTE_TIMEOUTS["events"],
+            ) as r:
+                if r.status_code >= 400:
+                    body = (await r.aread()).decode("utf-8", errors="replace")
+                    self._publish(f"data: {json.dumps({'type': 'error', 'message': body})}\n\n".encode("utf-8"))
+                    return
+
+                buffer = ""
+                async for chunk in r.aiter_text():
+                    buffer += chunk
+                    while "\n\n" in buffer:
+                        event_str, buffer = buffer.split("\n\n", 1)
+                        await self._relay(event_str)
+        except httpx.HTTPError as e:
+            self._publish(f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n".encode("utf-8"))
+        finally:
+            self.closed = True
+            for queue in list(self.subscribers):
+                try:
+                    queue.put_nowait(None)
+                except asyncio.QueueFull:
+                    _close_queue(queue)
+            self.subscribers.clear()
+            run_hubs.discard(self)
+
+    def stats(self) -> dict:
+        return {
+            "run_id": str(self.run_id),
+            "subscribers": len(self.subscribers),
+            "events": self._seq,
+            "history_bytes": self.history_bytes,
+            "evicted_seq": self.evicted_seq,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
+
+
+def _wanted(seq: Optional[int], after_seq: Optional[int]) -> bool:
+    if after_seq is None:
+        return True
+    return seq is not None and seq > after_seq
+
+
+def format_persisted_event(seq: int, raw_json: dict) -> bytes:
+    """Frame a stored RunEvent as an SSE message carrying its seq as the id."""
+    return f"id: {seq}\ndata: {json.dumps(raw_json)}\n\n".encode("utf-8")
+
+
+def _close_queue(queue: asyncio.Queue) -> None:
+    """Discard anything still buffered and signal end-of-stream."""
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+
+class RunHubRegistry:
+    """Active hubs keyed by run id."""
+
+    def __init__(self):
+        self._hubs: dict[uuid.UUID, RunHub] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_or_create(self, run_id: uuid.UUID, runner_url: str, stream_path: str) -> RunHub:
+        async with self._lock:
+            hub = self._hubs.get(run_id)
+            if hub is None or hub.closed:
+                async with async_session_maker() as db:
+                    persisted_count = await RunRepository(db).count_events(run_id)
+                hub = RunHub(run_id, runner_url, stream_path, persisted_count)
+                self._hubs[run_id] = hub
+            return hub
+
+    def discard(self, hub: RunHub) -> None:
+        if self._hubs.get(hub.run_id) is hub:
+            del self._hubs[hub.run_id]
+
+    async def close_all(self) -> None:
+        for hub in list(self._hubs.values()):
+            await hub.close()
+        self._hubs.clear()
+
+    def stats(self) -> dict:
+        hubs = list(self._hubs.values())
+        return {
+            "active_runs": len(hubs),
+            "subscribers": sum(len(h.subscribers) for h in hubs),
+            "runs": [h.stats() for h in hubs],
+        }
+
+
+run_hubs = RunHubRegistry()
@@ -0,0 +1,131 @@
+"""
+Shared, pooled HTTP clients for backend -> runner traffic.
+
+One httpx.AsyncClient is kept per runner base URL for the lifetime of the
+application, so requests reuse keep-alive connections instead of paying
+for TCP (and TLS) setup on every call. Each runner gets its own connection
+limits, so a busy runner cannot starve the other of sockets.
+
+Event streams hold their connection for the whole run, so they use a
+second client per runner (RUNNER_MAX_STREAM_CONNECTIONS). Live runs then
+cannot use up the pool that prompt submissions and thread creation need.
+"""
+
+import os
+from typing import Optional
+
+import httpx
+
+
+RUNNER_MAX_CONNECTIONS = int(os.environ.get("RUNNER_MAX_CONNECTIONS", "100"))
+RUNNER_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("RUNNER_MAX_KEEPALIVE_CONNECTIONS", "20"))
+# One connection per live run being relayed
+RUNNER_MAX_STREAM_CONNECTIONS = int(os.environ.get("RUNNER_MAX_STREAM_CONNECTIONS", "500"))
+RUNNER_KEEPALIVE_EXPIRY = float(os.environ.get("RUNNER_KEEPALIVE_EXPIRY", "30"))
+RUNNER_HTTP2 = os.environ.get("RUNNER_HTTP2", "false").lower() == "true"
+
+# Per-route timeouts
+ROUTE_TIMEOUTS = {
+    "threads": httpx.Timeout(60.0, connect=5.0),
+    "runs": httpx.Timeout(60.0, connect=5.0),
+    "events": httpx.Timeout(None, connect=10.0),  # long-lived SSE stream
+    "health": httpx.Timeout(5.0),
+}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class RunnerClientPool:
+    """Application-scoped httpx clients keyed by runner base URL."""
+
+    def __init__(self):
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._stream_clients: dict[str, httpx.AsyncClient] = {}
+        self._requests: dict[str, int] = {}
+        self._http2 = RUNNER_HTTP2 and _http2_available()
+        if RUNNER_HTTP2 and not self._http2:
+            print("RUNNER_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+
+    def open(self, base_urls: list[str]) -> None:
+        """Create clients up front for the configured runners."""
+        for base_url in base_urls:
+            self.get(base_url)
+            self.get_stream(base_url)
+
+    def get(self, base_url: str) -> httpx.AsyncClient:
+        """Client for short requests (threads, runs, health)."""
+        return self._get(self._clients, base_url, RUNNER_MAX_CONNECTIONS, RUNNER_MAX_KEEPALIVE_CONNECTIONS)
+
+    def get_stream(self, base_url: str) -> httpx.AsyncClient:
+        """Client for long-lived event streams, with its own connection pool."""
+        return self._get(self._stream_clients, base_url, RUNNER_MAX_STREAM_CONNECTIONS, RUNNER_MAX_KEEPALIVE_CONNECTIONS)
+
+    def _get(
+        self,
+        clients: dict[str, httpx.AsyncClient],
+        base_url: str,
+        max_connections: int,
+        max_keepalive_connections: int
+    ) -> httpx.AsyncClient:
+        base_url = base_url.rstrip("/")
+        client = clients.get(base_url)
+        if client is None or client.is_closed:
+            self._requests.setdefault(base_url, 0)
+
+            async def count_request(request: httpx.Request, base_url: str = base_url) -> None:
+                self._requests[base_url] += 1
+
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                http2=self._http2,
+                timeout=ROUTE_TIMEOUTS["runs"],
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=RUNNER_KEEPALIVE_EXPIRY,
+                ),
+                event_hooks={"request": [count_request]},
+            )
+            clients[base_url] = client
+        return client
+
+    async def aclose(self) -> None:
+        for client in [*self._clients.values(), *self._stream_clients.values()]:
+            await client.aclose()
+        self._clients.clear()
+        self._stream_clients.clear()
+
+    def stats(self) -> dict:
+        runners = {}
+        for base_url in self._clients.keys() | self._stream_clients.keys():
+            runners[base_url] = {"requests": self._requests.get(base_url, 0)}
+            if base_url in self._clients:
+                runners[base_url].update({
+                    "max_connections": RUNNER_MAX_CONNECTIONS,
+                    **_pool_usage(self._clients[base_url]),
+                })
+            if base_url in self._stream_clients:
+                runners[base_url]["streams"] = {
+                    "max_connections": RUNNER_MAX_STREAM_CONNECTIONS,
+                    **_pool_usage(self._stream_clients[base_url]),
+                }
+        return {"http2": self._http2, "runners": runners}
+
+
+def _pool_usage(client: httpx.AsyncClient) -> dict[str, Optional[int]]:
+    """Best-effort connection counts from the underlying httpcore pool."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return {"connections": None, "idle": None, "active": None}
+    idle = sum(1 for c in connections if c.is_idle())
+    return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+runner_clients = RunnerClientPool()
@@ -0,0 +1,98 @@
+"""
+Dashboard statistics served from materialized counters.
+
+Counts come from the dashboard_counters / dashboard_runs_daily tables,
+which the repositories keep up to date on every create, delete and run
+status change. The assembled dashboard payload is cached per scope for
+DASHBOARD_STATS_TTL_SECONDS, so auto-refreshing dashboards cost a dict
+lookup instead of a round of COUNT queries.
+
+workspaces_count is the number of registered workspaces. Unlike the old
+per-request count it includes workspaces whose folder is missing on disk
+(list_workspaces still hides those).
+
+recent_activity[].created_at is left as a datetime; the endpoint formats
+it with the API's _format_datetime.
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..auth.rbac import is_super_admin, tenant_filter
+from ..models import Run, Session, User, Workspace
+from ..repositories.stats_repo import StatsRepository, GLOBAL_SCOPE, tenant_scope
+
+
+DASHBOARD_STATS_TTL_SECONDS = float(os.environ.get("DASHBOARD_STATS_TTL_SECONDS", "10"))
+
+_snapshots: dict[str, tuple[float, dict]] = {}
+
+
+def _scopes_for(user: Optional[User]) -> tuple[str, list[str]]:
+    """Cache key and counter scopes visible to a user (mirrors tenant_filter)."""
+    if user is None or is_super_admin(user):
+        return GLOBAL_SCOPE, [GLOBAL_SCOPE]
+    if user.tenant_id is None:
+        return tenant_scope(None), [tenant_scope(None)]
+    return tenant_scope(user.tenant_id), [tenant_scope(user.tenant_id), tenant_scope(None)]
+
+
+async def ensure_counters(db: AsyncSession) -> None:
+    """Backfill the counters from the source tables the first time they are used."""
+    stats_repo = StatsRepository(db)
+    if await stats_repo.has_counters():
+        return
+    # Replicas starting together take turns; the later ones find the counters built
+    await stats_repo.lock_rebuild()
+    if await stats_repo.has_counters():
+        await db.rollback()
+        return
+    await stats_repo.rebuild()
+
+
+async def get_dashboard_snapshot(db: AsyncSession, user: Optional[User] = None) -> dict:
+    cache_key, scopes = _scopes_for(user)
+    cached = _snapshots.get(cache_key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    stats_repo = StatsRepository(db)
+    counters = await stats_repo.get_counters(scopes)
+    runs_today = await stats_repo.get_runs_on(scopes, datetime.now(timezone.utc).date())
+
+    # Recent activity (last 10 runs)
+    query = (
+        select(Run, Session, Workspace)
+        .join(Session, Run.session_id == Session.id)
+        .join(Workspace, Session.workspace_id == Workspace.id)
+        .order_by(Run.created_at.desc())
+        .limit(10)
+    )
+    if user:
+        query = tenant_filter(query, Run, user)
+    recent_runs_result = await db.execute(query)
+    recent_activity = []
+    for run, session, workspace in recent_runs_result.all():
+        recent_activity.append({
+            "type": "run",
+            "status": run.status,
+            "workspace_name": workspace.display_name,
+            "runner_type": session.runner_type,
+            "prompt_preview": run.prompt[:50] + "..." if len(run.prompt) > 50 else run.prompt,
+            "created_at": run.created_at
+        })
+
+    snapshot = {
+        "workspaces_count": counters["workspaces_count"],
+        "sessions_count": counters["sessions_count"],
+        "runs_today": runs_today,
+        "runs_total": counters["runs_total"],
+        "recent_activity": recent_activity,
+    }
+    _snapshots[cache_key] = (time.monotonic() + DASHBOARD_STATS_TTL_SECONDS, snapshot)
+    return snapshot
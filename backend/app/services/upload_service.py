@@ -0,0 +1,192 @@
+"""
+Resumable chunked uploads.
+
+A client opens an upload session with the final size, then PUTs the file
+in chunks, each tagged with the byte offset it starts at. If a proxy cuts
+a request off, the client asks for the current offset and continues from
+there instead of starting over.
+
+Parts are written under <WORKSPACES_ROOT>/.uploads/ with a small JSON
+sidecar, so sessions survive a backend restart. The scanner ignores the
+directory because it has no repo/ subfolder.
+
+Single-request multipart uploads are capped by UploadSizeLimit, which
+counts the request body as it is received. Starlette spools a multipart
+body to temp files before the endpoint runs, so a size check in the
+endpoint would only happen after the disk space had been used.
+"""
+
+import asyncio
+import json
+import os
+import pathlib
+import re
+import time
+import uuid
+from typing import AsyncIterator, Literal
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .file_service import MAX_UPLOAD_SIZE, MAX_SINGLE_FILE_UPLOAD
+
+
+UploadKind = Literal["workspace", "file"]
+
+UPLOAD_SESSION_TTL_SECONDS = int(os.environ.get("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+UPLOAD_WRITE_BUFFER_SIZE = 1024 * 1024
+# Room for multipart boundaries, part headers and small form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+_MAX_SIZES = {
+    "workspace": MAX_UPLOAD_SIZE,
+    "file": MAX_SINGLE_FILE_UPLOAD,
+}
+
+
+class UploadStore:
+    """On-disk upload sessions: <id>.part holds the bytes, <id>.json the metadata."""
+
+    def __init__(self, workspaces_root: str):
+        self.root = pathlib.Path(workspaces_root) / ".uploads"
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _part_path(self, upload_id: str) -> pathlib.Path:
+        return self.root / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> pathlib.Path:
+        return self.root / f"{upload_id}.json"
+
+    def create(self, filename: str, total_size: int, kind: UploadKind) -> dict:
+        max_size = _MAX_SIZES[kind]
+        if total_size > max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload too large. Maximum size: {max_size // 1024 // 1024}MB"
+            )
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.purge_expired()
+
+        upload_id = str(uuid.uuid4())
+        meta = {
+            "upload_id": upload_id,
+            "filename": pathlib.Path(filename).name,
+            "total_size": total_size,
+            "kind": kind,
+            "created_at": time.time(),
+        }
+        self._part_path(upload_id).touch()
+        self._meta_path(upload_id).write_text(json.dumps(meta))
+        return {**meta, "offset": 0}
+
+    def get(self, upload_id: str) -> dict:
+        try:
+            uuid.UUID(upload_id)
+            meta = json.loads(self._meta_path(upload_id).read_text())
+            offset = self._part_path(upload_id).stat().st_size
+        except (ValueError, OSError):
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return {**meta, "offset": offset}
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> dict:
+        """Append a chunk that starts at `offset`; the size limit is enforced as bytes arrive."""
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        async with lock:
+            upload = self.get(upload_id)
+            if offset != upload["offset"]:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "Offset mismatch", "offset": upload["offset"]}
+                )
+
+            written = upload["offset"]
+            pending: list[bytes] = []
+            pending_size = 0
+            with open(self._part_path(upload_id), "ab") as f:
+                async for chunk in chunks:
+                    written += len(chunk)
+                    if written > upload["total_size"]:
+                        raise HTTPException(status_code=413, detail="Chunk exceeds declared upload size")
+                    pending.append(chunk)
+                    pending_size += len(chunk)
+                    if pending_size >= UPLOAD_WRITE_BUFFER_SIZE:
+                        await asyncio.to_thread(f.write, b"".join(pending))
+                        pending.clear()
+                        pending_size = 0
+                if pending:
+                    await asyncio.to_thread(f.write, b"".join(pending))
+
+            return {**upload, "offset": written}
+
+    def open_completed(self, upload_id: str, kind: UploadKind) -> tuple[dict, pathlib.Path]:
+        """Return metadata and the part file of a fully received upload."""
+        upload = self.get(upload_id)
+        if upload["kind"] != kind:
+            raise HTTPException(status_code=400, detail=f"Upload is not a {kind} upload")
+        if upload["offset"] != upload["total_size"]:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Upload incomplete", "offset": upload["offset"]}
+            )
+        return upload, self._part_path(upload_id)
+
+    def discard(self, upload_id: str) -> None:
+        self._part_path(upload_id).unlink(missing_ok=True)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+        self._locks.pop(upload_id, None)
+
+    def purge_expired(self) -> None:
+        cutoff = time.time() - UPLOAD_SESSION_TTL_SECONDS
+        for meta_path in self.root.glob("*.json"):
+            part_path = self._part_path(meta_path.stem)
+            try:
+                last_activity = part_path.stat().st_mtime if part_path.exists() else meta_path.stat().st_mtime
+            except OSError:
+                continue
+            if last_activity < cutoff:
+                self.discard(meta_path.stem)
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware capping the request body of multipart upload routes.
+
+    `limits` maps a path regex to (max file size, 413 detail). An upload is
+    rejected up front when its Content-Length is over the limit, and
+    otherwise as soon as the body read so far passes it, before the rest
+    is received or spooled to disk.
+    """
+
+    def __init__(self, app: ASGIApp, limits: list[tuple[str, int, str]]):
+        self.app = app
+        self.limits = [(re.compile(pattern), max_size + MULTIPART_OVERHEAD, detail) for pattern, max_size, detail in limits]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = next(((size, detail) for regex, size, detail in self.limits if regex.match(scope["path"])), None)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        max_body, detail = limit
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    # Raised inside the form parser; FastAPI passes HTTPException through as the response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
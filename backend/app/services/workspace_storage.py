@@ -0,0 +1,203 @@
+"""
+Materialising local sources into workspaces.
+
+How a local import is laid out under WORKSPACES_ROOT is chosen by
+Workspace.storage_mode:
+
+- managed_copy: an independent copy, with files copied by a thread pool
+  instead of one at a time.
+- reflink: a copy-on-write clone of every file (FICLONE on btrfs, XFS,
+  ...). Only metadata is written until a file is modified.
+- hardlink: a hardlink farm. Instant and takes no space, but the
+  workspace shares inodes with the source, so in-place edits are visible
+  in the source tree too. Only use it for disposable source snapshots.
+
+reflink and hardlink fall back to the parallel copy as soon as the
+filesystem refuses (unsupported, different device, ...).
+
+An import request may ask for managed_copy or reflink. hardlink would let
+agent edits write straight through to the source tree, so it is only
+used when the server itself is configured with
+WORKSPACE_STORAGE_MODE=hardlink.
+"""
+
+import errno
+import os
+import shutil
+import stat
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Literal, Optional
+
+
+StorageMode = Literal["managed_copy", "reflink", "hardlink"]
+
+WORKSPACE_STORAGE_MODE = os.environ.get("WORKSPACE_STORAGE_MODE", "managed_copy")
+WORKSPACE_COPY_THREADS = int(os.environ.get("WORKSPACE_COPY_THREADS", str(min(32, (os.cpu_count() or 1) * 4))))
+
+# Modes an import request may choose; anything else must be the server default
+REQUESTABLE_STORAGE_MODES = ("managed_copy", "reflink")
+
+# Bound on queued file transfers, so huge trees do not build a huge futures list
+_MAX_PENDING_TRANSFERS = 1024
+
+# linux/fs.h: _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
+# errnos meaning "this filesystem cannot do that", as opposed to real I/O errors
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS, errno.EMLINK}
+
+
+class CopyCancelled(Exception):
+    pass
+
+
+@dataclass
+class MaterializeStats:
+    storage_mode: str
+    files: int = 0
+    bytes_total: int = 0
+    bytes_written: int = 0
+    reflinked: int = 0
+    hardlinked: int = 0
+    copied: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def storage_mode_allowed(mode: str) -> bool:
+    """Whether an import request may ask for `mode`."""
+    return mode in REQUESTABLE_STORAGE_MODES or mode == WORKSPACE_STORAGE_MODE
+
+
+def _reflink(src: str, dst: str) -> None:
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+
+
+class _Transfer:
+    """Per-file transfer for one materialize() call; shared by the pool threads."""
+
+    def __init__(self, mode: str, stats: MaterializeStats, cancelled: Optional[threading.Event]):
+        self.mode = mode
+        self.stats = stats
+        self.cancelled = cancelled
+        self.lock = threading.Lock()
+        self.can_link = mode == "hardlink"
+        self.can_reflink = mode == "reflink"
+
+    def __call__(self, src: str, dst: str, size: int) -> None:
+        if self.cancelled is not None and self.cancelled.is_set():
+            raise CopyCancelled()
+
+        if self.can_link:
+            try:
+                os.link(src, dst)
+                self._count(size, "hardlinked")
+                return
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                self.can_link = False
+
+        if self.can_reflink:
+            try:
+                _reflink(src, dst)
+                shutil.copystat(src, dst)
+                self._count(size, "reflinked")
+                return
+            except (OSError, ImportError) as e:
+                if isinstance(e, OSError) and e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                self.can_reflink = False
+                try:
+                    os.unlink(dst)
+                except FileNotFoundError:
+                    pass
+
+        shutil.copy2(src, dst)
+        self._count(size, "copied", written=size)
+
+    def _count(self, size: int, method: str, written: int = 0) -> None:
+        with self.lock:
+            self.stats.files += 1
+            self.stats.bytes_total += size
+            self.stats.bytes_written += written
+            setattr(self.stats, method, getattr(self.stats, method) + 1)
+
+
+def _drain(futures: list[Future], limit: int) -> list[Future]:
+    """Wait until at most `limit` transfers are pending, re-raising the first failure."""
+    while len(futures) > limit:
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            future.result()
+        futures = list(pending)
+    return futures
+
+
+def materialize(
+    source: str,
+    dest: str,
+    mode: str = WORKSPACE_STORAGE_MODE,
+    cancelled: Optional[threading.Event] = None
+) -> MaterializeStats:
+    """
+    Recreate the `source` directory at `dest` (which must not exist yet).
+
+    Symlinks are recreated as symlinks and special files are skipped, like
+    shutil.copytree. Blocking; run it in a thread.
+    """
+    started = time.monotonic()
+    stats = MaterializeStats(storage_mode=mode)
+    transfer = _Transfer(mode, stats, cancelled)
+    directories: list[tuple[str, str]] = []
+
+    os.makedirs(dest)
+    with ThreadPoolExecutor(max_workers=WORKSPACE_COPY_THREADS, thread_name_prefix="workspace-copy") as pool:
+        futures: list[Future] = []
+        try:
+            for dirpath, dirnames, filenames in os.walk(source):
+                if cancelled is not None and cancelled.is_set():
+                    raise CopyCancelled()
+                rel = os.path.relpath(dirpath, source)
+                target_dir = dest if rel == "." else os.path.join(dest, rel)
+                directories.append((dirpath, target_dir))
+
+                subdirs = []
+                for name in dirnames:
+                    src = os.path.join(dirpath, name)
+                    if os.path.islink(src):
+                        os.symlink(os.readlink(src), os.path.join(target_dir, name))
+                    else:
+                        os.mkdir(os.path.join(target_dir, name))
+                        subdirs.append(name)
+                dirnames[:] = subdirs
+
+                for name in filenames:
+                    src = os.path.join(dirpath, name)
+                    dst = os.path.join(target_dir, name)
+                    st = os.lstat(src)
+                    if stat.S_ISLNK(st.st_mode):
+                        os.symlink(os.readlink(src), dst)
+                    elif stat.S_ISREG(st.st_mode):
+                        futures.append(pool.submit(transfer, src, dst, st.st_size))
+                futures = _drain(futures, _MAX_PENDING_TRANSFERS)
+
+            _drain(futures, 0)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    # Directory timestamps last, once their contents stop changing
+    for src_dir, dst_dir in reversed(directories):
+        shutil.copystat(src_dir, dst_dir)
+
+    stats.seconds = round(time.monotonic() - started, 3)
+    return stats
@@ -0,0 +1,117 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.services import event_sink as event_sink_module
+from app.services.event_sink import RunEventSink
+
+
+class FakeDatabase:
+    """Committed rows and statuses, plus the errors the next add_events calls should raise."""
+
+    def __init__(self):
+        self.events: list[tuple[uuid.UUID, int]] = []
+        self.statuses: dict[uuid.UUID, str] = {}
+        self.failures: list[Exception] = []
+        self.commits = 0
+
+
+class FakeSession:
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.staged_events: list[tuple[uuid.UUID, int]] = []
+        self.staged_statuses: dict[uuid.UUID, str] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        self.database.events += self.staged_events
+        self.database.statuses.update(self.staged_statuses)
+        self.database.commits += 1
+
+
+class FakeRunRepository:
+    def __init__(self, db: FakeSession):
+        self.db = db
+
+    async def add_events(self, events, commit=True):
+        if self.db.database.failures:
+            raise self.db.database.failures.pop(0)
+        self.db.staged_events += [(e["run_id"], e["seq"]) for e in events]
+        assert not commit
+
+    async def update_status(self, run_id, status, completed_at=None, commit=True):
+        self.db.staged_statuses[run_id] = status
+        assert not commit
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(event_sink_module, "async_session_maker", lambda: FakeSession(database))
+    monkeypatch.setattr(event_sink_module, "RunRepository", FakeRunRepository)
+    return database
+
+
+def _connection_error():
+    return OperationalError("INSERT", {}, ConnectionRefusedError("connection refused"))
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_are_retried_in_order(database):
+    database.failures = [_connection_error(), _connection_error()]
+    sink = RunEventSink(flush_interval_ms=0, max_retries=1, retry_base_ms=1)
+    sink.start()
+    run_id = uuid.uuid4()
+
+    for seq, event_type in enumerate(["run.started", "ui.message.user", "run.completed"]):
+        await sink.enqueue(run_id, seq, event_type, {"type": event_type})
+    await sink.flush()
+    await sink.stop()
+
+    assert database.events == [(run_id, 0), (run_id, 1), (run_id, 2)]
+    assert database.statuses == {run_id: "completed"}
+    assert sink.stats()["retries"] == 2
+    assert sink.stats()["events_dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_terminal_status_survives_a_rejected_batch(database):
+    database.failures = [IntegrityError("INSERT", {}, ValueError("bad row"))] * 2
+    sink = RunEventSink(flush_interval_ms=0, max_retries=2, retry_base_ms=1)
+    sink.start()
+    run_id = uuid.uuid4()
+
+    await sink.enqueue(run_id, 0, "error", {"type": "error"})
+    await sink.flush()
+    await sink.stop()
+
+    assert database.events == []
+    assert database.statuses == {run_id: "error"}
+    assert sink.stats()["events_dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_enqueue_waits_while_the_queue_is_full(database):
+    sink = RunEventSink(flush_interval_ms=0, max_queue=2)
+    run_id = uuid.uuid4()
+    await sink.enqueue(run_id, 0, "ui.iteration", {})
+    await sink.enqueue(run_id, 1, "ui.iteration", {})
+
+    blocked = asyncio.create_task(sink.enqueue(run_id, 2, "ui.iteration", {}))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    sink.start()
+    await asyncio.wait_for(blocked, 1)
+    await sink.flush()
+    await sink.stop()
+
+    assert [seq for _, seq in database.events] == [0, 1, 2]
+    assert sink.stats()["backpressure_waits"] == 1
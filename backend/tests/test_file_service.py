@@ -0,0 +1,44 @@
+import asyncio
+import io
+import os
+import zipfile
+
+import pytest
+
+from app.services import file_service
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("print('hi')\n" * 1000)
+    (tmp_path / "blob.bin").write_bytes(os.urandom(4 * 1024 * 1024))
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_streamed_zip_is_complete(workspace):
+    chunks, name = file_service.stream_zip_from_directory(str(workspace), "/", "deflate", 9)
+    data = b"".join([chunk async for chunk in chunks])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert sorted(zf.namelist()) == ["blob.bin", "src/app.py"]
+        assert zf.read("src/app.py") == (workspace / "src" / "app.py").read_bytes()
+        assert zf.getinfo("src/app.py").compress_type == zipfile.ZIP_DEFLATED
+    assert name == workspace.name + ".zip"
+
+
+@pytest.mark.asyncio
+async def test_disconnect_stops_the_producer_before_freeing_its_slot(workspace, monkeypatch):
+    slots = asyncio.Semaphore(1)
+    monkeypatch.setattr(file_service, "_zip_download_slots", slots)
+    chunks, _ = file_service.stream_zip_from_directory(str(workspace), "/", "store")
+
+    await chunks.__anext__()
+    assert slots.locked()
+    await chunks.aclose()
+
+    # Released by the producer thread once it has stopped
+    await asyncio.wait_for(slots.acquire(), 5)
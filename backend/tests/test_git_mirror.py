@@ -0,0 +1,108 @@
+import subprocess
+
+import pytest
+
+from app.services.git_mirror import GitMirrorCache
+from app.services.git_service import GitError
+
+
+def _git(*args, cwd=None):
+    subprocess.run(
+        ["git", "-c", "user.email=test@example.com", "-c", "user.name=test", *args],
+        cwd=cwd, check=True, capture_output=True
+    )
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    repo = tmp_path / "upstream"
+    repo.mkdir()
+    _git("init", "-q", "-b", "main", cwd=repo)
+    (repo / "README.md").write_text("v1\n")
+    _git("add", ".", cwd=repo)
+    _git("commit", "-q", "-m", "v1", cwd=repo)
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_second_clone_is_served_from_mirror(tmp_path, upstream):
+    cache = GitMirrorCache(str(tmp_path / "mirrors"), max_bytes=1024 ** 3, enabled=True)
+    url = f"file://{upstream}"
+
+    await cache.clone(url, str(tmp_path / "ws1" / "repo"))
+    await cache.clone(url, str(tmp_path / "ws2" / "repo"))
+
+    assert cache.misses == 1
+    assert cache.hits == 1
+    assert (tmp_path / "ws2" / "repo" / "README.md").read_text() == "v1\n"
+    remote = subprocess.run(
+        ["git", "remote", "get-url", "origin"],
+        cwd=tmp_path / "ws2" / "repo", capture_output=True, text=True
+    ).stdout.strip()
+    assert remote == url
+
+
+@pytest.mark.asyncio
+async def test_stale_mirror_is_fetched_before_clone(tmp_path, upstream, monkeypatch):
+    monkeypatch.setattr("app.services.git_mirror.GIT_MIRROR_REFRESH_SECONDS", 0)
+    cache = GitMirrorCache(str(tmp_path / "mirrors"), max_bytes=1024 ** 3, enabled=True)
+    url = f"file://{upstream}"
+
+    await cache.clone(url, str(tmp_path / "ws1" / "repo"))
+    (upstream / "README.md").write_text("v2\n")
+    _git("commit", "-q", "-am", "v2", cwd=upstream)
+    await cache.clone(url, str(tmp_path / "ws2" / "repo"))
+
+    assert (tmp_path / "ws2" / "repo" / "README.md").read_text() == "v2\n"
+
+
+@pytest.mark.asyncio
+async def test_lru_mirror_is_evicted_over_budget(tmp_path, upstream):
+    other = tmp_path / "other"
+    _git("clone", "-q", str(upstream), str(other))
+    cache = GitMirrorCache(str(tmp_path / "mirrors"), max_bytes=1, enabled=True)
+
+    await cache.clone(f"file://{upstream}", str(tmp_path / "ws1" / "repo"))
+    await cache.clone(f"file://{other}", str(tmp_path / "ws2" / "repo"))
+
+    assert cache.evictions == 2
+    assert cache.stats()["mirrors"] == 0
+    # Checkouts do not depend on the evicted mirrors
+    assert (tmp_path / "ws1" / "repo" / "README.md").exists()
+    _git("log", "-1", cwd=tmp_path / "ws1" / "repo")
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_direct_clone_when_mirror_fails(tmp_path, upstream, monkeypatch):
+    cache = GitMirrorCache(str(tmp_path / "mirrors"), max_bytes=1024 ** 3, enabled=True)
+
+    async def broken_mirror(*args):
+        raise GitError("git clone failed: no space left on device")
+
+    monkeypatch.setattr(cache, "_ensure", broken_mirror)
+    await cache.clone(f"file://{upstream}", str(tmp_path / "ws1" / "repo"))
+
+    assert cache.fallbacks == 1
+    assert (tmp_path / "ws1" / "repo" / "README.md").exists()
+
+
+@pytest.mark.asyncio
+async def test_mirror_holds_branches_and_tags_only(tmp_path, upstream):
+    _git("checkout", "-q", "-b", "feature", cwd=upstream)
+    (upstream / "README.md").write_text("feature\n")
+    _git("commit", "-q", "-am", "feature", cwd=upstream)
+    _git("tag", "v1", cwd=upstream)
+    _git("update-ref", "refs/pull/1/head", "feature", cwd=upstream)
+    _git("checkout", "-q", "main", cwd=upstream)
+    cache = GitMirrorCache(str(tmp_path / "mirrors"), max_bytes=1024 ** 3, enabled=True)
+
+    await cache.clone(f"file://{upstream}", str(tmp_path / "ws1" / "repo"))
+
+    mirror = next((tmp_path / "mirrors").glob("*.git"))
+    refs = subprocess.run(
+        ["git", "for-each-ref", "--format=%(refname)"],
+        cwd=mirror, capture_output=True, text=True
+    ).stdout.split()
+    assert sorted(refs) == ["refs/heads/feature", "refs/heads/main", "refs/tags/v1"]
+    # The checkout follows upstream's default branch
+    assert (tmp_path / "ws1" / "repo" / "README.md").read_text() == "v1\n"
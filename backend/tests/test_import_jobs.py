@@ -0,0 +1,179 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+
+from app.services import import_jobs as import_jobs_module
+from app.services.import_jobs import ImportJobManager
+
+
+class FakeDatabase:
+    """Job rows and workspaces, plus repository calls to hold until released."""
+
+    def __init__(self):
+        self.jobs: dict[uuid.UUID, SimpleNamespace] = {}
+        self.workspaces: list[SimpleNamespace] = []
+        self.removed: list[str] = []
+        self.holds: dict[str, asyncio.Event] = {}
+        self.reached: dict[str, asyncio.Event] = {}
+
+    def hold(self, call: str) -> asyncio.Event:
+        """Hold the next `call` until the returned event is set."""
+        self.holds[call] = asyncio.Event()
+        self.reached[call] = asyncio.Event()
+        return self.holds[call]
+
+    async def gate(self, call: str) -> None:
+        if call in self.holds:
+            self.reached[call].set()
+            await self.holds.pop(call).wait()
+
+
+class FakeSession:
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeImportJobRepository:
+    def __init__(self, db: FakeSession):
+        self.database = db.database
+
+    async def create(self, owner=None, **fields):
+        now = datetime.now(timezone.utc)
+        job = SimpleNamespace(
+            id=uuid.uuid4(), status="queued", progress=0, message=None, error=None, workspace_id=None,
+            owner=owner, created_at=now, heartbeat_at=now, **fields
+        )
+        self.database.jobs[job.id] = job
+        return job
+
+    async def get_by_id(self, job_id):
+        return self.database.jobs.get(job_id)
+
+    async def update(self, job_id, **fields):
+        await self.database.gate("job.update")
+        for name, value in fields.items():
+            setattr(self.database.jobs[job_id], name, value)
+
+    async def heartbeat(self, job_ids, owner):
+        for job_id in job_ids:
+            self.database.jobs[job_id].heartbeat_at = datetime.now(timezone.utc)
+
+    async def fail_stale(self, cutoff, error):
+        stale = [
+            job for job in self.database.jobs.values()
+            if job.status in ("queued", "running") and job.heartbeat_at < cutoff
+        ]
+        for job in stale:
+            job.status, job.error = "failed", error
+        return len(stale)
+
+
+class FakeWorkspaceRepository:
+    def __init__(self, db: FakeSession):
+        self.database = db.database
+
+    async def get_by_source(self, source_type, source_uri):
+        return None
+
+    async def create(self, **fields):
+        await self.database.gate("workspace.create")
+        workspace = SimpleNamespace(id=uuid.uuid4(), **fields)
+        self.database.workspaces.append(workspace)
+        return workspace
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(import_jobs_module, "async_session_maker", lambda: FakeSession(database))
+    monkeypatch.setattr(import_jobs_module, "ImportJobRepository", FakeImportJobRepository)
+    monkeypatch.setattr(import_jobs_module, "WorkspaceRepository", FakeWorkspaceRepository)
+    monkeypatch.setattr(import_jobs_module, "_remove_checkout", database.removed.append)
+    return database
+
+
+@pytest_asyncio.fixture
+async def manager(database, monkeypatch):
+    manager = ImportJobManager(workers=1, heartbeat_seconds=0.01, stale_seconds=60)
+
+    async def fake_import(job, state):
+        await asyncio.sleep(0)
+        return {"storage_mode": job.storage_mode}
+
+    monkeypatch.setattr(manager, "_import", fake_import)
+    await manager.start()
+    yield manager
+    await manager.stop()
+
+
+async def _submit(manager, name):
+    return await manager.submit("local", f"/src/{name}", name, f"/workspaces/{name}/repo")
+
+
+async def _wait_for(database, job_id, status):
+    for _ in range(200):
+        if database.jobs[job_id].status == status:
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"job status {database.jobs[job_id].status!r}, expected {status!r}")
+
+
+@pytest.mark.asyncio
+async def test_cancel_while_starting_cancels_the_job_and_keeps_the_worker(manager, database):
+    release = database.hold("job.update")
+    job = await _submit(manager, "a")
+    await database.reached["job.update"].wait()
+
+    assert await manager.cancel(job.id)
+    release.set()
+    await _wait_for(database, job.id, "cancelled")
+
+    # The same worker picks up the next job
+    other = await _submit(manager, "b")
+    await _wait_for(database, other.id, "completed")
+    assert database.removed == []
+
+
+@pytest.mark.asyncio
+async def test_cancel_is_refused_once_the_workspace_is_being_created(manager, database):
+    release = database.hold("workspace.create")
+    job = await _submit(manager, "a")
+    await database.reached["workspace.create"].wait()
+
+    assert not await manager.cancel(job.id)
+    release.set()
+    await _wait_for(database, job.id, "completed")
+
+    assert database.removed == []
+    assert database.jobs[job.id].workspace_id == database.workspaces[0].id
+
+
+@pytest.mark.asyncio
+async def test_only_jobs_without_a_recent_heartbeat_are_failed(database):
+    repo = FakeImportJobRepository(FakeSession(database))
+    live = await repo.create(owner="other-replica", source_type="local", source_uri="/src/live")
+    dead = await repo.create(owner="crashed-replica", source_type="local", source_uri="/src/dead")
+    dead.heartbeat_at -= timedelta(minutes=10)
+
+    manager = ImportJobManager(workers=0, heartbeat_seconds=0.01, stale_seconds=60)
+    await manager.start()
+    queued = await _submit(manager, "mine")
+    stamped = database.jobs[queued.id].heartbeat_at
+    await asyncio.sleep(0.05)
+    await manager.stop()
+
+    assert database.jobs[live.id].status == "queued"
+    assert database.jobs[dead.id].status == "failed"
+    assert database.jobs[queued.id].owner == manager.owner
+    assert database.jobs[queued.id].heartbeat_at > stamped
+    assert manager.stats()["stale_failed"] == 1
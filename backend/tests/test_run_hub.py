@@ -0,0 +1,81 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services import run_hub as run_hub_module
+from app.services.run_hub import RunHub
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _hub(monkeypatch, stored_seqs, queries):
+    class FakeRunRepository:
+        def __init__(self, db):
+            pass
+
+        async def get_events_after(self, run_id, after_seq=-1, through_seq=None):
+            queries.append((after_seq, through_seq))
+            return [
+                SimpleNamespace(seq=seq, raw_json={"type": "ui.iteration", "n": seq})
+                for seq in stored_seqs if after_seq < seq <= through_seq
+            ]
+
+    monkeypatch.setattr(run_hub_module, "async_session_maker", FakeSession)
+    monkeypatch.setattr(run_hub_module, "RunRepository", FakeRunRepository)
+    hub = RunHub(uuid.uuid4(), "http://runner", "/runs/r/events", history_max_bytes=100)
+    for seq in range(10):
+        hub._publish(f'id: {seq}\ndata: {{"n":{seq}}}\n\n'.encode(), seq)
+    hub.closed = True
+    return hub
+
+
+async def _seqs(hub, after_seq=None):
+    return [int(chunk.split(b"\n")[0][4:]) async for chunk in hub.stream(after_seq)]
+
+
+@pytest.mark.asyncio
+async def test_history_is_bounded_and_older_events_come_from_the_database(monkeypatch):
+    queries = []
+    hub = _hub(monkeypatch, range(10), queries)
+
+    assert hub.history_bytes <= 100
+    assert hub.evicted_seq == 5
+    assert await _seqs(hub) == list(range(10))
+    assert queries == [(-1, 5)]
+
+
+@pytest.mark.asyncio
+async def test_resume_inside_history_skips_the_database(monkeypatch):
+    queries = []
+    hub = _hub(monkeypatch, range(10), queries)
+
+    assert await _seqs(hub, after_seq=7) == [8, 9]
+    assert await _seqs(hub, after_seq=4) == [5, 6, 7, 8, 9]
+    assert queries == [(4, 5)]
+
+
+@pytest.mark.asyncio
+async def test_runner_error_body_is_published_as_json(monkeypatch):
+    body = 'Run "r" not found \u2014 d\u00e9j\u00e0 vu'
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(404, text=body)),
+        base_url="http://runner"
+    )
+    monkeypatch.setattr(run_hub_module.runner_clients, "get_stream", lambda url: client)
+    hub = RunHub(uuid.uuid4(), "http://runner", "/runs/r/events")
+
+    await hub._pump()
+    await client.aclose()
+
+    [(_, chunk)] = hub.history
+    assert chunk.startswith(b"data: ") and chunk.endswith(b"\n\n")
+    assert json.loads(chunk[6:]) == {"type": "error", "message": body}
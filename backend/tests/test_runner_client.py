@@ -0,0 +1,32 @@
+import pytest
+
+from app.services.runner_client import RunnerClientPool
+
+
+@pytest.mark.asyncio
+async def test_one_client_per_runner_and_a_separate_stream_pool():
+    pool = RunnerClientPool()
+    try:
+        client = pool.get("http://runner-a:8000/")
+
+        assert pool.get("http://runner-a:8000") is client
+        assert pool.get("http://runner-b:8000") is not client
+        assert pool.get_stream("http://runner-a:8000") is not client
+        assert pool.get_stream("http://runner-a:8000/") is pool.get_stream("http://runner-a:8000")
+        assert set(pool.stats()["runners"]) == {"http://runner-a:8000", "http://runner-b:8000"}
+    finally:
+        await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_closed_clients_are_replaced():
+    pool = RunnerClientPool()
+    try:
+        client = pool.get("http://runner-a:8000")
+        await client.aclose()
+
+        replacement = pool.get("http://runner-a:8000")
+        assert replacement is not client and not replacement.is_closed
+    finally:
+        await pool.aclose()
+    assert pool.stats()["runners"] == {}
@@ -0,0 +1,74 @@
+import httpx
+import pytest
+from fastapi import FastAPI, File, UploadFile
+
+from app.services import upload_service
+from app.services.upload_service import UploadSizeLimit
+
+
+MAX_FILE = 100 * 1024
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(upload_service, "MULTIPART_OVERHEAD", 1024)
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimit, limits=[(r"/upload$", MAX_FILE, "File too large")])
+    app.state.saved = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.saved.append(len(await file.read()))
+        return {"ok": True}
+
+    return app
+
+
+def _multipart(size: int) -> tuple[bytes, bytes, str]:
+    boundary = "limit-test"
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="a.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    return head, b"x" * size + f"\r\n--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+async def _post(app, size: int, chunked: bool):
+    head, tail, content_type = _multipart(size)
+    sent = []
+
+    async def body():
+        sent.append(len(head))
+        yield head
+        for i in range(0, len(tail), 16 * 1024):
+            sent.append(len(tail[i:i + 16 * 1024]))
+            yield tail[i:i + 16 * 1024]
+
+    content = body() if chunked else head + tail
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/upload", content=content, headers={"content-type": content_type})
+    return response, sum(sent)
+
+
+@pytest.mark.asyncio
+async def test_upload_under_the_limit_is_accepted(app):
+    response, _ = await _post(app, MAX_FILE, chunked=True)
+    assert response.status_code == 200
+    assert app.state.saved == [MAX_FILE]
+
+
+@pytest.mark.asyncio
+async def test_oversized_content_length_is_rejected_up_front(app):
+    response, _ = await _post(app, 10 * MAX_FILE, chunked=False)
+    assert response.status_code == 413
+    assert response.json() == {"detail": "File too large"}
+    assert app.state.saved == []
+
+
+@pytest.mark.asyncio
+async def test_oversized_streamed_body_stops_being_read_at_the_limit(app):
+    response, sent = await _post(app, 10 * MAX_FILE, chunked=True)
+    assert response.status_code == 413
+    assert app.state.saved == []
+    assert sent < 2 * MAX_FILE
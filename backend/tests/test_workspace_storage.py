@@ -0,0 +1,109 @@
+import errno
+import os
+import shutil
+import threading
+
+import pytest
+
+from app.services import workspace_storage
+from app.services.workspace_storage import CopyCancelled, materialize, storage_mode_allowed
+
+
+@pytest.fixture
+def source(tmp_path):
+    src = tmp_path / "src"
+    (src / "pkg" / "sub").mkdir(parents=True)
+    (src / "README.md").write_text("readme\n")
+    (src / "pkg" / "a.py").write_text("a = 1\n")
+    (src / "pkg" / "sub" / "b.bin").write_bytes(os.urandom(4096))
+    os.symlink("pkg/a.py", src / "link.py")
+    return src
+
+
+def _tree(root):
+    return sorted(
+        (os.path.relpath(os.path.join(d, f), root), os.path.islink(os.path.join(d, f)))
+        for d, _, files in os.walk(root) for f in files
+    )
+
+
+def test_managed_copy_is_independent_of_the_source(source, tmp_path):
+    dest = tmp_path / "dest"
+    stats = materialize(str(source), str(dest), "managed_copy")
+
+    assert _tree(dest) == _tree(source)
+    assert os.readlink(dest / "link.py") == "pkg/a.py"
+    assert stats.copied == stats.files == 3
+    assert os.stat(dest / "README.md").st_ino != os.stat(source / "README.md").st_ino
+    (dest / "README.md").write_text("edited\n")
+    assert (source / "README.md").read_text() == "readme\n"
+
+
+def test_reflink_clones_each_file(source, tmp_path, monkeypatch):
+    cloned = []
+
+    def fake_reflink(src, dst):
+        cloned.append(src)
+        shutil.copyfile(src, dst)
+
+    monkeypatch.setattr(workspace_storage, "_reflink", fake_reflink)
+    stats = materialize(str(source), str(tmp_path / "dest"), "reflink")
+
+    assert stats.reflinked == 3 and stats.copied == 0
+    assert stats.bytes_written == 0
+    assert len(cloned) == 3
+
+
+def test_reflink_falls_back_to_copy_when_ficlone_is_unsupported(source, tmp_path, monkeypatch):
+    def unsupported(src, dst):
+        open(dst, "wb").close()
+        raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+    monkeypatch.setattr(workspace_storage, "_reflink", unsupported)
+    dest = tmp_path / "dest"
+    stats = materialize(str(source), str(dest), "reflink")
+
+    assert stats.reflinked == 0 and stats.copied == 3
+    assert (dest / "pkg" / "sub" / "b.bin").read_bytes() == (source / "pkg" / "sub" / "b.bin").read_bytes()
+
+
+def test_reflink_io_errors_are_not_swallowed(source, tmp_path, monkeypatch):
+    def failing(src, dst):
+        raise OSError(errno.EIO, "I/O error")
+
+    monkeypatch.setattr(workspace_storage, "_reflink", failing)
+    with pytest.raises(OSError):
+        materialize(str(source), str(tmp_path / "dest"), "reflink")
+
+
+def test_hardlink_shares_inodes(source, tmp_path):
+    dest = tmp_path / "dest"
+    stats = materialize(str(source), str(dest), "hardlink")
+
+    assert stats.hardlinked == 3 and stats.bytes_written == 0
+    assert os.stat(dest / "pkg" / "a.py").st_ino == os.stat(source / "pkg" / "a.py").st_ino
+
+
+def test_hardlink_falls_back_to_copy_across_devices(source, tmp_path, monkeypatch):
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(workspace_storage.os, "link", cross_device)
+    stats = materialize(str(source), str(tmp_path / "dest"), "hardlink")
+
+    assert stats.hardlinked == 0 and stats.copied == 3
+
+
+def test_cancelled_copy_stops(source, tmp_path):
+    cancelled = threading.Event()
+    cancelled.set()
+    with pytest.raises(CopyCancelled):
+        materialize(str(source), str(tmp_path / "dest"), "managed_copy", cancelled)
+
+
+def test_hardlink_is_only_allowed_as_the_server_default(monkeypatch):
+    assert storage_mode_allowed("managed_copy")
+    assert storage_mode_allowed("reflink")
+    assert not storage_mode_allowed("hardlink")
+    monkeypatch.setattr(workspace_storage, "WORKSPACE_STORAGE_MODE", "hardlink")
+    assert storage_mode_allowed("hardlink")
@@ -10,10 +10,19 @@ import os
 from typing import Any, AsyncIterator
 
 from .config import WORKSPACES_ROOT, MAX_AGENT_TURNS
-from .events import make_event, format_sse
+from .events import EventEncoder, DeltaCoalescer
 from .skills import load_all_skills, build_system_prompt
-from .hooks import pre_tool_use_hook, BLOCKED_BASH_PATTERNS, PATH_ESCAPE_PATTERNS
-from .tools import TOOLS, execute_tool
+from .context import ContextSettings, ConversationContext
+from .prompt_cache import cached_system, cached_tools, with_cache_breakpoint, usage_payload
+from .hooks import pre_tool_use_hook, post_tool_use_hook, sensitive_data, BLOCKED_BASH_PATTERNS, PATH_ESCAPE_PATTERNS
+from .tools import (
+    TOOLS,
+    READ_ONLY_TOOLS,
+    batch_tool_calls,
+    execute_tool_stream,
+    execute_tools_concurrently,
+    workspace_lock,
+)
 
 # Try to import claude-agent-sdk, fall back to anthropic if not available
 try:
@@ -26,41 +35,59 @@ except ImportError:
     USE_AGENT_SDK = False
     from .config import ANTHROPIC_API_KEY, CLAUDE_MODEL
 
+    _anthropic_client = None
+
+    def _get_anthropic_client() -> "anthropic.AsyncAnthropic":
+        """One async client per process, so runs share its connection pool."""
+        global _anthropic_client
+        if _anthropic_client is None:
+            _anthropic_client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+        return _anthropic_client
+
 
 async def run_agent_loop(
     thread_id: str,
     run_id: str,
     prompt: str,
-    working_directory: str
+    working_directory: str,
+    seq: int = 0,
+    tenant_id: str | None = None,
+    token_streaming: bool = False
 ) -> AsyncIterator[str]:
-    """Run the agent loop and yield SSE events."""
-    seq = 0
+    """
+    Run the agent loop and yield SSE events, numbered from `seq`.
+
+    Assistant text deltas are coalesced (see DeltaCoalescer) unless
+    `token_streaming` asks for one event per model delta.
+    """
     
     # Load skills for this workspace
     skills = load_all_skills(working_directory)
     skill_names = [s["name"] for s in skills]
+    events = EventEncoder(run_id)
     
-    yield format_sse(make_event(run_id, "run.started", {"threadId": thread_id, "skills": skill_names}, seq))
+    yield events.encode("run.started", {"threadId": thread_id, "skills": skill_names}, seq)
     seq += 1
     
     # Emit skill activation events
     for skill in skills:
-        yield format_sse(make_event(
-            run_id,
+        yield events.encode(
             "ui.skill.activated",
             {"skillName": skill["name"], "description": skill["description"], "scope": skill["scope"]},
             seq
-        ))
+        )
         seq += 1
     
-    yield format_sse(make_event(run_id, "ui.message.user", {"text": prompt}, seq))
+    yield events.encode("ui.message.user", {"text": prompt}, seq)
     seq += 1
     
     if USE_AGENT_SDK:
         async for event_str in _run_with_agent_sdk(thread_id, run_id, prompt, working_directory, skills, seq):
             yield event_str
     else:
-        async for event_str in _run_with_anthropic_sdk(thread_id, run_id, prompt, working_directory, skills, seq):
+        async for event_str in _run_with_anthropic_sdk(
+            thread_id, run_id, prompt, working_directory, skills, seq, tenant_id, token_streaming
+        ):
             yield event_str
 
 
@@ -74,6 +101,7 @@ async def _run_with_agent_sdk(
 ) -> AsyncIterator[str]:
     """Run agent loop using Claude Agent SDK."""
     system_prompt = build_system_prompt(skills)
+    events = EventEncoder(run_id)
     
     try:
         options = ClaudeAgentOptions(
@@ -91,51 +119,47 @@ async def _run_with_agent_sdk(
                 for block in message.content:
                     if isinstance(block, TextBlock):
                         # Stream text delta
-                        text_delta = block.text
+                        text_delta = sensitive_data.redact(block.text)
                         accumulated_text += text_delta
-                        yield format_sse(make_event(
-                            run_id,
+                        yield events.encode(
                             "ui.message.assistant.delta",
                             {"textDelta": text_delta},
                             seq
-                        ))
+                        )
                         seq += 1
                     
                     elif isinstance(block, ToolUseBlock):
                         # Tool call
-                        yield format_sse(make_event(
-                            run_id,
+                        yield events.encode(
                             "ui.tool.call",
                             {"toolName": block.name, "toolId": block.id, "input": block.input},
                             seq
-                        ))
+                        )
                         seq += 1
                     
                     elif isinstance(block, ToolResultBlock):
                         # Tool result
-                        yield format_sse(make_event(
-                            run_id,
+                        yield events.encode(
                             "ui.tool.result",
-                            {"toolName": block.tool_use_id, "output": block.content},
+                            {"toolName": block.tool_use_id, "output": sensitive_data.redact_value(block.content)},
                             seq
-                        ))
+                        )
                         seq += 1
             
             elif isinstance(message, ResultMessage):
                 # Final result
                 if accumulated_text:
-                    yield format_sse(make_event(
-                        run_id,
+                    yield events.encode(
                         "ui.message.assistant.final",
                         {"text": accumulated_text, "format": "markdown"},
                         seq
-                    ))
+                    )
                     seq += 1
         
-        yield format_sse(make_event(run_id, "run.completed", {"threadId": thread_id}, seq))
+        yield events.encode("run.completed", {"threadId": thread_id}, seq)
     
     except Exception as e:
-        yield format_sse(make_event(run_id, "error", {"message": str(e)}, seq))
+        yield events.encode("error", {"message": str(e)}, seq)
 
 
 async def _run_with_anthropic_sdk(
@@ -144,11 +168,18 @@ async def _run_with_anthropic_sdk(
     prompt: str,
     working_directory: str,
     skills: list[dict[str, Any]],
-    seq: int
+    seq: int,
+    tenant_id: str | None = None,
+    token_streaming: bool = False
 ) -> AsyncIterator[str]:
     """Fallback: Run agent loop using basic Anthropic SDK."""
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    system_prompt = build_system_prompt(skills)
+    client = _get_anthropic_client()
+    events = EventEncoder(run_id)
+    system = cached_system(build_system_prompt(skills))
+    tools = cached_tools(TOOLS)
+    usage_totals: dict[str, int] = {}
+    context = ConversationContext(ContextSettings.for_workspace(working_directory))
+    hook_context = {"tenant_id": tenant_id, "run_id": run_id, "working_directory": working_directory}
     
     messages: list[dict[str, Any]] = [
         {"role": "user", "content": prompt}
@@ -160,29 +191,36 @@ async def _run_with_anthropic_sdk(
         iteration += 1
         
         # Emit iteration event
-        yield format_sse(make_event(
-            run_id,
+        yield events.encode(
             "ui.iteration",
             {"current": iteration, "max": MAX_AGENT_TURNS},
             seq
-        ))
+        )
         seq += 1
         
+        compaction = context.compact(messages)
+        if compaction:
+            yield events.encode("ui.context.compacted", compaction, seq)
+            seq += 1
+        
         try:
-            with client.messages.stream(
+            async with client.messages.stream(
                 model=CLAUDE_MODEL,
                 max_tokens=4096,
-                system=system_prompt,
-                messages=messages,
-                tools=TOOLS
+                system=system,
+                messages=with_cache_breakpoint(messages),
+                tools=tools
             ) as stream:
                 accumulated_text = ""
+                # Deltas are redacted as they stream; a redactor holds back a few characters
+                text_redactor = sensitive_data.stream()
+                text_coalescer = DeltaCoalescer(window_ms=0) if token_streaming else DeltaCoalescer()
                 tool_use_blocks: list[dict[str, Any]] = []
                 current_tool_input = ""
                 current_tool_id = ""
                 current_tool_name = ""
                 
-                for event in stream:
+                async for event in stream:
                     if event.type == "content_block_start":
                         if hasattr(event.content_block, "type"):
                             if event.content_block.type == "tool_use":
@@ -191,30 +229,38 @@ async def _run_with_anthropic_sdk(
                                 current_tool_input = ""
                                 
                                 # Emit tool call start event
-                                yield format_sse(make_event(
-                                    run_id,
+                                yield events.encode(
                                     "ui.tool.call.start",
                                     {"toolId": current_tool_id, "toolName": current_tool_name},
                                     seq
-                                ))
+                                )
                                 seq += 1
                     
                     elif event.type == "content_block_delta":
                         if hasattr(event.delta, "text"):
-                            text_delta = event.delta.text
-                            accumulated_text += text_delta
-                            yield format_sse(make_event(
-                                run_id,
-                                "ui.message.assistant.delta",
-                                {"textDelta": text_delta},
-                                seq
-                            ))
-                            seq += 1
+                            accumulated_text += event.delta.text
+                            text_delta = text_coalescer.add(text_redactor.feed(event.delta.text))
+                            if text_delta:
+                                yield events.encode(
+                                    "ui.message.assistant.delta",
+                                    {"textDelta": text_delta},
+                                    seq
+                                )
+                                seq += 1
                         
                         elif hasattr(event.delta, "partial_json"):
                             current_tool_input += event.delta.partial_json
                     
                     elif event.type == "content_block_stop":
+                        text_delta = text_coalescer.flush() + text_redactor.flush()
+                        if text_delta:
+                            yield events.encode(
+                                "ui.message.assistant.delta",
+                                {"textDelta": text_delta},
+                                seq
+                            )
+                            seq += 1
+                        
                         if current_tool_id and current_tool_name:
                             try:
                                 tool_input = json.loads(current_tool_input) if current_tool_input else {}
@@ -227,32 +273,41 @@ async def _run_with_anthropic_sdk(
                                 "input": tool_input
                             })
                             
-                            yield format_sse(make_event(
-                                run_id,
+                            yield events.encode(
                                 "ui.tool.call",
                                 {"toolId": current_tool_id, "toolName": current_tool_name, "input": tool_input},
                                 seq
-                            ))
+                            )
                             seq += 1
                             
                             current_tool_id = ""
                             current_tool_name = ""
                             current_tool_input = ""
                 
-                final_message = stream.get_final_message()
+                final_message = await stream.get_final_message()
                 stop_reason = final_message.stop_reason
                 
+                # Token usage for this turn, including prompt cache reads/writes
+                usage = usage_payload(final_message.usage)
+                for key, value in usage.items():
+                    usage_totals[key] = usage_totals.get(key, 0) + value
+                yield events.encode(
+                    "ui.usage",
+                    {"iteration": iteration, **usage, "total": dict(usage_totals)},
+                    seq
+                )
+                seq += 1
+                
                 if accumulated_text:
-                    yield format_sse(make_event(
-                        run_id,
+                    yield events.encode(
                         "ui.message.assistant.final",
-                        {"text": accumulated_text, "format": "markdown"},
+                        {"text": sensitive_data.redact(accumulated_text), "format": "markdown"},
                         seq
-                    ))
+                    )
                     seq += 1
                 
                 if stop_reason == "end_turn" and not tool_use_blocks:
-                    yield format_sse(make_event(run_id, "run.completed", {"threadId": thread_id}, seq))
+                    yield events.encode("run.completed", {"threadId": thread_id, "usage": usage_totals}, seq)
                     return
                 
                 if stop_reason == "tool_use" or tool_use_blocks:
@@ -271,55 +326,107 @@ async def _run_with_anthropic_sdk(
                     
                     messages.append({"role": "assistant", "content": assistant_content})
                     
-                    tool_results: list[dict[str, Any]] = []
+                    # Hooks run first, in block order
+                    denied: dict[str, str] = {}
                     for tool_block in tool_use_blocks:
-                        # Apply pre-tool-use hook
                         hook_result = await pre_tool_use_hook(
                             {"tool_name": tool_block["name"], "tool_input": tool_block["input"]},
                             tool_block["id"],
-                            None
+                            hook_context
                         )
                         
                         if hook_result.get("hookSpecificOutput", {}).get("permissionDecision") == "deny":
-                            reason = hook_result["hookSpecificOutput"].get("permissionDecisionReason", "Blocked by hook")
-                            result = {"success": False, "error": f"Tool blocked: {reason}"}
-                            
-                            yield format_sse(make_event(
-                                run_id,
-                                "ui.tool.blocked",
-                                {"toolId": tool_block["id"], "toolName": tool_block["name"], "reason": reason},
-                                seq
-                            ))
-                            seq += 1
-                        else:
-                            result = execute_tool(
-                                tool_block["name"],
-                                tool_block["input"],
+                            denied[tool_block["id"]] = hook_result["hookSpecificOutput"].get("permissionDecisionReason", "Blocked by hook")
+                    
+                    tool_results: list[dict[str, Any]] = []
+                    for batch in batch_tool_calls(tool_use_blocks):
+                        # Read-only calls in a batch run concurrently; results are still emitted in block order
+                        read_only = [b for b in batch if b["name"] in READ_ONLY_TOOLS and b["id"] not in denied]
+                        parallel_results: dict[str, dict[str, Any]] = {}
+                        if read_only:
+                            results = await execute_tools_concurrently(
+                                [(b["name"], b["input"]) for b in read_only],
                                 working_directory,
                                 WORKSPACES_ROOT
                             )
+                            parallel_results = {b["id"]: r for b, r in zip(read_only, results)}
                         
-                        yield format_sse(make_event(
-                            run_id,
-                            "ui.tool.result",
-                            {"toolId": tool_block["id"], "toolName": tool_block["name"], "output": result},
-                            seq
-                        ))
-                        seq += 1
-                        
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": tool_block["id"],
-                            "content": json.dumps(result)
-                        })
+                        for tool_block in batch:
+                            if tool_block["id"] in denied:
+                                reason = denied[tool_block["id"]]
+                                result = {"success": False, "error": f"Tool blocked: {reason}"}
+                                
+                                yield events.encode(
+                                    "ui.tool.blocked",
+                                    {"toolId": tool_block["id"], "toolName": tool_block["name"], "reason": reason},
+                                    seq
+                                )
+                                seq += 1
+                            elif tool_block["id"] in parallel_results:
+                                result = parallel_results[tool_block["id"]]
+                            else:
+                                # Writes and bash are serialised per workspace, across runs too
+                                result = {}
+                                output_redactors = {}
+                                async with workspace_lock(working_directory):
+                                    async for kind, data in execute_tool_stream(
+                                        tool_block["name"],
+                                        tool_block["input"],
+                                        working_directory,
+                                        WORKSPACES_ROOT
+                                    ):
+                                        if kind == "result":
+                                            result = data
+                                            continue
+                                        # Live command output, so long builds/tests show progress
+                                        redactor = output_redactors.setdefault(data["stream"], sensitive_data.stream())
+                                        text = redactor.feed(data["text"])
+                                        if text:
+                                            yield events.encode(
+                                                "ui.tool.output.delta",
+                                                {"toolId": tool_block["id"], "toolName": tool_block["name"], "stream": data["stream"], "text": text},
+                                                seq
+                                            )
+                                            seq += 1
+                                for stream_name, redactor in output_redactors.items():
+                                    text = redactor.flush()
+                                    if text:
+                                        yield events.encode(
+                                            "ui.tool.output.delta",
+                                            {"toolId": tool_block["id"], "toolName": tool_block["name"], "stream": stream_name, "text": text},
+                                            seq
+                                        )
+                                        seq += 1
+                            
+                            if tool_block["id"] not in denied:
+                                post_result = await post_tool_use_hook(
+                                    {"tool_name": tool_block["name"], "tool_input": tool_block["input"]},
+                                    tool_block["id"],
+                                    result,
+                                    hook_context
+                                )
+                                result = post_result.get("hookSpecificOutput", {}).get("updatedToolOutput", result)
+                            
+                            yield events.encode(
+                                "ui.tool.result",
+                                {"toolId": tool_block["id"], "toolName": tool_block["name"], "output": result},
+                                seq
+                            )
+                            seq += 1
+                            
+                            tool_results.append({
+                                "type": "tool_result",
+                                "tool_use_id": tool_block["id"],
+                                "content": json.dumps(result)
+                            })
                     
                     messages.append({"role": "user", "content": tool_results})
                 else:
-                    yield format_sse(make_event(run_id, "run.completed", {"threadId": thread_id}, seq))
+                    yield events.encode("run.completed", {"threadId": thread_id, "usage": usage_totals}, seq)
                     return
         
         except anthropic.APIError as e:
-            yield format_sse(make_event(run_id, "error", {"message": str(e)}, seq))
+            yield events.encode("error", {"message": str(e)}, seq)
             return
     
-    yield format_sse(make_event(run_id, "error", {"message": "Max iterations reached"}, seq))
+    yield events.encode("error", {"message": "Max iterations reached"}, seq)
@@ -0,0 +1,21 @@
+"""Admin/operations endpoints for the runner."""
+
+from fastapi import APIRouter
+
+from ..hooks import hook_stats
+from ..run_store import run_store
+from ..scheduler import run_scheduler
+from ..skills import skills_cache_stats
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+@router.get("/stats")
+async def get_stats() -> dict:
+    """Registry usage (threads, runs, buffered bytes, evictions), scheduler queue state, skills cache and hooks."""
+    return {
+        "run_store": run_store.stats(),
+        "scheduler": run_scheduler.stats(),
+        "skills_cache": skills_cache_stats(),
+        "hooks": hook_stats(),
+    }
@@ -10,6 +10,8 @@ from typing import Optional, List
 from fastapi import APIRouter, HTTPException, status, Query
 from pydantic import BaseModel, Field
 
+from ..skills import invalidate_skills_cache
+
 router = APIRouter(prefix="/api/skills", tags=["skills"])
 
 # Skills directories
@@ -280,6 +282,7 @@ async def create_skill(request: CreateSkillRequest):
     # Write SKILL.md
     content = build_skill_content(metadata, request.content)
     (skill_dir / "SKILL.md").write_text(content)
+    invalidate_skills_cache(skill_dir.parent)
     
     return load_skill(skill_dir, request.scope, request.tenant_id, request.project_id)
 
@@ -345,6 +348,7 @@ async def update_skill(
     # Write updated content
     content = build_skill_content(frontmatter, body)
     skill_file.write_text(content)
+    invalidate_skills_cache(skill_dir.parent)
     
     return load_skill(skill_dir, scope, tenant_id, project_id)
 
@@ -368,6 +372,7 @@ async def delete_skill(
     # Remove directory and all contents
     import shutil
     shutil.rmtree(skill_dir)
+    invalidate_skills_cache(skill_dir.parent)
 
 
 @router.post("/{name}/reload", status_code=status.HTTP_200_OK)
@@ -386,8 +391,8 @@ async def reload_skill(
     if not skill_dir.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Skill '{name}' not found")
     
-    # Skills are loaded fresh on each agent run, so this is a no-op
-    # In a more complex system, this could invalidate a cache
+    # Drop the cached directory so the next agent run re-reads it from disk
+    invalidate_skills_cache(skill_dir.parent)
     return {"status": "ok", "message": f"Skill '{name}' will be reloaded on next agent run"}
 
 
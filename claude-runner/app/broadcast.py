@@ -0,0 +1,62 @@
+"""
+Fan-out of a run's SSE events to its live subscribers.
+
+publish() never waits: every subscriber has a bounded queue, and one that
+is RUN_SUBSCRIBER_QUEUE_SIZE events behind is disconnected instead of
+stalling the agent loop. Its stream ends and the client reconnects,
+replaying from the run buffer.
+
+Subscribers wait on their queue without polling. When a client
+disconnects, Starlette cancels the streaming task, and the subscriber is
+removed in the generator's `finally`.
+"""
+
+import asyncio
+
+from .config import RUN_SUBSCRIBER_QUEUE_SIZE
+
+
+class RunBroadcast:
+    def __init__(self, maxsize: int = RUN_SUBSCRIBER_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.subscribers: set[asyncio.Queue[str | None]] = set()
+        self.closed = False
+        self.dropped_subscribers = 0
+
+    def subscribe(self) -> asyncio.Queue[str | None]:
+        queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=self.maxsize)
+        if self.closed:
+            queue.put_nowait(None)
+        else:
+            self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[str | None]) -> None:
+        self.subscribers.discard(queue)
+
+    def publish(self, event_str: str) -> None:
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event_str)
+            except asyncio.QueueFull:
+                # Slow consumer: cut it loose rather than hold up the run
+                self.subscribers.discard(queue)
+                self.dropped_subscribers += 1
+                _close_queue(queue)
+
+    def close(self) -> None:
+        """Signal end-of-stream; subscribers get their queued events first."""
+        self.closed = True
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                _close_queue(queue)
+        self.subscribers.clear()
+
+
+def _close_queue(queue: asyncio.Queue) -> None:
+    """Discard anything still buffered and signal end-of-stream."""
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(None)
@@ -8,4 +8,58 @@ PORT = int(os.environ.get("PORT", "8082"))
 # v0.6.0: Skills and hooks configuration
 GLOBAL_SKILLS_PATH = os.environ.get("GLOBAL_SKILLS_PATH", "/app/skills")
 ENABLE_HOOKS = os.environ.get("ENABLE_HOOKS", "true").lower() == "true"
+# Optional YAML file extending the hook pattern lists (globally and per tenant); hot-reloaded
+HOOK_PATTERNS_FILE = os.environ.get("HOOK_PATTERNS_FILE", "")
+HOOK_PATTERNS_CHECK_SECONDS = float(os.environ.get("HOOK_PATTERNS_CHECK_SECONDS", "5"))
+# Redact NHS/NI/card numbers from tool outputs and assistant text (needs ENABLE_HOOKS)
+ENABLE_PII_REDACTION = os.environ.get("ENABLE_PII_REDACTION", "true").lower() == "true"
+# Tool results with more text than this are redacted in a worker thread, off the event loop
+PII_SCAN_THREAD_MIN_CHARS = int(os.environ.get("PII_SCAN_THREAD_MIN_CHARS", str(64 * 1024)))
+# Tool call rate limits (hooks.RATE_LIMITS): bucket per "run", "workspace" or "tenant"; Redis shares them across replicas
+ENABLE_RATE_LIMITS = os.environ.get("ENABLE_RATE_LIMITS", "true").lower() == "true"
+RATE_LIMIT_SCOPE = os.environ.get("RATE_LIMIT_SCOPE", "workspace")
+RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL", "")
 MAX_AGENT_TURNS = int(os.environ.get("MAX_AGENT_TURNS", "20"))
+# Mark tools, system prompt and conversation prefix as cacheable in the anthropic fallback loop
+PROMPT_CACHING_ENABLED = os.environ.get("PROMPT_CACHING_ENABLED", "true").lower() == "true"
+
+# Conversation compaction (estimated tokens); a workspace may override these in .claude/settings.json
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "100000"))
+CONTEXT_TARGET_RATIO = float(os.environ.get("CONTEXT_TARGET_RATIO", "0.6"))
+CONTEXT_KEEP_RECENT_TURNS = int(os.environ.get("CONTEXT_KEEP_RECENT_TURNS", "2"))
+CONTEXT_TOOL_RESULT_MAX_CHARS = int(os.environ.get("CONTEXT_TOOL_RESULT_MAX_CHARS", "2000"))
+# Assistant text deltas arriving within this window are merged into one event (up to the size cap);
+# a run created with tokenStreaming=true gets one event per delta
+STREAM_COALESCE_WINDOW_MS = float(os.environ.get("STREAM_COALESCE_WINDOW_MS", "30"))
+STREAM_COALESCE_MAX_CHARS = int(os.environ.get("STREAM_COALESCE_MAX_CHARS", "1024"))
+# How often a cached skills directory is re-checked (stat only) for changes on disk
+SKILLS_CACHE_CHECK_SECONDS = float(os.environ.get("SKILLS_CACHE_CHECK_SECONDS", "2"))
+
+# Run/thread registry limits (finished runs are evicted, running ones never)
+RUN_STORE_TTL_SECONDS = float(os.environ.get("RUN_STORE_TTL_SECONDS", "3600"))
+RUN_STORE_MAX_RUNS = int(os.environ.get("RUN_STORE_MAX_RUNS", "500"))
+RUN_STORE_MAX_BUFFER_BYTES = int(os.environ.get("RUN_STORE_MAX_BUFFER_BYTES", str(256 * 1024 * 1024)))
+RUN_STORE_SWEEP_INTERVAL_SECONDS = float(os.environ.get("RUN_STORE_SWEEP_INTERVAL_SECONDS", "60"))
+RUN_SPILL_DIR = os.environ.get("RUN_SPILL_DIR", "")  # empty: drop buffers instead of spilling to disk
+THREAD_TTL_SECONDS = float(os.environ.get("THREAD_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Per-subscriber event queue; a subscriber this far behind is disconnected
+RUN_SUBSCRIBER_QUEUE_SIZE = int(os.environ.get("RUN_SUBSCRIBER_QUEUE_SIZE", "1000"))
+
+# Threads for blocking tool execution in the anthropic fallback loop
+TOOL_EXECUTOR_THREADS = int(os.environ.get("TOOL_EXECUTOR_THREADS", "32"))
+# Read-only tool calls from one assistant turn that may run at the same time
+TOOL_MAX_PARALLEL_CALLS = int(os.environ.get("TOOL_MAX_PARALLEL_CALLS", "8"))
+
+# bash tool: timeout, captured bytes per stream (kept as head + tail) and live output streamed per command
+BASH_TIMEOUT_SECONDS = float(os.environ.get("BASH_TIMEOUT_SECONDS", "60"))
+BASH_OUTPUT_MAX_BYTES = int(os.environ.get("BASH_OUTPUT_MAX_BYTES", str(256 * 1024)))
+BASH_STREAM_MAX_BYTES = int(os.environ.get("BASH_STREAM_MAX_BYTES", str(1024 * 1024)))
+
+# Run scheduler: concurrency limits, queue bound and per-tenant weights ("tenant-a=2,tenant-b=1")
+SCHEDULER_MAX_CONCURRENT_RUNS = int(os.environ.get("SCHEDULER_MAX_CONCURRENT_RUNS", "8"))
+SCHEDULER_MAX_RUNS_PER_THREAD = int(os.environ.get("SCHEDULER_MAX_RUNS_PER_THREAD", "1"))
+SCHEDULER_MAX_RUNS_PER_WORKSPACE = int(os.environ.get("SCHEDULER_MAX_RUNS_PER_WORKSPACE", "2"))
+SCHEDULER_MAX_QUEUED_RUNS = int(os.environ.get("SCHEDULER_MAX_QUEUED_RUNS", "100"))
+SCHEDULER_TENANT_WEIGHTS = os.environ.get("SCHEDULER_TENANT_WEIGHTS", "")
+SCHEDULER_RETRY_AFTER_SECONDS = int(os.environ.get("SCHEDULER_RETRY_AFTER_SECONDS", "5"))
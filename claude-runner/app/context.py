@@ -0,0 +1,195 @@
+"""
+Context compaction for long runs in the anthropic fallback loop.
+
+Every tool result is appended to the conversation in full, so a long run
+grows its prompt (and per-turn latency) until it overflows the context
+window. Before each model call the conversation's size is estimated
+(~4 characters per token); once it exceeds the token budget it is
+compacted down to CONTEXT_TARGET_RATIO of the budget:
+
+1. Earlier read_file results for a path that was read again later are
+   replaced by a short note.
+2. Old tool results longer than the per-result limit are cut to their
+   head and tail.
+3. If that is still not enough, the oldest tool turns (assistant
+   tool_use + user tool_result) are dropped, keeping the prompt.
+
+The newest CONTEXT_KEEP_RECENT_TURNS turns are never touched.
+Compaction rewrites the conversation prefix and so invalidates the
+prompt cache; compacting well below the budget keeps that rare.
+
+A workspace can override the limits in .claude/settings.json:
+
+    {"context": {"tokenBudget": 60000, "keepRecentTurns": 3, "toolResultMaxChars": 4000}}
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+from .config import (
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_TARGET_RATIO,
+    CONTEXT_KEEP_RECENT_TURNS,
+    CONTEXT_TOOL_RESULT_MAX_CHARS,
+)
+
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(value: Any) -> int:
+    text = value if isinstance(value, str) else json.dumps(value)
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class ContextSettings:
+    def __init__(
+        self,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        target_ratio: float = CONTEXT_TARGET_RATIO,
+        keep_recent_turns: int = CONTEXT_KEEP_RECENT_TURNS,
+        tool_result_max_chars: int = CONTEXT_TOOL_RESULT_MAX_CHARS
+    ):
+        self.token_budget = token_budget
+        self.target_ratio = target_ratio
+        self.keep_recent_turns = keep_recent_turns
+        self.tool_result_max_chars = tool_result_max_chars
+
+    @classmethod
+    def for_workspace(cls, working_directory: str) -> "ContextSettings":
+        """Defaults, overridden by the "context" section of <workspace>/.claude/settings.json."""
+        settings = cls()
+        path = Path(working_directory) / ".claude" / "settings.json"
+        try:
+            overrides = json.loads(path.read_text(encoding="utf-8")).get("context") or {}
+        except FileNotFoundError:
+            return settings
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Ignoring invalid context settings in {path}: {e}")
+            return settings
+
+        fields = {
+            "tokenBudget": ("token_budget", int),
+            "targetRatio": ("target_ratio", float),
+            "keepRecentTurns": ("keep_recent_turns", int),
+            "toolResultMaxChars": ("tool_result_max_chars", int),
+        }
+        for key, (attr, cast) in fields.items():
+            if key in overrides:
+                try:
+                    setattr(settings, attr, cast(overrides[key]))
+                except (TypeError, ValueError):
+                    print(f"Ignoring invalid context setting {key}={overrides[key]!r} in {path}")
+        return settings
+
+
+def _tool_results(message: dict[str, Any]) -> list[dict[str, Any]]:
+    if message["role"] != "user" or not isinstance(message["content"], list):
+        return []
+    return [b for b in message["content"] if b.get("type") == "tool_result"]
+
+
+def _replace_result(message: dict[str, Any], tool_use_id: str, content: str) -> dict[str, Any]:
+    """Copy of a tool_result message with one result's content replaced."""
+    return {
+        **message,
+        "content": [
+            {**b, "content": content} if b.get("type") == "tool_result" and b["tool_use_id"] == tool_use_id else b
+            for b in message["content"]
+        ],
+    }
+
+
+class ConversationContext:
+    """Tracks the size of a run's `messages` and compacts them in place when over budget."""
+
+    def __init__(self, settings: ContextSettings):
+        self.settings = settings
+        # id(message) -> (message, tokens); messages are replaced, never mutated, on compaction
+        self._sizes: dict[int, tuple[dict[str, Any], int]] = {}
+
+    def _tokens(self, message: dict[str, Any]) -> int:
+        cached = self._sizes.get(id(message))
+        if cached is None or cached[0] is not message:
+            cached = (message, estimate_tokens(message["content"]))
+            self._sizes[id(message)] = cached
+        return cached[1]
+
+    def estimate(self, messages: list[dict[str, Any]]) -> int:
+        return sum(self._tokens(m) for m in messages)
+
+    def compact(self, messages: list[dict[str, Any]]) -> Optional[dict[str, Any]]:
+        """Compact `messages` if over budget; returns a summary of what was done, or None."""
+        before = self.estimate(messages)
+        if before <= self.settings.token_budget:
+            return None
+
+        target = int(self.settings.token_budget * self.settings.target_ratio)
+        # messages[0] is the prompt; every turn after it is an assistant + user pair
+        protected_from = max(1, len(messages) - 2 * self.settings.keep_recent_turns)
+        stats = {"dedupedReads": 0, "truncatedResults": 0, "droppedTurns": 0}
+
+        self._dedupe_reads(messages, protected_from, stats)
+        if self.estimate(messages) > target:
+            self._truncate_results(messages, protected_from, target, stats)
+        if self.estimate(messages) > target:
+            self._drop_turns(messages, protected_from, target, stats)
+
+        self._sizes = {id(m): (m, self._tokens(m)) for m in messages}
+        if not any(stats.values()):
+            # Everything left is protected; nothing to report until the window moves
+            return None
+        return {
+            "beforeTokens": before,
+            "afterTokens": self.estimate(messages),
+            "budget": self.settings.token_budget,
+            **stats,
+        }
+
+    def _dedupe_reads(self, messages: list[dict[str, Any]], protected_from: int, stats: dict) -> None:
+        reads: dict[str, str] = {}  # tool_use_id -> path
+        for message in messages:
+            if message["role"] == "assistant" and isinstance(message["content"], list):
+                for block in message["content"]:
+                    if block.get("type") == "tool_use" and block["name"] == "read_file":
+                        reads[block["id"]] = str(block["input"].get("path"))
+
+        seen_later: set[str] = set()
+        for index in range(len(messages) - 1, 0, -1):
+            for result in reversed(_tool_results(messages[index])):
+                path = reads.get(result["tool_use_id"])
+                if path is None:
+                    continue
+                note = json.dumps({"success": True, "compacted": f"Superseded by a later read of {path}"})
+                if path in seen_later and index < protected_from and result["content"] != note:
+                    messages[index] = _replace_result(messages[index], result["tool_use_id"], note)
+                    stats["dedupedReads"] += 1
+                seen_later.add(path)
+
+    def _truncate_results(self, messages: list[dict[str, Any]], protected_from: int, target: int, stats: dict) -> None:
+        limit = self.settings.tool_result_max_chars
+        head = limit // 2
+        tail = limit - head
+        for index in range(1, protected_from):
+            for result in _tool_results(messages[index]):
+                content = result["content"]
+                if not isinstance(content, str) or len(content) <= limit:
+                    continue
+                cut = len(content) - head - tail
+                short = f"{content[:head]}\n... [{cut} characters compacted] ...\n{content[-tail:] if tail else ''}"
+                if len(short) >= len(content):
+                    # Already compacted (or barely over the limit)
+                    continue
+                messages[index] = _replace_result(messages[index], result["tool_use_id"], short)
+                stats["truncatedResults"] += 1
+            if self.estimate(messages) <= target:
+                return
+
+    def _drop_turns(self, messages: list[dict[str, Any]], protected_from: int, target: int, stats: dict) -> None:
+        droppable = (protected_from - 1) // 2
+        dropped = 0
+        while dropped < droppable and self.estimate(messages) > target:
+            del messages[1:3]
+            dropped += 1
+        stats["droppedTurns"] = dropped
@@ -1,6 +1,134 @@
+"""
+Run event envelopes and their SSE framing.
+
+Every event a run emits has the same envelope:
+
+    {"v":1,"runId":...,"provider":"claude","kind":"raw","type":...,"at":...,"seq":...,"payload":{...}}
+
+A run emits one event per text delta, so EventEncoder renders events
+straight to SSE text instead of building a dict and dumping it: the
+envelope up to and including "type" is rendered once per (run, event
+type), the timestamp reuses the formatted date and time of the current
+second, and only the payload goes through the JSON encoder (orjson when
+it is installed).
+
+The event type is repeated in an SSE `event:` field ahead of the data, so
+a relay can route or persist an event by type without parsing its JSON.
+
+DeltaCoalescer merges assistant text deltas that arrive in quick
+succession, so a fast token stream becomes one event per
+STREAM_COALESCE_WINDOW_MS instead of one per token. That means fewer
+persisted rows and fewer frontend re-renders.
+
+Output stays ASCII (non-ASCII payloads are \\u-escaped by json), which
+the run buffers rely on to count bytes with len().
+"""
+
 import json
+import time
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .config import STREAM_COALESCE_WINDOW_MS, STREAM_COALESCE_MAX_CHARS
+
+
+def dumps(value: Any) -> str:
+    """Compact, ASCII-only JSON."""
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(value)
+        except TypeError:
+            # Non-string keys, oversized ints, ...: the stdlib encoder copes or raises properly
+            pass
+        else:
+            if encoded.isascii():
+                return encoded.decode("ascii")
+    return json.dumps(value, separators=(",", ":"))
+
+
+class _Clock:
+    """ISO 8601 UTC timestamps, formatting the date and time once per second."""
+
+    def __init__(self):
+        self._second = -1
+        self._text = ""
+
+    def now(self) -> str:
+        now = time.time()
+        second = int(now)
+        if second != self._second:
+            self._text = datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+            self._second = second
+        return f"{self._text}.{int((now - second) * 1_000_000):06d}+00:00"
+
+
+_clock = _Clock()
+
+
+class EventEncoder:
+    """Renders the SSE messages of one run."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self._envelope = f'{{"v":1,"runId":{dumps(run_id)},"provider":"claude","kind":"raw","type":'
+        self._prefixes: dict[str, str] = {}
+
+    def encode(self, event_type: str, payload: dict[str, Any] | None = None, seq: int = 0) -> str:
+        prefix = self._prefixes.get(event_type)
+        if prefix is None:
+            prefix = f"event: {event_type}\ndata: {self._envelope}{dumps(event_type)},\"at\":\""
+            self._prefixes[event_type] = prefix
+        return f'{prefix}{_clock.now()}","seq":{seq},"payload":{dumps(payload or {})}}}\n\n'
+
+
+class DeltaCoalescer:
+    """
+    Merges a stream of text deltas into fewer, larger ones.
+
+    A delta arriving at least `window_ms` after the last release is released
+    at once, together with anything held back, so a slow stream still goes out
+    token by token. Within the window deltas are held until the window has
+    passed (checked when the next delta arrives) or `max_chars` have built
+    up. The caller releases the rest with flush() at the end of the block.
+    A window of 0 releases every delta as it comes.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = STREAM_COALESCE_WINDOW_MS,
+        max_chars: int = STREAM_COALESCE_MAX_CHARS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.window = window_ms / 1000
+        self.max_chars = max_chars
+        self.clock = clock
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._released_at = float("-inf")
+
+    def add(self, text: str) -> str:
+        """Add a delta; returns the text to release now ("" to hold it)."""
+        if not text or self.window <= 0:
+            return text
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        now = self.clock()
+        if now - self._released_at < self.window and self._pending_chars < self.max_chars:
+            return ""
+        self._released_at = now
+        return self.flush()
+
+    def flush(self) -> str:
+        """Release everything held back."""
+        text = "".join(self._pending)
+        self._pending = []
+        self._pending_chars = 0
+        return text
 
 
 def make_event(
@@ -16,12 +144,15 @@ def make_event(
         "provider": "claude",
         "kind": "raw",
         "type": event_type,
-        "at": datetime.now(timezone.utc).isoformat(),
+        "at": _clock.now(),
         "seq": seq,
         "payload": payload or {}
     }
 
 
 def format_sse(data: dict[str, Any]) -> str:
-    """Format data as an SSE message."""
-    return f"data: {json.dumps(data)}\n\n"
+    """Format data as an SSE message, with its type (if any) in the `event:` field."""
+    event_type = data.get("type")
+    if event_type:
+        return f"event: {event_type}\ndata: {dumps(data)}\n\n"
+    return f"data: {dumps(data)}\n\n"
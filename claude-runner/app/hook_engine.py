@@ -0,0 +1,202 @@
+"""
+Compiled pattern matching and latency tracking for tool hooks.
+
+Each pattern category (blocked bash commands, path escapes, ...) is
+compiled into a single alternation regex, literals escaped and regexes
+kept as-is, so a command or output is scanned once however many
+patterns there are. The first pattern to match is reported back by
+name.
+
+Patterns come from the built-in lists in hooks.py, optionally extended
+by HOOK_PATTERNS_FILE (YAML), globally and per tenant:
+
+    blocked_bash:
+      - "git push --force"
+      - regex: 'curl\\s+[^|]*\\|\\s*(ba)?sh'
+    tenants:
+      tenant-a:
+        path_escape:
+          - "/etc/"
+
+The file is re-checked (mtime) at most every HOOK_PATTERNS_CHECK_SECONDS
+and recompiled when it changes, so edits apply without a restart.
+"""
+
+import bisect
+import functools
+import os
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import yaml
+
+from .config import HOOK_PATTERNS_FILE, HOOK_PATTERNS_CHECK_SECONDS
+
+
+class PatternMatcher:
+    """One compiled regex for a list of literal and regex patterns."""
+
+    def __init__(self, patterns: list[Any]):
+        self.labels: list[str] = []
+        alternatives: list[str] = []
+        for pattern in patterns:
+            if isinstance(pattern, dict):
+                source = pattern["regex"]
+                re.compile(source)  # fail on the offending pattern, not on the combined one
+                label = pattern.get("name", source)
+            else:
+                source = re.escape(str(pattern))
+                label = str(pattern)
+            alternatives.append(f"(?P<_p{len(self.labels)}>{source})")
+            self.labels.append(label)
+        self.regex = re.compile("|".join(alternatives)) if alternatives else None
+
+    def search(self, text: str) -> Optional[str]:
+        """Label of the leftmost matching pattern, or None."""
+        if self.regex is None or not text:
+            return None
+        match = self.regex.search(text)
+        if match is None:
+            return None
+        for name, value in match.groupdict().items():
+            if value is not None and name.startswith("_p"):
+                return self.labels[int(name[2:])]
+        return None
+
+
+class HookPatternRegistry:
+    """Built-in pattern lists plus HOOK_PATTERNS_FILE overrides, compiled per (category, tenant)."""
+
+    def __init__(
+        self,
+        defaults: dict[str, list[Any]],
+        path: str = HOOK_PATTERNS_FILE,
+        check_interval: float = HOOK_PATTERNS_CHECK_SECONDS
+    ):
+        self.defaults = defaults
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._file_patterns: dict[str, Any] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._compiled: dict[tuple[str, Optional[str]], PatternMatcher] = {}
+        self.reloads = 0
+        self.reload_errors = 0
+
+    def matcher(self, category: str, tenant: Optional[str] = None) -> PatternMatcher:
+        self._maybe_reload()
+        key = (category, tenant)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            with self._lock:
+                patterns = list(self.defaults.get(category, []))
+                patterns += self._file_patterns.get(category) or []
+                if tenant:
+                    tenant_patterns = (self._file_patterns.get("tenants") or {}).get(tenant) or {}
+                    patterns += tenant_patterns.get(category) or []
+                compiled = PatternMatcher(patterns)
+                self._compiled[key] = compiled
+        return compiled
+
+    def _maybe_reload(self) -> None:
+        if not self.path:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        try:
+            if mtime is None:
+                loaded: dict[str, Any] = {}
+            else:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    loaded = yaml.safe_load(f) or {}
+            # Compile everything up front so a bad pattern keeps the previous set in force
+            compiled = {}
+            for category in set(self.defaults) | {k for k in loaded if k != "tenants"}:
+                compiled[(category, None)] = PatternMatcher(
+                    list(self.defaults.get(category, [])) + (loaded.get(category) or [])
+                )
+            for tenant, tenant_patterns in (loaded.get("tenants") or {}).items():
+                for category, patterns in (tenant_patterns or {}).items():
+                    compiled[(category, tenant)] = PatternMatcher(
+                        list(self.defaults.get(category, [])) + (loaded.get(category) or []) + (patterns or [])
+                    )
+        except (OSError, yaml.YAMLError, re.error, KeyError, TypeError, AttributeError) as e:
+            print(f"Failed to reload hook patterns from {self.path}: {e}")
+            self.reload_errors += 1
+            self._mtime = mtime
+            return
+
+        with self._lock:
+            self._file_patterns = loaded
+            self._compiled = compiled
+            self._mtime = mtime
+        self.reloads += 1
+
+    def stats(self) -> dict:
+        return {
+            "file": self.path or None,
+            "compiled_sets": len(self._compiled),
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed millisecond buckets."""
+
+    BUCKETS_MS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def snapshot(self) -> dict:
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.BUCKETS_MS + ("+Inf",), self.counts):
+            cumulative += count
+            buckets[f"le_{bound}"] = cumulative
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "avg_ms": round(self.sum_ms / self.count, 4) if self.count else 0.0,
+            "buckets_ms": buckets,
+        }
+
+
+hook_latency: dict[str, LatencyHistogram] = {}
+
+
+def timed_hook(name: str) -> Callable:
+    """Record each call of an async hook in hook_latency[name]."""
+    histogram = hook_latency.setdefault(name, LatencyHistogram())
+
+    def decorate(hook: Callable[..., Awaitable[dict[str, Any]]]) -> Callable[..., Awaitable[dict[str, Any]]]:
+        @functools.wraps(hook)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await hook(*args, **kwargs)
+            finally:
+                histogram.observe((time.perf_counter() - started) * 1000)
+        return wrapper
+
+    return decorate
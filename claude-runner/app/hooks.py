@@ -7,19 +7,29 @@ Hook Categories:
 1. Security Hooks - Block dangerous operations
 2. Compliance Hooks - Enforce data handling policies  
 3. Audit Hooks - Log tool usage for compliance
-4. Rate Limit Hooks - Prevent resource abuse (placeholder)
+4. Rate Limit Hooks - Prevent resource abuse (token buckets, see rate_limit.py)
 5. Custom Hooks - Tenant-specific rules (placeholder)
 
 To extend hooks:
-1. Add patterns to the appropriate *_PATTERNS list
+1. Add patterns to the appropriate *_PATTERNS list (or, without a
+   rebuild, to HOOK_PATTERNS_FILE - see hook_engine.py)
 2. Add new hook functions following the async signature
 3. Register hooks in get_hook_matchers()
+
+Each pattern list is compiled into one regex, so a command or path is
+scanned once per hook call whatever the number of patterns.
 """
 
-from typing import Any
+from typing import Any, Optional
+import asyncio
 import logging
+import posixpath
+import shlex
 
-from .config import ENABLE_HOOKS
+from .config import ENABLE_HOOKS, ENABLE_PII_REDACTION, ENABLE_RATE_LIMITS, PII_SCAN_THREAD_MIN_CHARS
+from .hook_engine import HookPatternRegistry, hook_latency, timed_hook
+from .pii_scanner import PiiScanner, text_length
+from .rate_limit import ToolRateLimiter, shared_store_from_config
 
 logger = logging.getLogger(__name__)
 
@@ -28,11 +38,10 @@ logger = logging.getLogger(__name__)
 # SECURITY PATTERNS - Block dangerous operations
 # =============================================================================
 
-# Patterns that should be blocked in bash commands
+# Patterns that should be blocked in bash commands. Recursive rm is checked
+# separately against the run's workspace (see recursive_rm_outside).
 BLOCKED_BASH_PATTERNS = [
     # Destructive file operations
-    "rm -rf /",
-    "rm -rf /*",
     "sudo rm",
     # Permission escalation
     "chmod 777 /",
@@ -62,25 +71,157 @@ PATH_ESCAPE_PATTERNS = [
 # COMPLIANCE PATTERNS - Data handling policies (Placeholder)
 # =============================================================================
 
-# Patterns for sensitive data detection (placeholder for future)
+# Sensitive identifiers redacted from tool outputs and assistant text (see pii_scanner.py).
+# Each regex must contain two consecutive digits; "validator" names a check-digit test.
+# Each pattern starts with a character class and checks its left boundary with a lookbehind
+# placed after it; a leading class lets the regex engine skip ahead instead of trying
+# every position (about twice as fast on number-heavy output).
 SENSITIVE_DATA_PATTERNS = [
-    # NHS Number format (placeholder)
-    # r"\d{3}\s?\d{3}\s?\d{4}",
-    # Credit card (placeholder)
-    # r"\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}",
+    # Payment card: 13-19 digits in groups of four, or Amex 4-6-5; Luhn checked
+    {
+        "name": "PAYMENT_CARD",
+        "regex": r"[0-9](?<![0-9][0-9])(?:[0-9]{3}(?:[ -]?[0-9]{4}){2}[ -]?[0-9]{1,7}|[0-9]{3}[ -]?[0-9]{6}[ -]?[0-9]{5})(?![0-9])",
+        "validator": "luhn",
+    },
+    # NHS number: 10 digits, optionally 3-3-4; issued range and modulus 11 checked
+    {
+        "name": "NHS_NUMBER",
+        "regex": r"[0-9](?<![0-9][0-9])[0-9]{2}[ -]?[0-9]{3}[ -]?[0-9]{4}(?![0-9])",
+        "validator": "nhs_number",
+    },
+    # National Insurance number, e.g. "AB 12 34 56 C"
+    {
+        "name": "NI_NUMBER",
+        "regex": r"[A-CEGHJ-PR-TW-Z](?<![A-Za-z][A-Z])[A-CEGHJ-NPR-TW-Z] ?[0-9]{2} ?[0-9]{2} ?[0-9]{2} ?[A-D](?![A-Za-z])",
+    },
 ]
 
 # =============================================================================
-# RATE LIMIT CONFIG - Resource abuse prevention (Placeholder)
+# RATE LIMIT CONFIG - Resource abuse prevention
 # =============================================================================
 
+# Token buckets per RATE_LIMIT_SCOPE (workspace by default); a full minute's worth may burst
 RATE_LIMITS = {
-    "bash_commands_per_minute": 30,  # Placeholder
-    "file_writes_per_minute": 20,    # Placeholder
-    "api_calls_per_minute": 60,      # Placeholder
+    "bash_commands_per_minute": 30,
+    "file_writes_per_minute": 20,
+    "api_calls_per_minute": 60,      # any tool call
+}
+
+# Limits each tool call draws from
+_TOOL_RATE_LIMITS = {
+    "Bash": ["bash_commands_per_minute", "api_calls_per_minute"],
+    "bash": ["bash_commands_per_minute", "api_calls_per_minute"],
+    "Write": ["file_writes_per_minute", "api_calls_per_minute"],
+    "Edit": ["file_writes_per_minute", "api_calls_per_minute"],
+    "write_file": ["file_writes_per_minute", "api_calls_per_minute"],
 }
 
+rate_limiter = ToolRateLimiter(RATE_LIMITS, shared=shared_store_from_config())
+
+
+hook_patterns = HookPatternRegistry({
+    "blocked_bash": BLOCKED_BASH_PATTERNS,
+    "path_escape": PATH_ESCAPE_PATTERNS,
+})
+
+
+# With no patterns the scanner (and its stream redactors) pass text through unchanged
+sensitive_data = PiiScanner(SENSITIVE_DATA_PATTERNS if ENABLE_HOOKS and ENABLE_PII_REDACTION else [])
+
+
+def _tenant(context: Any) -> Optional[str]:
+    if isinstance(context, dict):
+        return context.get("tenant_id")
+    return None
+
+
+def _workspace(context: Any) -> Optional[str]:
+    if isinstance(context, dict) and context.get("working_directory"):
+        return posixpath.normpath(context["working_directory"])
+    return None
+
 
+# Shell control operators that start a new simple command
+_COMMAND_SEPARATORS = {";", "&", "&&", "|", "||", "(", ")", "{", "}"}
+# Words that run the command after them (sudo is also blocked outright above)
+_COMMAND_PREFIXES = {"sudo", "command", "exec", "nohup", "time", "env", "nice"}
+# Stands for "~" / "$HOME" or an unresolvable directory: everything under it is outside
+_OUTSIDE = "~"
+
+
+def _commands(command: str) -> list[list[str]]:
+    """Split a shell command into simple commands (lists of words)."""
+    lexer = shlex.shlex(command.replace("\n", ";"), posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        # Unbalanced quotes: bash would not run it either, but check the words anyway
+        tokens = command.replace("\n", " ; ").split()
+    commands: list[list[str]] = [[]]
+    for token in tokens:
+        if token in _COMMAND_SEPARATORS or set(token) <= set(";&|()"):
+            commands.append([])
+        else:
+            commands[-1].append(token)
+    return [words for words in commands if words]
+
+
+def _resolve(cwd: Optional[str], path: str) -> Optional[str]:
+    """Absolute path of `path` run from `cwd`; None when cwd is unknown, _OUTSIDE when home or unresolvable."""
+    if path.startswith("~") or "$" in path or "`" in path:
+        return _OUTSIDE
+    if path.startswith("/"):
+        return posixpath.normpath(path)
+    if cwd is None or cwd == _OUTSIDE:
+        return cwd
+    return posixpath.normpath(posixpath.join(cwd, path))
+
+
+def recursive_rm_outside(command: str, workspace: Optional[str]) -> Optional[str]:
+    """
+    First target of a recursive rm in `command` that is not strictly inside
+    `workspace`, or None.
+
+    `cd` within the command is followed, so "cd / && rm -rf *" is caught.
+    "~", "$HOME" and other variables count as outside the workspace. With
+    no workspace known, every absolute target counts as outside.
+    """
+    cwd = workspace
+    for words in _commands(command):
+        while len(words) > 1 and (words[0] in _COMMAND_PREFIXES or "=" in words[0] or words[0].startswith("-")):
+            words = words[1:]
+        name = posixpath.basename(words[0])
+        if name == "cd":
+            args = [w for w in words[1:] if not w.startswith("-")]
+            cwd = _resolve(cwd, args[0] if args else "~")
+            continue
+        if name != "rm":
+            continue
+        recursive = False
+        targets = []
+        options = True
+        for word in words[1:]:
+            if options and word == "--":
+                options = False
+            elif options and word.startswith("--"):
+                recursive = recursive or word == "--recursive"
+            elif options and word.startswith("-") and word != "-":
+                recursive = recursive or "r" in word or "R" in word
+            else:
+                targets.append(word)
+        if not recursive:
+            continue
+        for target in targets:
+            path = _resolve(cwd, target)
+            if path is None:
+                continue
+            if path == _OUTSIDE or workspace is None or not path.startswith(workspace.rstrip("/") + "/"):
+                return target
+    return None
+
+
+@timed_hook("pre_tool_use")
 async def pre_tool_use_hook(input_data: dict[str, Any], tool_use_id: str, context: Any) -> dict[str, Any]:
     """
     Hook called before tool execution.
@@ -92,32 +233,36 @@ async def pre_tool_use_hook(input_data: dict[str, Any], tool_use_id: str, contex
     
     tool_name = input_data.get("tool_name", "")
     tool_input = input_data.get("tool_input", {})
+    tenant = _tenant(context)
     
-    # Check bash commands for dangerous patterns
-    if tool_name == "Bash":
+    # Check bash commands for dangerous patterns (SDK "Bash", fallback loop "bash")
+    if tool_name in ["Bash", "bash"]:
         command = tool_input.get("command", "")
-        for pattern in BLOCKED_BASH_PATTERNS:
-            if pattern in command:
-                return {
-                    "hookSpecificOutput": {
-                        "hookEventName": "PreToolUse",
-                        "permissionDecision": "deny",
-                        "permissionDecisionReason": f"Blocked dangerous pattern: {pattern}",
-                    }
+        pattern = hook_patterns.matcher("blocked_bash", tenant).search(command)
+        target = recursive_rm_outside(command, _workspace(context))
+        if target is not None:
+            pattern = f"rm -r outside the workspace ({target})"
+        if pattern:
+            return {
+                "hookSpecificOutput": {
+                    "hookEventName": "PreToolUse",
+                    "permissionDecision": "deny",
+                    "permissionDecisionReason": f"Blocked dangerous pattern: {pattern}",
                 }
+            }
     
     # Check file operations for path escape attempts
     if tool_name in ["Read", "Write", "Edit", "read_file", "write_file"]:
         path = tool_input.get("path", "") or tool_input.get("file_path", "")
-        for pattern in PATH_ESCAPE_PATTERNS:
-            if pattern in path:
-                return {
-                    "hookSpecificOutput": {
-                        "hookEventName": "PreToolUse",
-                        "permissionDecision": "deny",
-                        "permissionDecisionReason": f"Path escape attempt blocked: {pattern}",
-                    }
+        pattern = hook_patterns.matcher("path_escape", tenant).search(path)
+        if pattern:
+            return {
+                "hookSpecificOutput": {
+                    "hookEventName": "PreToolUse",
+                    "permissionDecision": "deny",
+                    "permissionDecisionReason": f"Path escape attempt blocked: {pattern}",
                 }
+            }
         
         # Block absolute paths outside workspace
         if path.startswith("/") and not path.startswith("/workspaces"):
@@ -129,14 +274,40 @@ async def pre_tool_use_hook(input_data: dict[str, Any], tool_use_id: str, contex
                 }
             }
     
+    # Rate limits, checked last so denied calls do not use up tokens
+    if ENABLE_RATE_LIMITS:
+        throttled = await rate_limiter.check(
+            _TOOL_RATE_LIMITS.get(tool_name, ["api_calls_per_minute"]),
+            context if isinstance(context, dict) else {}
+        )
+        if throttled:
+            limit, retry_after = throttled
+            return {
+                "hookSpecificOutput": {
+                    "hookEventName": "PreToolUse",
+                    "permissionDecision": "deny",
+                    "permissionDecisionReason": f"Rate limit exceeded: {limit} (retry in {retry_after:.1f}s)",
+                }
+            }
+    
     return {}  # Allow
 
 
+@timed_hook("post_tool_use")
 async def post_tool_use_hook(input_data: dict[str, Any], tool_use_id: str, result: Any, context: Any) -> dict[str, Any]:
     """
     Hook called after tool execution.
     
-    Can be used for audit logging, result validation, etc.
+    Audit-logs the call and redacts sensitive data from the result; returns
+    the redacted result as hookSpecificOutput.updatedToolOutput if any
+    was found. Results over PII_SCAN_THREAD_MIN_CHARS are scanned in a
+    worker thread so a large read does not stall other runs' streams.
+
+    The redacted result is also what the model sees. A file read and then
+    rewritten by the model (read_file -> write_file/Edit) therefore has
+    "[REDACTED:<NAME>]" in place of the identifiers it contained; set
+    ENABLE_PII_REDACTION=false for workspaces whose files must round-trip
+    such data unchanged.
     """
     if not ENABLE_HOOKS:
         return {}
@@ -147,14 +318,37 @@ async def post_tool_use_hook(input_data: dict[str, Any], tool_use_id: str, resul
     # Audit logging (basic implementation)
     logger.info(f"[AUDIT] Tool executed: {tool_name}, tool_use_id: {tool_use_id}")
     
+    # Check for sensitive data in output
+    if text_length(result) > PII_SCAN_THREAD_MIN_CHARS:
+        redacted = await asyncio.to_thread(sensitive_data.redact_value, result)
+    else:
+        redacted = sensitive_data.redact_value(result)
+    if redacted is not result:
+        logger.info(f"[AUDIT] Redacted sensitive data from {tool_name} output, tool_use_id: {tool_use_id}")
+        return {
+            "hookSpecificOutput": {
+                "hookEventName": "PostToolUse",
+                "updatedToolOutput": redacted,
+            }
+        }
+    
     # Placeholder: Add result validation here
-    # - Check for sensitive data in output
     # - Validate file modifications
     # - Track resource usage
     
     return {}
 
 
+def hook_stats() -> dict:
+    """Per-hook latency histograms, pattern reload state, redaction and throttling counts."""
+    return {
+        "latency": {name: histogram.snapshot() for name, histogram in hook_latency.items()},
+        "patterns": hook_patterns.stats(),
+        "redactions": dict(sensitive_data.redactions),
+        "rate_limits": rate_limiter.stats(),
+    }
+
+
 def get_hook_matchers() -> dict[str, list[dict[str, Any]]]:
     """
     Get hook matchers for Claude Agent SDK.
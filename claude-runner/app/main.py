@@ -1,22 +1,33 @@
-import asyncio
 import os
 import pathlib
 import uuid
-from typing import Any
+from contextlib import asynccontextmanager
+from typing import Any, Optional
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from .config import WORKSPACES_ROOT, PORT
+from .config import WORKSPACES_ROOT, PORT, SCHEDULER_RETRY_AFTER_SECONDS
 from .agent import run_agent_loop
 from .events import make_event, format_sse
 from .api.skills_router import router as skills_router
+from .api.admin_router import router as admin_router
+from .run_store import run_store, RunRecord, ThreadRecord
+from .scheduler import run_scheduler, SchedulerFull
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    run_store.start()
+    yield
+    await run_store.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(skills_router)
+app.include_router(admin_router)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -38,30 +49,15 @@ class CreateThreadResponse(BaseModel):
 class CreateRunRequest(BaseModel):
     threadId: str
     prompt: str
+    tenantId: Optional[str] = None
+    priority: int = 0
+    # One ui.message.assistant.delta per model delta instead of coalesced ones
+    tokenStreaming: bool = False
 
 
 class CreateRunResponse(BaseModel):
     runId: str
-
-
-class ThreadRecord:
-    def __init__(self, thread_id: str, working_directory: str):
-        self.thread_id = thread_id
-        self.working_directory = working_directory
-
-
-class RunRecord:
-    def __init__(self, run_id: str, thread_id: str, prompt: str):
-        self.run_id = run_id
-        self.thread_id = thread_id
-        self.prompt = prompt
-        self.buffer: list[str] = []
-        self.subscribers: set[asyncio.Queue[str | None]] = set()
-        self.status: str = "running"
-
-
-threads: dict[str, ThreadRecord] = {}
-runs: dict[str, RunRecord] = {}
+    queuePosition: Optional[int] = None
 
 
 def must_resolve_workspace(path_str: str) -> str:
@@ -86,14 +82,14 @@ async def create_thread(req: CreateThreadRequest) -> CreateThreadResponse:
         raise HTTPException(status_code=400, detail=f"Directory does not exist: {working_directory}")
     
     thread_id = str(uuid.uuid4())
-    threads[thread_id] = ThreadRecord(thread_id, working_directory)
+    run_store.add_thread(ThreadRecord(thread_id, working_directory))
     
     return CreateThreadResponse(threadId=thread_id)
 
 
 @app.post("/runs", response_model=CreateRunResponse)
 async def create_run(req: CreateRunRequest) -> CreateRunResponse:
-    thread_record = threads.get(req.threadId)
+    thread_record = run_store.get_thread(req.threadId)
     if not thread_record:
         raise HTTPException(status_code=404, detail="Thread not found")
     
@@ -102,49 +98,79 @@ async def create_run(req: CreateRunRequest) -> CreateRunResponse:
     
     run_id = str(uuid.uuid4())
     run_record = RunRecord(run_id, req.threadId, req.prompt)
-    runs[run_id] = run_record
     
-    asyncio.create_task(_execute_run(run_record, thread_record))
+    def on_position(position: int, queue_length: int) -> None:
+        event_str = format_sse(make_event(
+            run_id,
+            "run.queued",
+            {"position": position, "queueLength": queue_length},
+            run_record.event_count
+        ))
+        run_store.append_event(run_record, event_str)
+        run_record.broadcast.publish(event_str)
     
-    return CreateRunResponse(runId=run_id)
+    try:
+        position = run_scheduler.submit(
+            run_id,
+            thread_id=req.threadId,
+            workspace=thread_record.working_directory,
+            start=lambda: _execute_run(run_record, thread_record, req.tenantId, req.tokenStreaming),
+            tenant=req.tenantId,
+            priority=req.priority,
+            on_position=on_position
+        )
+    except SchedulerFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Runner at capacity: {e}",
+            headers={"Retry-After": str(SCHEDULER_RETRY_AFTER_SECONDS)}
+        )
+    run_store.add_run(run_record)
+    
+    return CreateRunResponse(runId=run_id, queuePosition=position)
 
 
-async def _execute_run(run_record: RunRecord, thread_record: ThreadRecord) -> None:
+async def _execute_run(
+    run_record: RunRecord,
+    thread_record: ThreadRecord,
+    tenant_id: Optional[str] = None,
+    token_streaming: bool = False
+) -> None:
     """Execute the agent loop and publish events."""
     try:
         async for event_str in run_agent_loop(
             thread_record.thread_id,
             run_record.run_id,
             run_record.prompt,
-            thread_record.working_directory
+            thread_record.working_directory,
+            seq=run_record.event_count,
+            tenant_id=tenant_id,
+            token_streaming=token_streaming
         ):
-            run_record.buffer.append(event_str)
-            for queue in run_record.subscribers:
-                await queue.put(event_str)
+            run_store.append_event(run_record, event_str)
+            run_record.broadcast.publish(event_str)
         
         run_record.status = "completed"
     except Exception as e:
-        error_event = format_sse(make_event(run_record.run_id, "error", {"message": str(e)}, len(run_record.buffer)))
-        run_record.buffer.append(error_event)
-        for queue in run_record.subscribers:
-            await queue.put(error_event)
+        error_event = format_sse(make_event(run_record.run_id, "error", {"message": str(e)}, run_record.event_count))
+        run_store.append_event(run_record, error_event)
+        run_record.broadcast.publish(error_event)
         run_record.status = "error"
     finally:
-        for queue in run_record.subscribers:
-            await queue.put(None)
-        run_record.subscribers.clear()
+        run_record.broadcast.close()
+    await run_store.finish(run_record)
 
 
 @app.get("/runs/{run_id}/events")
-async def run_events(run_id: str, request: Request) -> StreamingResponse:
-    run_record = runs.get(run_id)
+async def run_events(run_id: str) -> StreamingResponse:
+    run_record = run_store.get_run(run_id)
     if not run_record:
         raise HTTPException(status_code=404, detail="Run not found")
     
     async def stream():
         yield ": connected\n\n"
         
-        for event_str in run_record.buffer:
+        async for event_str in run_store.replay(run_record):
             yield event_str
         
         if run_record.status != "running":
@@ -152,27 +178,20 @@ async def run_events(run_id: str, request: Request) -> StreamingResponse:
                 run_id,
                 "stream.closed",
                 {"status": run_record.status},
-                len(run_record.buffer)
+                run_record.event_count
             ))
             return
         
-        queue: asyncio.Queue[str | None] = asyncio.Queue()
-        run_record.subscribers.add(queue)
-        
+        # No await since the replay finished, so no event can slip in between
+        queue = run_record.broadcast.subscribe()
         try:
             while True:
-                if await request.is_disconnected():
+                event_str = await queue.get()
+                if event_str is None:
                     break
-                
-                try:
-                    event_str = await asyncio.wait_for(queue.get(), timeout=1.0)
-                    if event_str is None:
-                        break
-                    yield event_str
-                except asyncio.TimeoutError:
-                    continue
+                yield event_str
         finally:
-            run_record.subscribers.discard(queue)
+            run_record.broadcast.unsubscribe(queue)
     
     return StreamingResponse(
         stream(),
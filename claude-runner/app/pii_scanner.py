@@ -0,0 +1,255 @@
+"""
+Detection and redaction of sensitive identifiers (PII/PHI) in text.
+
+Running a regex over every character of large outputs manages only a few
+MB/s in CPython, so the scan has two stages:
+
+1. ASCII digits are mapped to "0" (str.translate) and runs of digits and
+   separators are found with a literal-prefix regex. Both run at hundreds
+   of MB/s, and text without digit runs ends here.
+2. Only a small window around each run goes through the combined pattern
+   regex. Every pattern must therefore contain two consecutive digits,
+   with at most `prefix_chars` characters before them.
+
+Text dense with numbers (logs, CSV) would pay the per-window overhead for
+almost every number, so once digit runs come close together the rest of
+the text is scanned with the combined regex in one pass instead. On
+source code the two stages run at well over 100 MB/s; on number-heavy
+output both paths are bound by the regex and validation, at about
+5-7 MB/s (tests/bench_pii.py). Large tool results are therefore redacted
+in a worker thread (see hooks.post_tool_use_hook).
+
+Candidates are then confirmed by their check digits where the format has
+one (NHS number: issued range and modulus 11, payment card: Luhn). That
+keeps ten-digit timestamps, phone numbers and ids from being redacted.
+Confirmed matches are replaced by "[REDACTED:<NAME>]".
+
+StreamRedactor applies the same scan to text that arrives in chunks
+(bash output, assistant deltas). It holds back the last
+`max_match_len` characters of each chunk, so an identifier split across
+two chunks is still found. Whatever has been held back is released by
+flush() at the end of the stream.
+"""
+
+import re
+from typing import Any, Callable, Iterator, Optional
+
+
+_DIGITS_TO_ZERO = str.maketrans("123456789", "000000000")
+_DROP_SEPARATORS = str.maketrans("", "", " -")
+# A digit run (two or more digits, possibly split by spaces/hyphens) in translated text
+_DIGIT_RUN = re.compile(r"00[0 -]*")
+
+_NHS_WEIGHTS = (10, 9, 8, 7, 6, 5, 4, 3, 2)
+_LUHN_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+
+def nhs_number_valid(digits: str) -> bool:
+    """
+    Modulus 11 check of a ten-digit NHS number.
+
+    Only the issued ranges count (England, Wales and Isle of Man 400-499
+    and 600-799, Northern Ireland 320-399). About one in eleven random
+    ten-digit numbers passes the check digit alone; the ranges rule out
+    Unix timestamps (1...) and phone numbers (0...).
+    """
+    if len(digits) != 10 or not digits.isdigit():
+        return False
+    prefix = int(digits[:3])
+    if not (320 <= prefix <= 499 or 600 <= prefix <= 799):
+        return False
+    check = 11 - sum(map(int.__mul__, map(int, digits[:9]), _NHS_WEIGHTS)) % 11
+    if check == 11:
+        check = 0
+    return check != 10 and check == int(digits[9])
+
+
+def luhn_valid(digits: str) -> bool:
+    values = list(map(int, reversed(digits)))
+    return (sum(values[0::2]) + sum(_LUHN_DOUBLED[d] for d in values[1::2])) % 10 == 0
+
+
+VALIDATORS: dict[str, Callable[[str], bool]] = {
+    "nhs_number": nhs_number_valid,
+    "luhn": luhn_valid,
+}
+
+
+def text_length(value: Any) -> int:
+    """Total length of the strings inside a JSON-like value."""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(text_length(v) for v in value.values())
+    if isinstance(value, list):
+        return sum(text_length(v) for v in value)
+    return 0
+
+
+class PiiScanner:
+    """
+    Scans text for a list of {"name", "regex", "validator"?} patterns.
+
+    A validator gets the digits of the match (separators removed).
+    """
+
+    def __init__(
+        self,
+        patterns: list[dict[str, Any]],
+        max_match_len: int = 64,
+        prefix_chars: int = 4,
+        suffix_chars: int = 4,
+        merge_gap: int = 16,
+        dense_runs: int = 32
+    ):
+        self.max_match_len = max_match_len
+        self.prefix_chars = prefix_chars
+        self.suffix_chars = suffix_chars
+        self.merge_gap = merge_gap
+        self.dense_runs = dense_runs
+        self.names: list[str] = []
+        self.validators: list[Optional[Callable[[str], bool]]] = []
+        alternatives = []
+        for pattern in patterns:
+            alternatives.append(f"(?P<_p{len(self.names)}>{pattern['regex']})")
+            self.names.append(pattern["name"])
+            validator = pattern.get("validator")
+            self.validators.append(VALIDATORS[validator] if validator else None)
+        self.regex = re.compile("|".join(alternatives)) if alternatives else None
+        self.redactions: dict[str, int] = {name: 0 for name in self.names}
+
+    def _replacement(self, match: "re.Match[str]") -> Optional[str]:
+        index = int(match.lastgroup[2:])
+        validator = self.validators[index]
+        if validator is not None and not validator(match.group().translate(_DROP_SEPARATORS)):
+            return None
+        name = self.names[index]
+        self.redactions[name] += 1
+        return f"[REDACTED:{name}]"
+
+    def _windows(self, text: str, pos: int, end: int) -> Iterator[tuple[int, int]]:
+        """
+        Spans of text[pos:] around digit runs that start before `end`.
+
+        Windows less than `merge_gap` characters apart are merged. Once
+        `dense_runs` runs in a row have been merged the text is dense with
+        numbers (logs, CSV), where one scan per number costs more than the
+        plain regex, so the rest of the text becomes a single window.
+        """
+        translated = text.translate(_DIGITS_TO_ZERO)
+        start = stop = -1
+        merged = 0
+        for run in _DIGIT_RUN.finditer(translated, pos):
+            run_start = max(pos, run.start() - self.prefix_chars)
+            if run_start >= end:
+                break
+            run_stop = min(len(text), run.end() + self.suffix_chars)
+            if start >= 0 and run_start <= stop + self.merge_gap:
+                stop = run_stop
+                merged += 1
+                if merged >= self.dense_runs:
+                    # finditer stops at the first match past `end`
+                    yield start, len(text)
+                    return
+                continue
+            if start >= 0:
+                yield start, stop
+            start, stop = run_start, run_stop
+            merged = 0
+        if start >= 0:
+            yield start, stop
+
+    def _redact(self, text: str, pos: int, end: int) -> tuple[str, int]:
+        """
+        Redact matches in text[pos:] that start before `end`.
+
+        Returns the redacted text[pos:stop] and `stop`: `end`, or the start
+        of a match that runs past it (that match is left for the next call).
+        If nothing was redacted the returned text is `text` itself when the
+        whole of it was scanned.
+        """
+        out = []
+        last = pos
+        for window_start, window_end in self._windows(text, pos, end):
+            deferred = False
+            # Lookarounds only see inside the window, so suffix_chars must cover any lookahead
+            for match in self.regex.finditer(text, max(last, window_start), window_end):
+                if match.start() >= end:
+                    break
+                if match.end() > end:
+                    end = match.start()
+                    deferred = True
+                    break
+                replacement = self._replacement(match)
+                if replacement is not None:
+                    out.append(text[last:match.start()])
+                    out.append(replacement)
+                    last = match.end()
+            if deferred:
+                break
+        if not out and pos == 0 and end == len(text):
+            return text, end
+        out.append(text[last:end])
+        return "".join(out), end
+
+    def redact(self, text: str) -> str:
+        """Redacted copy of `text`, or `text` itself if there was nothing to redact."""
+        if self.regex is None or not text:
+            return text
+        return self._redact(text, 0, len(text))[0]
+
+    def redact_value(self, value: Any) -> Any:
+        """
+        Redact every string inside a JSON-like value (tool results).
+
+        Returns `value` itself if there was nothing to redact, so callers can
+        tell with `is`.
+        """
+        if isinstance(value, str):
+            return self.redact(value)
+        if isinstance(value, dict):
+            redacted = {k: self.redact_value(v) for k, v in value.items()}
+            return value if all(redacted[k] is v for k, v in value.items()) else redacted
+        if isinstance(value, list):
+            redacted_items = [self.redact_value(v) for v in value]
+            return value if all(r is v for r, v in zip(redacted_items, value)) else redacted_items
+        return value
+
+    def stream(self) -> "StreamRedactor":
+        return StreamRedactor(self)
+
+
+class StreamRedactor:
+    """Incremental redaction of one stream of text chunks."""
+
+    # Already-released characters kept so lookbehinds work across chunks
+    _CONTEXT = 8
+
+    def __init__(self, scanner: PiiScanner):
+        self.scanner = scanner
+        self._buffer = ""
+        self._context = 0
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk; returns the redacted text that is safe to release now."""
+        if self.scanner.regex is None:
+            return chunk
+        buffer = self._buffer + chunk
+        end = len(buffer) - self.scanner.max_match_len
+        if end <= self._context:
+            self._buffer = buffer
+            return ""
+        released, stop = self.scanner._redact(buffer, self._context, end)
+        keep_from = max(0, stop - self._CONTEXT)
+        self._buffer = buffer[keep_from:]
+        self._context = stop - keep_from
+        return released
+
+    def flush(self) -> str:
+        """Release everything still held back, redacted."""
+        if self.scanner.regex is None:
+            return ""
+        released, _ = self.scanner._redact(self._buffer, self._context, len(self._buffer))
+        self._buffer = ""
+        self._context = 0
+        return released
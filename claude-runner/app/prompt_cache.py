@@ -0,0 +1,67 @@
+"""
+Prompt caching for the anthropic fallback loop.
+
+Every iteration of a run re-sends the tool definitions, the skills system
+prompt and the whole conversation so far. Marking them with cache_control
+lets the API reuse the processed prefix instead of reading it again:
+
+- the last tool definition (caches the tool list)
+- the system prompt (caches tools + system)
+- the last block of the newest message (caches the conversation so far;
+  the next iteration reads it back and only pays for the new turn)
+
+That is three of the four breakpoints a request may carry. Prefixes
+shorter than the model's minimum cacheable length are simply not cached.
+"""
+
+from typing import Any
+
+from .config import PROMPT_CACHING_ENABLED
+
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+
+def cached_tools(tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """The tool list with a cache breakpoint on its last entry."""
+    if not PROMPT_CACHING_ENABLED or not tools:
+        return tools
+    return tools[:-1] + [{**tools[-1], "cache_control": _EPHEMERAL}]
+
+
+def cached_system(system_prompt: str) -> str | list[dict[str, Any]]:
+    """The system prompt as a text block carrying a cache breakpoint."""
+    if not PROMPT_CACHING_ENABLED:
+        return system_prompt
+    return [{"type": "text", "text": system_prompt, "cache_control": _EPHEMERAL}]
+
+
+def with_cache_breakpoint(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Copy of `messages` with a breakpoint on the last block of the last message.
+
+    The conversation itself is not modified, so earlier breakpoints never
+    pile up past the per-request limit.
+    """
+    if not PROMPT_CACHING_ENABLED or not messages:
+        return messages
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = list(content)
+    if not blocks:
+        return messages
+    blocks[-1] = {**blocks[-1], "cache_control": _EPHEMERAL}
+    return messages[:-1] + [{**last, "content": blocks}]
+
+
+def usage_payload(usage: Any) -> dict[str, int]:
+    """Token counts from a Message.usage, including cache reads and writes."""
+    return {
+        "inputTokens": usage.input_tokens or 0,
+        "outputTokens": usage.output_tokens or 0,
+        "cacheReadInputTokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        "cacheCreationInputTokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+    }
@@ -0,0 +1,212 @@
+"""
+Token-bucket rate limiting for agent tool calls.
+
+Every limit in hooks.RATE_LIMITS is a bucket holding up to `per_minute`
+tokens that refills at per_minute / 60 tokens a second; a tool call takes
+one token or is throttled. Buckets are keyed by RATE_LIMIT_SCOPE: the
+run, its workspace (default) or its tenant.
+
+A tool call draws from several limits (e.g. bash_commands_per_minute and
+api_calls_per_minute). It takes a token from each of them or from none:
+all buckets are checked before any is drawn from, so a call denied by one
+limit does not use up the others.
+
+Buckets live in process memory unless RATE_LIMIT_REDIS_URL is set, in
+which case all runner replicas share them through Redis (one atomic Lua
+script per call; needs the optional `redis` package). The script reads
+the Redis server's clock, so clock skew between replicas does not affect
+refills, and it is reloaded if Redis restarts and loses its script
+cache. If Redis cannot be reached the limiter falls back to the local
+buckets rather than blocking every tool call.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .config import RATE_LIMIT_SCOPE, RATE_LIMIT_REDIS_URL
+
+
+# Idle buckets beyond this many are forgotten (a forgotten bucket is simply full again)
+MAX_LOCAL_BUCKETS = 10000
+
+
+# (key, capacity, refill per second) of each bucket a call draws from
+Bucket = tuple[str, float, float]
+
+
+class LocalBucketStore:
+    """Buckets in process memory, least recently used first."""
+
+    def __init__(self, max_buckets: int = MAX_LOCAL_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # key -> (tokens, updated_at)
+
+    async def take(self, buckets: list[Bucket]) -> Optional[tuple[int, float]]:
+        """
+        Take one token from every bucket, or from none.
+
+        Returns None if allowed, else (index of the first empty bucket,
+        seconds until it has a token).
+        """
+        now = time.time()
+        levels = []
+        for index, (key, capacity, refill_per_second) in enumerate(buckets):
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated_at) * refill_per_second)
+            if tokens < 1:
+                return index, (1 - tokens) / refill_per_second
+            levels.append(tokens)
+        for (key, _, _), tokens in zip(buckets, levels):
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return None
+
+
+# KEYS: bucket hashes; ARGV: capacity and refill per second of each bucket, in KEYS order.
+# Returns {-1, "0"} if a token was taken from every bucket, else {index of the first
+# empty bucket (0-based), wait in seconds as a string}.
+TOKEN_BUCKET_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[2 * i - 1])
+  local rate = tonumber(ARGV[2 * i])
+  local state = redis.call('HMGET', key, 'tokens', 'updated_at')
+  local tokens = tonumber(state[1]) or capacity
+  local updated_at = tonumber(state[2]) or now
+  tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+  if tokens < 1 then
+    return {i - 1, tostring((1 - tokens) / rate)}
+  end
+  levels[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[2 * i - 1])
+  local rate = tonumber(ARGV[2 * i])
+  redis.call('HSET', key, 'tokens', tostring(levels[i] - 1), 'updated_at', tostring(now))
+  redis.call('EXPIRE', key, math.ceil(capacity / rate) + 60)
+end
+return {-1, "0"}
+"""
+
+
+def _is_noscript(error: Exception) -> bool:
+    """Redis lost its script cache (restart or failover)."""
+    return type(error).__name__ == "NoScriptError" or str(error).startswith("NOSCRIPT")
+
+
+class RedisBucketStore:
+    """Buckets shared by all replicas in Redis; `client` is a redis.asyncio client."""
+
+    def __init__(self, client: Any, prefix: str = "claude-runner:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._sha: Optional[str] = None
+        self.script_reloads = 0
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBucketStore":
+        import redis.asyncio as redis
+
+        return cls(redis.from_url(url))
+
+    async def take(self, buckets: list[Bucket]) -> Optional[tuple[int, float]]:
+        keys = [self.prefix + key for key, _, _ in buckets]
+        args = [value for _, capacity, rate in buckets for value in (capacity, rate)]
+        try:
+            reply = await self._evalsha(keys, args)
+        except Exception as e:
+            if not _is_noscript(e):
+                raise
+            self._sha = None
+            self.script_reloads += 1
+            reply = await self._evalsha(keys, args)
+        index, wait = int(reply[0]), reply[1]
+        if index < 0:
+            return None
+        return index, float(wait.decode() if isinstance(wait, bytes) else wait)
+
+    async def _evalsha(self, keys: list[str], args: list[float]) -> Any:
+        if self._sha is None:
+            self._sha = await self.client.script_load(TOKEN_BUCKET_LUA)
+        return await self.client.evalsha(self._sha, len(keys), *keys, *args)
+
+
+class ToolRateLimiter:
+    def __init__(
+        self,
+        limits: dict[str, int],
+        scope: str = RATE_LIMIT_SCOPE,
+        shared: Optional[Any] = None
+    ):
+        self.limits = limits
+        self.scope = scope
+        self.local = LocalBucketStore()
+        self.shared = shared
+        self.throttled: dict[str, int] = {name: 0 for name in limits}
+        self.shared_errors = 0
+        self._shared_failing = False
+
+    def scope_key(self, context: dict[str, Any]) -> str:
+        if self.scope == "run":
+            return f"run:{context.get('run_id') or '-'}"
+        if self.scope == "tenant":
+            return f"tenant:{context.get('tenant_id') or 'default'}"
+        return f"workspace:{context.get('working_directory') or '-'}"
+
+    async def check(self, limit_names: list[str], context: dict[str, Any]) -> Optional[tuple[str, float]]:
+        """Take a token from each named limit, or from none; returns (limit, retry_after) for the first that is empty."""
+        scope_key = self.scope_key(context)
+        names = [name for name in limit_names if self.limits.get(name)]
+        if not names:
+            return None
+        # The scope is a Redis hash tag, so a call's buckets share a cluster slot
+        buckets = [
+            (f"{{{scope_key}}}:{name}", float(self.limits[name]), self.limits[name] / 60.0)
+            for name in names
+        ]
+        denied = None
+        taken = False
+        if self.shared is not None:
+            try:
+                denied = await self.shared.take(buckets)
+                taken = True
+                self._shared_failing = False
+            except Exception as e:
+                if not self._shared_failing:
+                    print(f"Shared rate limit store failed, using local buckets until it recovers: {e}")
+                self._shared_failing = True
+                self.shared_errors += 1
+        if not taken:
+            denied = await self.local.take(buckets)
+        if denied is None:
+            return None
+        name = names[denied[0]]
+        self.throttled[name] += 1
+        return name, denied[1]
+
+    def stats(self) -> dict:
+        return {
+            "limits": dict(self.limits),
+            "scope": self.scope,
+            "shared": self.shared is not None,
+            "shared_errors": self.shared_errors,
+            "shared_failing": self._shared_failing,
+            "script_reloads": getattr(self.shared, "script_reloads", 0),
+            "throttled": dict(self.throttled),
+        }
+
+
+def shared_store_from_config() -> Optional[RedisBucketStore]:
+    if not RATE_LIMIT_REDIS_URL:
+        return None
+    try:
+        return RedisBucketStore.from_url(RATE_LIMIT_REDIS_URL)
+    except ImportError:
+        print("RATE_LIMIT_REDIS_URL is set but the redis package is not installed; using local rate limit buckets")
+        return None
@@ -0,0 +1,234 @@
+"""
+Bounded in-memory registry of threads and runs.
+
+Runs keep their SSE buffer so a late subscriber can replay the whole run,
+but finished runs cannot stay in memory forever. The store evicts
+finished runs (never running ones) by:
+
+- TTL: untouched for RUN_STORE_TTL_SECONDS
+- count: more than RUN_STORE_MAX_RUNS finished runs, least recently used first
+- memory: buffers above RUN_STORE_MAX_BUFFER_BYTES, least recently used first
+
+With RUN_SPILL_DIR set, the memory limit moves finished buffers to an
+append-only log file on disk instead of dropping them; the run can still
+be replayed from there until its TTL expires. Threads idle for longer
+than THREAD_TTL_SECONDS are forgotten as well.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+
+from .broadcast import RunBroadcast
+from .config import (
+    RUN_STORE_TTL_SECONDS,
+    RUN_STORE_MAX_RUNS,
+    RUN_STORE_MAX_BUFFER_BYTES,
+    RUN_STORE_SWEEP_INTERVAL_SECONDS,
+    RUN_SPILL_DIR,
+    THREAD_TTL_SECONDS,
+)
+
+
+SPILL_READ_CHUNK_SIZE = 64 * 1024
+
+
+class ThreadRecord:
+    def __init__(self, thread_id: str, working_directory: str):
+        self.thread_id = thread_id
+        self.working_directory = working_directory
+        self.last_access = time.monotonic()
+
+
+class RunRecord:
+    def __init__(self, run_id: str, thread_id: str, prompt: str):
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.prompt = prompt
+        self.buffer: list[str] = []
+        self.event_count = 0
+        # SSE strings are ASCII-only JSON (json.dumps escapes the rest), so len() is the byte size
+        self.buffer_bytes = 0
+        self.broadcast = RunBroadcast()
+        self.status: str = "running"
+        self.last_access = time.monotonic()
+        self.spill_path: Optional[str] = None
+
+
+class RunStore:
+    """Threads and runs keyed by id; `runs` is kept in least-recently-used order."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = RUN_STORE_TTL_SECONDS,
+        max_runs: int = RUN_STORE_MAX_RUNS,
+        max_buffer_bytes: int = RUN_STORE_MAX_BUFFER_BYTES,
+        spill_dir: str = RUN_SPILL_DIR,
+        thread_ttl_seconds: float = THREAD_TTL_SECONDS
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_runs = max_runs
+        self.max_buffer_bytes = max_buffer_bytes
+        self.spill_dir = spill_dir
+        self.thread_ttl_seconds = thread_ttl_seconds
+        self.threads: dict[str, ThreadRecord] = {}
+        self.runs: OrderedDict[str, RunRecord] = OrderedDict()
+        self.buffer_bytes = 0
+        self.evicted_runs = 0
+        self.evicted_threads = 0
+        self.spilled_runs = 0
+        self.spill_errors = 0
+        self._lock = asyncio.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def add_thread(self, thread: ThreadRecord) -> None:
+        self.threads[thread.thread_id] = thread
+
+    def get_thread(self, thread_id: str) -> Optional[ThreadRecord]:
+        thread = self.threads.get(thread_id)
+        if thread:
+            thread.last_access = time.monotonic()
+        return thread
+
+    def add_run(self, run: RunRecord) -> None:
+        self.runs[run.run_id] = run
+
+    def get_run(self, run_id: str) -> Optional[RunRecord]:
+        run = self.runs.get(run_id)
+        if run:
+            run.last_access = time.monotonic()
+            self.runs.move_to_end(run_id)
+        return run
+
+    def append_event(self, run: RunRecord, event_str: str) -> None:
+        run.buffer.append(event_str)
+        run.event_count += 1
+        run.buffer_bytes += len(event_str)
+        self.buffer_bytes += len(event_str)
+
+    async def finish(self, run: RunRecord) -> None:
+        """Called once a run has its final status; applies the limits."""
+        run.last_access = time.monotonic()
+        await self.enforce_limits()
+
+    async def replay(self, run: RunRecord) -> AsyncIterator[str]:
+        """Yield the buffered events of a run, from memory or from its spill file."""
+        buffer = run.buffer
+        if run.spill_path and not buffer:
+            with open(run.spill_path, "r", encoding="utf-8") as f:
+                while True:
+                    chunk = await asyncio.to_thread(f.read, SPILL_READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            return
+        # Iterate the live list: events appended while we yield are picked up too
+        for event_str in buffer:
+            yield event_str
+
+    async def enforce_limits(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+
+            for run in list(self.runs.values()):
+                if run.status != "running" and now - run.last_access > self.ttl_seconds:
+                    await self._evict(run)
+
+            finished = [r for r in self.runs.values() if r.status != "running"]
+            for run in finished[:max(0, len(finished) - self.max_runs)]:
+                await self._evict(run)
+
+            if self.buffer_bytes > self.max_buffer_bytes:
+                for run in list(self.runs.values()):
+                    if self.buffer_bytes <= self.max_buffer_bytes:
+                        break
+                    if run.status == "running" or not run.buffer:
+                        continue
+                    if not self.spill_dir or not await self._spill(run):
+                        await self._evict(run)
+
+            busy_threads = {r.thread_id for r in self.runs.values() if r.status == "running"}
+            for thread in list(self.threads.values()):
+                if thread.thread_id not in busy_threads and now - thread.last_access > self.thread_ttl_seconds:
+                    del self.threads[thread.thread_id]
+                    self.evicted_threads += 1
+
+    async def _spill(self, run: RunRecord) -> bool:
+        path = os.path.join(self.spill_dir, f"{run.run_id}.sse")
+        try:
+            await asyncio.to_thread(_append_log, path, run.buffer)
+        except OSError as e:
+            print(f"Failed to spill run {run.run_id} to {path}: {e}")
+            self.spill_errors += 1
+            return False
+        run.spill_path = path
+        self.buffer_bytes -= run.buffer_bytes
+        # Replace rather than clear: replays in progress keep iterating the old list
+        run.buffer = []
+        run.buffer_bytes = 0
+        self.spilled_runs += 1
+        return True
+
+    async def _evict(self, run: RunRecord) -> None:
+        self.runs.pop(run.run_id, None)
+        self.buffer_bytes -= run.buffer_bytes
+        self.evicted_runs += 1
+        if run.spill_path:
+            try:
+                await asyncio.to_thread(os.remove, run.spill_path)
+            except FileNotFoundError:
+                pass
+
+    def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if self._sweeper:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(RUN_STORE_SWEEP_INTERVAL_SECONDS)
+            try:
+                await self.enforce_limits()
+            except Exception as e:
+                print(f"Run store sweep failed: {e}")
+
+    def stats(self) -> dict:
+        running = sum(1 for r in self.runs.values() if r.status == "running")
+        spilled = sum(1 for r in self.runs.values() if r.spill_path and not r.buffer)
+        return {
+            "threads": len(self.threads),
+            "runs": len(self.runs),
+            "runs_running": running,
+            "runs_finished_in_memory": len(self.runs) - running - spilled,
+            "runs_spilled": spilled,
+            "subscribers": sum(len(r.broadcast.subscribers) for r in self.runs.values()),
+            "dropped_subscribers": sum(r.broadcast.dropped_subscribers for r in self.runs.values()),
+            "buffer_bytes": self.buffer_bytes,
+            "max_buffer_bytes": self.max_buffer_bytes,
+            "max_runs": self.max_runs,
+            "ttl_seconds": self.ttl_seconds,
+            "spill_dir": self.spill_dir or None,
+            "evicted_runs": self.evicted_runs,
+            "evicted_threads": self.evicted_threads,
+            "spilled_runs_total": self.spilled_runs,
+            "spill_errors": self.spill_errors,
+        }
+
+
+def _append_log(path: str, events: list[str]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(events))
+
+
+run_store = RunStore()
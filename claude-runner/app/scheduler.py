@@ -0,0 +1,210 @@
+"""
+Admission control for agent runs.
+
+create_run hands runs to the scheduler instead of starting them straight
+away. A run starts only while it fits under all of:
+
+- SCHEDULER_MAX_CONCURRENT_RUNS across the process
+- SCHEDULER_MAX_RUNS_PER_THREAD for its thread
+- SCHEDULER_MAX_RUNS_PER_WORKSPACE for its working directory
+
+Everything else waits in a queue ordered by start-time fair queuing
+across tenants: each tenant's runs get virtual start tags spaced 1/weight
+apart, so a tenant that submits a burst cannot starve the others (weights
+from SCHEDULER_TENANT_WEIGHTS, default 1). A run's priority, which the
+client supplies, only reorders it among its own tenant's queued runs: it
+takes the earliest of that tenant's tags, never another tenant's turn.
+Queued runs are told their position whenever it changes. A run that can
+start right away always does; otherwise, once SCHEDULER_MAX_QUEUED_RUNS
+are waiting, it is rejected with SchedulerFull, which the API turns into
+429 + Retry-After for the backend.
+"""
+
+import asyncio
+import itertools
+from collections import Counter, defaultdict
+from typing import Awaitable, Callable, Optional
+
+from .config import (
+    SCHEDULER_MAX_CONCURRENT_RUNS,
+    SCHEDULER_MAX_RUNS_PER_THREAD,
+    SCHEDULER_MAX_RUNS_PER_WORKSPACE,
+    SCHEDULER_MAX_QUEUED_RUNS,
+    SCHEDULER_TENANT_WEIGHTS,
+)
+
+
+DEFAULT_TENANT = "default"
+
+
+class SchedulerFull(Exception):
+    """The run queue is at capacity."""
+
+
+def parse_tenant_weights(spec: str) -> dict[str, float]:
+    """Parse 'tenant-a=2,tenant-b=0.5' into a weight per tenant."""
+    weights: dict[str, float] = {}
+    for item in spec.split(","):
+        name, _, value = item.strip().partition("=")
+        if name and value:
+            try:
+                weights[name] = max(float(value), 0.01)
+            except ValueError:
+                print(f"Ignoring invalid tenant weight: {item!r}")
+    return weights
+
+
+class _ScheduledRun:
+    __slots__ = ("run_id", "thread_id", "workspace", "tenant", "priority", "start_tag", "seq", "start", "on_position", "position")
+
+    def __init__(self, run_id, thread_id, workspace, tenant, priority, start_tag, seq, start, on_position):
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.workspace = workspace
+        self.tenant = tenant
+        self.priority = priority
+        self.start_tag = start_tag
+        self.seq = seq
+        self.start = start
+        self.on_position = on_position
+        self.position: Optional[int] = None
+
+    def order_key(self) -> tuple:
+        return (self.start_tag, self.seq)
+
+
+class RunScheduler:
+    def __init__(
+        self,
+        max_concurrent: int = SCHEDULER_MAX_CONCURRENT_RUNS,
+        max_per_thread: int = SCHEDULER_MAX_RUNS_PER_THREAD,
+        max_per_workspace: int = SCHEDULER_MAX_RUNS_PER_WORKSPACE,
+        max_queued: int = SCHEDULER_MAX_QUEUED_RUNS,
+        tenant_weights: Optional[dict[str, float]] = None
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_thread = max_per_thread
+        self.max_per_workspace = max_per_workspace
+        self.max_queued = max_queued
+        self.tenant_weights = tenant_weights if tenant_weights is not None else parse_tenant_weights(SCHEDULER_TENANT_WEIGHTS)
+        # The queue is bounded by max_queued, so a sorted list is cheaper than a heap
+        # that would need rescanning for the first run whose thread/workspace has room
+        self._queue: list[_ScheduledRun] = []
+        self._running: dict[str, _ScheduledRun] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._per_thread: Counter[str] = Counter()
+        self._per_workspace: Counter[str] = Counter()
+        self._virtual_time = 0.0
+        self._tenant_last_tag: dict[str, float] = {}
+        self._seq = itertools.count()
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+
+    def submit(
+        self,
+        run_id: str,
+        thread_id: str,
+        workspace: str,
+        start: Callable[[], Awaitable[None]],
+        tenant: Optional[str] = None,
+        priority: int = 0,
+        on_position: Optional[Callable[[int, int], None]] = None
+    ) -> Optional[int]:
+        """
+        Queue a run; `start()` is awaited once it is admitted.
+
+        Returns the queue position, or None if the run started immediately.
+        Raises SchedulerFull when it cannot start and max_queued runs are
+        already waiting.
+        """
+        tenant = tenant or DEFAULT_TENANT
+        entry = _ScheduledRun(run_id, thread_id, workspace, tenant, priority, 0.0, next(self._seq), start, on_position)
+        # Queued runs are all blocked on their thread/workspace, so one with room can start now
+        can_start = len(self._running) < self.max_concurrent and self._has_room(entry)
+        if not can_start and len(self._queue) >= self.max_queued:
+            self.rejected += 1
+            raise SchedulerFull(f"{len(self._queue)} runs already queued")
+
+        weight = self.tenant_weights.get(tenant, 1.0)
+        entry.start_tag = max(self._virtual_time, self._tenant_last_tag.get(tenant, 0.0) + 1.0 / weight)
+        self._tenant_last_tag[tenant] = entry.start_tag
+        self._queue.append(entry)
+        self.admitted += 1
+        self._dispatch()
+        return entry.position
+
+    def _has_room(self, entry: _ScheduledRun) -> bool:
+        return (
+            self._per_thread[entry.thread_id] < self.max_per_thread
+            and self._per_workspace[entry.workspace] < self.max_per_workspace
+        )
+
+    def _order_queue(self) -> None:
+        """Fair order across tenants; within a tenant, higher priority takes the earlier tags."""
+        by_tenant: dict[str, list[_ScheduledRun]] = defaultdict(list)
+        for entry in self._queue:
+            by_tenant[entry.tenant].append(entry)
+        for entries in by_tenant.values():
+            if len(entries) > 1:
+                tags = sorted(e.start_tag for e in entries)
+                for tag, entry in zip(tags, sorted(entries, key=lambda e: (-e.priority, e.seq))):
+                    entry.start_tag = tag
+        self._queue.sort(key=_ScheduledRun.order_key)
+
+    def _dispatch(self) -> None:
+        self._order_queue()
+        while len(self._running) < self.max_concurrent:
+            entry = next((e for e in self._queue if self._has_room(e)), None)
+            if entry is None:
+                break
+            self._queue.remove(entry)
+            self._start(entry)
+
+        for position, entry in enumerate(self._queue, 1):
+            if entry.position != position:
+                entry.position = position
+                if entry.on_position:
+                    entry.on_position(position, len(self._queue))
+
+    def _start(self, entry: _ScheduledRun) -> None:
+        self._virtual_time = max(self._virtual_time, entry.start_tag)
+        entry.position = None
+        self._running[entry.run_id] = entry
+        self._per_thread[entry.thread_id] += 1
+        self._per_workspace[entry.workspace] += 1
+        task = asyncio.create_task(self._run(entry))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, entry: _ScheduledRun) -> None:
+        try:
+            await entry.start()
+        finally:
+            self._running.pop(entry.run_id, None)
+            self._per_thread[entry.thread_id] -= 1
+            if self._per_thread[entry.thread_id] <= 0:
+                del self._per_thread[entry.thread_id]
+            self._per_workspace[entry.workspace] -= 1
+            if self._per_workspace[entry.workspace] <= 0:
+                del self._per_workspace[entry.workspace]
+            self.completed += 1
+            self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._running),
+            "queued": len(self._queue),
+            "max_concurrent": self.max_concurrent,
+            "max_per_thread": self.max_per_thread,
+            "max_per_workspace": self.max_per_workspace,
+            "max_queued": self.max_queued,
+            "queued_by_tenant": dict(Counter(e.tenant for e in self._queue)),
+            "running_by_tenant": dict(Counter(e.tenant for e in self._running.values())),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+        }
+
+
+run_scheduler = RunScheduler()
@@ -6,15 +6,40 @@ Loads skills from:
 2. Workspace skills: /workspaces/<id>/.claude/skills/<skill-name>/SKILL.md
 
 Workspace skills override global skills with the same name.
+
+Parsed skill directories are cached. A cached directory is re-validated
+at most every SKILLS_CACHE_CHECK_SECONDS by comparing the mtime/size of
+every SKILL.md (and the directory itself) with the signature it was
+loaded with; only a changed signature re-reads and re-parses the files.
+The skills admin API invalidates the cache explicitly on every change,
+so edits made through it apply to the next run without waiting for the
+poll. System prompts are memoised per skill set.
 """
 
 import os
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 import yaml
 
-from .config import GLOBAL_SKILLS_PATH
+from .config import GLOBAL_SKILLS_PATH, SKILLS_CACHE_CHECK_SECONDS
+
+
+class _CachedSkillDir:
+    __slots__ = ("signature", "skills", "checked_at")
+
+    def __init__(self, signature: tuple, skills: list[dict[str, Any]], checked_at: float):
+        self.signature = signature
+        self.skills = skills
+        self.checked_at = checked_at
+
+
+_skill_cache: dict[tuple[str, str], _CachedSkillDir] = {}
+_skill_cache_lock = threading.Lock()
+_skill_cache_stats = {"hits": 0, "revalidations": 0, "loads": 0, "invalidations": 0}
 
 
 def load_skill(skill_path: Path) -> dict[str, Any] | None:
@@ -82,6 +107,76 @@ def load_skills_from_directory(skills_dir: Path, scope: str) -> list[dict[str, A
     return skills
 
 
+def _directory_signature(skills_dir: Path) -> tuple:
+    """Cheap fingerprint of a skills directory: stat() calls only, no reads."""
+    try:
+        entries = [(None, skills_dir.stat().st_mtime_ns, 0)]
+        with os.scandir(skills_dir) as it:
+            for entry in it:
+                if not entry.is_dir():
+                    continue
+                try:
+                    st = os.stat(os.path.join(entry.path, "SKILL.md"))
+                    entries.append((entry.name, st.st_mtime_ns, st.st_size))
+                except OSError:
+                    entries.append((entry.name, None, None))
+    except OSError:
+        return ()
+    entries[1:] = sorted(entries[1:])
+    return tuple(entries)
+
+
+def load_skills_cached(skills_dir: Path, scope: str) -> list[dict[str, Any]]:
+    """
+    load_skills_from_directory() behind the directory cache.
+
+    The returned skill dicts are shared between callers; treat them as
+    read-only.
+    """
+    key = (str(skills_dir), scope)
+    now = time.monotonic()
+    with _skill_cache_lock:
+        cached = _skill_cache.get(key)
+        if cached is not None and now - cached.checked_at < SKILLS_CACHE_CHECK_SECONDS:
+            _skill_cache_stats["hits"] += 1
+            return cached.skills
+
+    signature = _directory_signature(skills_dir)
+    if cached is not None and cached.signature == signature:
+        with _skill_cache_lock:
+            cached.checked_at = now
+            _skill_cache_stats["revalidations"] += 1
+        return cached.skills
+
+    skills = load_skills_from_directory(skills_dir, scope)
+    with _skill_cache_lock:
+        _skill_cache[key] = _CachedSkillDir(signature, skills, now)
+        _skill_cache_stats["loads"] += 1
+    return skills
+
+
+def invalidate_skills_cache(skills_dir: Path | None = None) -> None:
+    """Drop cached skills for one skills directory, or for all of them."""
+    with _skill_cache_lock:
+        if skills_dir is None:
+            _skill_cache.clear()
+        else:
+            for key in [k for k in _skill_cache if k[0] == str(skills_dir)]:
+                del _skill_cache[key]
+        _skill_cache_stats["invalidations"] += 1
+
+
+def skills_cache_stats() -> dict:
+    with _skill_cache_lock:
+        stats = dict(_skill_cache_stats)
+        stats["directories"] = len(_skill_cache)
+    prompt_info = _build_system_prompt.cache_info()
+    stats["prompt_hits"] = prompt_info.hits
+    stats["prompt_misses"] = prompt_info.misses
+    stats["check_interval_seconds"] = SKILLS_CACHE_CHECK_SECONDS
+    return stats
+
+
 def load_all_skills(workspace_path: str) -> list[dict[str, Any]]:
     """
     Load all skills for a workspace.
@@ -94,12 +189,12 @@ def load_all_skills(workspace_path: str) -> list[dict[str, Any]]:
     
     # 1. Load global skills
     global_skills_dir = Path(GLOBAL_SKILLS_PATH)
-    for skill in load_skills_from_directory(global_skills_dir, "global"):
+    for skill in load_skills_cached(global_skills_dir, "global"):
         skills_by_name[skill["name"]] = skill
     
     # 2. Load workspace skills (override global)
     workspace_skills_dir = Path(workspace_path) / ".claude" / "skills"
-    for skill in load_skills_from_directory(workspace_skills_dir, "workspace"):
+    for skill in load_skills_cached(workspace_skills_dir, "workspace"):
         skills_by_name[skill["name"]] = skill
     
     return list(skills_by_name.values())
@@ -107,6 +202,13 @@ def load_all_skills(workspace_path: str) -> list[dict[str, Any]]:
 
 def build_system_prompt(skills: list[dict[str, Any]]) -> str:
     """Build system prompt incorporating loaded skills."""
+    return _build_system_prompt(tuple(
+        (skill["name"], skill["description"], skill["instructions"]) for skill in skills
+    ))
+
+
+@lru_cache(maxsize=256)
+def _build_system_prompt(skills: tuple[tuple[str, str, str], ...]) -> str:
     base_prompt = """You are an AI coding assistant with access to a workspace directory. You can read files, write files, list directories, and execute bash commands to help the user with their coding tasks.
 
 When working on code:
@@ -123,12 +225,12 @@ Always use the available tools to interact with the filesystem rather than askin
     skill_section = "\n\n## Available Skills\n\n"
     skill_section += "The following skills are available to help with specific tasks:\n\n"
     
-    for skill in skills:
-        skill_section += f"### {skill['name']}\n"
-        if skill["description"]:
-            skill_section += f"**Description**: {skill['description']}\n\n"
-        if skill["instructions"]:
-            skill_section += f"{skill['instructions']}\n\n"
+    for name, description, instructions in skills:
+        skill_section += f"### {name}\n"
+        if description:
+            skill_section += f"**Description**: {description}\n\n"
+        if instructions:
+            skill_section += f"{instructions}\n\n"
         skill_section += "---\n\n"
     
     return base_prompt + skill_section
@@ -1,7 +1,30 @@
+import asyncio
+import codecs
 import os
-import subprocess
+import signal
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator
+
+from .config import (
+    TOOL_EXECUTOR_THREADS,
+    TOOL_MAX_PARALLEL_CALLS,
+    BASH_TIMEOUT_SECONDS,
+    BASH_OUTPUT_MAX_BYTES,
+    BASH_STREAM_MAX_BYTES,
+)
+
+
+# Blocking tool calls (file I/O, subprocess) run here so they never stall the event loop
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_THREADS, thread_name_prefix="tool")
+
+# Tools that never modify the workspace; these may run concurrently
+READ_ONLY_TOOLS = {"read_file", "list_files"}
+
+# One lock per working directory, held by writes and bash; dropped once no run holds it
+_workspace_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
 
 TOOLS = [
@@ -86,7 +109,12 @@ def execute_tool(
     working_directory: str,
     workspaces_root: str
 ) -> dict[str, Any]:
-    """Execute a tool and return the result."""
+    """
+    Execute a tool and return the result.
+
+    bash runs the same capped, process-group-killed subprocess as the async
+    path, on a private event loop; from async code use execute_tool_async.
+    """
     try:
         if tool_name == "read_file":
             path = resolve_path(working_directory, tool_input["path"], workspaces_root)
@@ -111,23 +139,229 @@ def execute_tool(
             return {"success": True, "entries": entries}
         
         elif tool_name == "bash":
-            result = subprocess.run(
-                tool_input["command"],
-                shell=True,
-                cwd=working_directory,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            return {
-                "success": result.returncode == 0,
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-                "exit_code": result.returncode
-            }
+            return asyncio.run(_collect_bash(tool_input["command"], working_directory))
         
         else:
             return {"success": False, "error": f"Unknown tool: {tool_name}"}
     
     except Exception as e:
         return {"success": False, "error": str(e)}
+
+
+async def execute_tool_async(
+    tool_name: str,
+    tool_input: dict[str, Any],
+    working_directory: str,
+    workspaces_root: str
+) -> dict[str, Any]:
+    """Run execute_tool on the tool thread pool (bash runs as an asyncio subprocess)."""
+    if tool_name == "bash":
+        try:
+            return await _collect_bash(tool_input["command"], working_directory)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _tool_executor, execute_tool, tool_name, tool_input, working_directory, workspaces_root
+    )
+
+
+def batch_tool_calls(tool_blocks: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+    """
+    Split one turn's tool_use blocks into batches, preserving order:
+    consecutive read-only calls share a batch, every other call is a batch
+    of its own. A read never moves past a write that precedes it.
+    """
+    batches: list[list[dict[str, Any]]] = []
+    for block in tool_blocks:
+        if block["name"] in READ_ONLY_TOOLS and batches and batches[-1][0]["name"] in READ_ONLY_TOOLS:
+            batches[-1].append(block)
+        else:
+            batches.append([block])
+    return batches
+
+
+def workspace_lock(working_directory: str) -> asyncio.Lock:
+    """Lock serialising mutating tools (writes, bash) across runs in one workspace."""
+    key = os.path.realpath(working_directory)
+    lock = _workspace_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _workspace_locks[key] = lock
+    return lock
+
+
+async def execute_tools_concurrently(
+    calls: list[tuple[str, dict[str, Any]]],
+    working_directory: str,
+    workspaces_root: str,
+    limit: int = TOOL_MAX_PARALLEL_CALLS
+) -> list[dict[str, Any]]:
+    """Run (tool_name, tool_input) calls with at most `limit` in flight; results in call order."""
+    slots = asyncio.Semaphore(max(1, limit))
+
+    async def run(tool_name: str, tool_input: dict[str, Any]) -> dict[str, Any]:
+        async with slots:
+            return await execute_tool_async(tool_name, tool_input, working_directory, workspaces_root)
+
+    return list(await asyncio.gather(*(run(name, tool_input) for name, tool_input in calls)))
+
+
+async def execute_tool_stream(
+    tool_name: str,
+    tool_input: dict[str, Any],
+    working_directory: str,
+    workspaces_root: str
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """
+    Execute a tool, yielding ("output", {"stream", "text"}) items while it
+    runs and a final ("result", result). Only bash produces live output.
+    """
+    if tool_name != "bash":
+        yield "result", await execute_tool_async(tool_name, tool_input, working_directory, workspaces_root)
+        return
+
+    try:
+        async for item in _run_bash(tool_input["command"], working_directory):
+            yield item
+    except Exception as e:
+        yield "result", {"success": False, "error": str(e)}
+
+
+class _CappedOutput:
+    """Keeps the first and last `limit / 2` bytes of a stream and counts the rest."""
+
+    def __init__(self, limit: int):
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def add(self, data: bytes) -> None:
+        self.total += len(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_limit:
+                del self.tail[:len(self.tail) - self.tail_limit]
+
+    @property
+    def truncated(self) -> int:
+        return self.total - len(self.head) - len(self.tail)
+
+    def text(self) -> str:
+        head = self.head.decode("utf-8", errors="replace")
+        if not self.truncated:
+            return head + self.tail.decode("utf-8", errors="replace")
+        return (
+            head
+            + f"\n... [{self.truncated} bytes truncated] ...\n"
+            + self.tail.decode("utf-8", errors="replace")
+        )
+
+
+async def _collect_bash(command: str, working_directory: str) -> dict[str, Any]:
+    """Run a bash command to completion, discarding the live output."""
+    result: dict[str, Any] = {}
+    async for kind, data in _run_bash(command, working_directory):
+        if kind == "result":
+            result = data
+    return result
+
+
+def _kill_group(process: asyncio.subprocess.Process) -> None:
+    """SIGKILL the command's whole process group (the shell and everything it started)."""
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _run_bash(
+    command: str,
+    working_directory: str,
+    timeout: float = BASH_TIMEOUT_SECONDS
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    # A new session puts the shell in its own process group, so a timeout
+    # kills pipelines and background children as well as the shell
+    process = await asyncio.create_subprocess_shell(
+        command,
+        cwd=working_directory,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True
+    )
+    captured = {"stdout": _CappedOutput(BASH_OUTPUT_MAX_BYTES), "stderr": _CappedOutput(BASH_OUTPUT_MAX_BYTES)}
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    async def pump(name: str, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                captured[name].add(data)
+                chunks.put_nowait((name, data))
+        finally:
+            chunks.put_nowait((name, None))
+
+    readers = [
+        asyncio.create_task(pump("stdout", process.stdout)),
+        asyncio.create_task(pump("stderr", process.stderr)),
+    ]
+    decoders = {name: codecs.getincrementaldecoder("utf-8")(errors="replace") for name in captured}
+    deadline = time.monotonic() + timeout
+    open_streams = len(readers)
+    streamed = 0
+    timed_out = False
+
+    try:
+        while open_streams:
+            remaining = deadline - time.monotonic()
+            try:
+                name, data = await asyncio.wait_for(chunks.get(), max(remaining, 0))
+            except asyncio.TimeoutError:
+                timed_out = True
+                _kill_group(process)
+                break
+            if data is None:
+                open_streams -= 1
+                text = decoders[name].decode(b"", final=True)
+            elif streamed < BASH_STREAM_MAX_BYTES:
+                data = data[:BASH_STREAM_MAX_BYTES - streamed]
+                streamed += len(data)
+                text = decoders[name].decode(data)
+            else:
+                continue
+            if text:
+                yield "output", {"stream": name, "text": text}
+
+        if timed_out:
+            # Killed; give the pipes a moment to drain, then stop reading
+            await asyncio.wait(readers, timeout=1)
+        exit_code = await process.wait()
+    finally:
+        _kill_group(process)
+        for reader in readers:
+            reader.cancel()
+
+    stdout, stderr = captured["stdout"], captured["stderr"]
+    result: dict[str, Any] = {
+        "success": exit_code == 0 and not timed_out,
+        "stdout": stdout.text(),
+        "stderr": stderr.text(),
+        "exit_code": exit_code,
+    }
+    if stdout.truncated or stderr.truncated:
+        result["truncated_bytes"] = {"stdout": stdout.truncated, "stderr": stderr.truncated}
+    if timed_out:
+        result["error"] = f"Command timed out after {timeout:g} seconds"
+    yield "result", result
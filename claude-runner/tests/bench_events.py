@@ -0,0 +1,53 @@
+"""
+Events/sec of SSE event rendering: the original dict + json.dumps path
+against EventEncoder.
+
+    cd claude-runner && PYTHONPATH=. python tests/bench_events.py
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+
+from app.events import EventEncoder, orjson
+
+
+N = 200_000
+RUN_ID = "6f1c2a9e-3b7d-4c1e-9a55-0d2f8e4b7c31"
+PAYLOADS = {
+    "ui.message.assistant.delta": {"textDelta": " the"},
+    "ui.tool.output.delta": {"toolId": "toolu_01", "toolName": "bash", "stream": "stdout", "text": "src/app.py\n" * 8},
+}
+
+
+def baseline(event_type, payload, seq):
+    event = {
+        "v": 1,
+        "runId": RUN_ID,
+        "provider": "claude",
+        "kind": "raw",
+        "type": event_type,
+        "at": datetime.now(timezone.utc).isoformat(),
+        "seq": seq,
+        "payload": payload or {}
+    }
+    return f"data: {json.dumps(event)}\n\n"
+
+
+def bench(render, event_type, payload):
+    started = time.perf_counter()
+    for seq in range(N):
+        render(event_type, payload, seq)
+    return N / (time.perf_counter() - started)
+
+
+def main():
+    print(f"orjson: {'yes' if orjson is not None else 'no (stdlib json)'}")
+    for event_type, payload in PAYLOADS.items():
+        before = bench(baseline, event_type, payload)
+        after = bench(EventEncoder(RUN_ID).encode, event_type, payload)
+        print(f"{event_type:30} before {before:>10,.0f}/s  after {after:>10,.0f}/s  x{after / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+MB/s of PiiScanner.redact against a single pass of the combined regex
+(with the same check-digit validation), on source code and on number-heavy
+log and CSV output.
+
+    cd claude-runner && PYTHONPATH=. python tests/bench_pii.py
+"""
+
+import random
+import time
+from pathlib import Path
+
+from app.hooks import SENSITIVE_DATA_PATTERNS
+from app.pii_scanner import PiiScanner
+
+
+def single_pass(scanner, text):
+    out = []
+    last = 0
+    for match in scanner.regex.finditer(text):
+        replacement = scanner._replacement(match)
+        if replacement is not None:
+            out.append(text[last:match.start()])
+            out.append(replacement)
+            last = match.end()
+    out.append(text[last:])
+    return "".join(out)
+
+
+def samples():
+    rng = random.Random(1)
+    source = "".join(p.read_text() for p in sorted(Path("app").glob("*.py"))) * 4
+    log = "".join(
+        f"id={rng.randint(10000, 99999)} ts={rng.randint(1700000000, 1799999999)} user=u{rng.randint(1, 999)} status=ok\n"
+        for _ in range(30000)
+    )
+    csv = "".join(
+        ",".join(str(rng.randint(0, 10 ** rng.randint(1, 8))) for _ in range(8)) + "\n"
+        for _ in range(30000)
+    )
+    return {"source": source, "log": log, "csv": csv}
+
+
+def mb_per_second(redact, text):
+    started = time.perf_counter()
+    redact(text)
+    return len(text) / 1e6 / (time.perf_counter() - started)
+
+
+def main():
+    scanner = PiiScanner(SENSITIVE_DATA_PATTERNS)
+    for name, text in samples().items():
+        assert scanner.redact(text) == single_pass(scanner, text)
+        before = max(mb_per_second(lambda t: single_pass(scanner, t), text) for _ in range(3))
+        after = max(mb_per_second(scanner.redact, text) for _ in range(3))
+        print(f"{name:7} {len(text) / 1e6:4.1f} MB  single pass {before:7.1f} MB/s  scanner {after:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
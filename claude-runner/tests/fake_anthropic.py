@@ -0,0 +1,146 @@
+"""
+Local fake of the Anthropic Messages API for runner tests.
+
+Serves POST /v1/messages as a streaming (SSE) response from a script of
+turns, records every request body, and simulates prompt caching: each
+cache_control breakpoint stores the prefix up to it, and a later
+request that starts with a stored prefix reports it as cache reads.
+Token counts are estimated as len(json) / 4.
+
+    with FakeAnthropicServer([tool_turn(("t1", "list_files", {"path": "."})), text_turn("done")]) as server:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=server.url)
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+def text_turn(text: str) -> dict[str, Any]:
+    return {"content": [{"type": "text", "text": text}], "stop_reason": "end_turn"}
+
+
+def streamed_text_turn(*deltas: str) -> dict[str, Any]:
+    """A text turn sent as one text_delta event per item of `deltas`."""
+    return {"content": [{"type": "text", "text": "".join(deltas), "deltas": list(deltas)}], "stop_reason": "end_turn"}
+
+
+def tool_turn(*calls: tuple[str, str, dict]) -> dict[str, Any]:
+    """One assistant turn with a tool_use block per (id, name, input)."""
+    return {
+        "content": [{"type": "tool_use", "id": i, "name": n, "input": inp} for i, n, inp in calls],
+        "stop_reason": "tool_use",
+    }
+
+
+def _tokens(value: Any) -> int:
+    return max(1, len(json.dumps(value, sort_keys=True)) // 4)
+
+
+class FakeAnthropicServer:
+    def __init__(self, turns: list[dict[str, Any]]):
+        self.turns = list(turns)
+        self.requests: list[dict[str, Any]] = []
+        self.cached_prefixes: set[str] = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeAnthropicServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _usage(self, body: dict[str, Any]) -> dict[str, int]:
+        """Split input tokens into cache reads, cache writes and uncached input."""
+        blocks: list[Any] = list(body.get("tools", []))
+        system = body.get("system", [])
+        blocks += [{"type": "text", "text": system}] if isinstance(system, str) else system
+        for message in body.get("messages", []):
+            content = message["content"]
+            content = [{"type": "text", "text": content}] if isinstance(content, str) else content
+            blocks += [{"role": message["role"], **block} for block in content]
+
+        total = read = written = 0
+        prefix: list[Any] = []
+        with self._lock:
+            for block in blocks:
+                stripped = {k: v for k, v in block.items() if k != "cache_control"}
+                prefix.append(stripped)
+                total += _tokens(stripped)
+                # Like the API, a hit may end before the request's own breakpoints
+                key = json.dumps(prefix, sort_keys=True)
+                if key in self.cached_prefixes:
+                    read = total
+                elif "cache_control" in block:
+                    self.cached_prefixes.add(key)
+                    written = total - read
+        return {
+            "input_tokens": total - read - written,
+            "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": written,
+        }
+
+    def _events(self, body: dict[str, Any]) -> list[dict[str, Any]]:
+        with self._lock:
+            self.requests.append(body)
+            turn = self.turns.pop(0) if self.turns else text_turn("")
+        usage = self._usage(body)
+        message = {
+            "id": f"msg_{len(self.requests)}", "type": "message", "role": "assistant",
+            "model": body.get("model", "fake"), "content": [], "stop_reason": None,
+            "stop_sequence": None, "usage": {**usage, "output_tokens": 1},
+        }
+        events: list[dict[str, Any]] = [{"type": "message_start", "message": message}]
+        for index, block in enumerate(turn["content"]):
+            if block["type"] == "text":
+                events.append({"type": "content_block_start", "index": index, "content_block": {"type": "text", "text": ""}})
+                for text in block.get("deltas", [block["text"]]):
+                    events.append({"type": "content_block_delta", "index": index, "delta": {"type": "text_delta", "text": text}})
+            else:
+                events.append({
+                    "type": "content_block_start", "index": index,
+                    "content_block": {"type": "tool_use", "id": block["id"], "name": block["name"], "input": {}},
+                })
+                events.append({
+                    "type": "content_block_delta", "index": index,
+                    "delta": {"type": "input_json_delta", "partial_json": json.dumps(block["input"])},
+                })
+            events.append({"type": "content_block_stop", "index": index})
+        events.append({
+            "type": "message_delta",
+            "delta": {"stop_reason": turn["stop_reason"], "stop_sequence": None},
+            "usage": {"output_tokens": 1},
+        })
+        events.append({"type": "message_stop"})
+        return events
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("content-length", 0))
+                body = json.loads(self.rfile.read(length))
+                payload = "".join(
+                    f"event: {e['type']}\ndata: {json.dumps(e)}\n\n" for e in fake._events(body)
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("content-length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
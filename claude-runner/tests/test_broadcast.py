@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from app.broadcast import RunBroadcast
+
+
+def _drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped_without_blocking_others():
+    broadcast = RunBroadcast(maxsize=2)
+    slow = broadcast.subscribe()
+    fast = broadcast.subscribe()
+
+    for i in range(3):
+        broadcast.publish(f"e{i}")
+        if i < 2:
+            assert fast.get_nowait() == f"e{i}"
+
+    assert broadcast.subscribers == {fast}
+    assert broadcast.dropped_subscribers == 1
+    assert _drain(slow) == [None]
+    assert _drain(fast) == ["e2"]
+
+
+@pytest.mark.asyncio
+async def test_close_delivers_queued_events_then_end_of_stream():
+    broadcast = RunBroadcast(maxsize=3)
+    queue = broadcast.subscribe()
+    broadcast.publish("a")
+    broadcast.publish("b")
+    broadcast.close()
+
+    assert _drain(queue) == ["a", "b", None]
+    assert broadcast.subscribers == set()
+
+
+@pytest.mark.asyncio
+async def test_close_ends_a_full_queue():
+    broadcast = RunBroadcast(maxsize=1)
+    queue = broadcast.subscribe()
+    broadcast.publish("a")
+    broadcast.close()
+
+    assert _drain(queue) == [None]
+
+
+@pytest.mark.asyncio
+async def test_subscribe_after_close_ends_immediately():
+    broadcast = RunBroadcast()
+    broadcast.close()
+    queue = broadcast.subscribe()
+
+    assert await asyncio.wait_for(queue.get(), 1) is None
+    assert broadcast.subscribers == set()
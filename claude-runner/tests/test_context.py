@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from app import agent
+from app.context import ContextSettings, ConversationContext
+from fake_anthropic import FakeAnthropicServer, text_turn, tool_turn
+
+
+def _turn(tool_id, name, tool_input, content):
+    return [
+        {"role": "assistant", "content": [{"type": "tool_use", "id": tool_id, "name": name, "input": tool_input}]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": tool_id, "content": content}]},
+    ]
+
+
+def _conversation(*turns):
+    messages = [{"role": "user", "content": "prompt"}]
+    for turn in turns:
+        messages += _turn(*turn)
+    return messages
+
+
+def _result(message):
+    return message["content"][0]["content"]
+
+
+def test_under_budget_is_left_alone():
+    messages = _conversation(("t1", "read_file", {"path": "a"}, "x" * 400))
+    snapshot = json.dumps(messages)
+
+    assert ConversationContext(ContextSettings(token_budget=1000)).compact(messages) is None
+    assert json.dumps(messages) == snapshot
+
+
+def test_superseded_reads_are_replaced_first():
+    messages = _conversation(
+        ("t1", "read_file", {"path": "a"}, "old" * 800),
+        ("t2", "list_files", {"path": "."}, "listing"),
+        ("t3", "read_file", {"path": "a"}, "new" * 400),
+    )
+    context = ConversationContext(ContextSettings(token_budget=800, keep_recent_turns=1))
+
+    summary = context.compact(messages)
+
+    assert summary["dedupedReads"] == 1
+    assert summary["truncatedResults"] == summary["droppedTurns"] == 0
+    assert summary["afterTokens"] < summary["beforeTokens"]
+    assert "Superseded by a later read of a" in _result(messages[2])
+    assert _result(messages[6]) == "new" * 400
+
+
+def test_long_results_are_cut_to_head_and_tail():
+    messages = _conversation(
+        ("t1", "bash", {"command": "make"}, "H" * 100 + "x" * 4000 + "T" * 100),
+        ("t2", "bash", {"command": "make"}, "recent" * 200),
+    )
+    settings = ContextSettings(token_budget=1000, keep_recent_turns=1, tool_result_max_chars=200)
+
+    summary = ConversationContext(settings).compact(messages)
+
+    assert summary["truncatedResults"] == 1 and summary["droppedTurns"] == 0
+    assert _result(messages[2]) == "H" * 100 + "\n... [4000 characters compacted] ...\n" + "T" * 100
+    assert _result(messages[4]) == "recent" * 200
+
+
+def test_oldest_turns_are_dropped_keeping_prompt_and_recent_turns():
+    messages = _conversation(*[(f"t{i}", "list_files", {"path": str(i)}, "y" * 400) for i in range(5)])
+    settings = ContextSettings(token_budget=300, keep_recent_turns=2, tool_result_max_chars=1000)
+
+    summary = ConversationContext(settings).compact(messages)
+
+    assert summary["droppedTurns"] == 3
+    assert messages[0]["content"] == "prompt"
+    assert [m["content"][0]["id"] for m in messages[1::2]] == ["t3", "t4"]
+
+
+def test_protected_turns_are_never_compacted():
+    messages = _conversation(("t1", "read_file", {"path": "a"}, "z" * 4000))
+
+    assert ConversationContext(ContextSettings(token_budget=100, keep_recent_turns=1)).compact(messages) is None
+    assert _result(messages[2]) == "z" * 4000
+
+
+def test_workspace_settings_override_defaults(tmp_path):
+    (tmp_path / ".claude").mkdir()
+    (tmp_path / ".claude" / "settings.json").write_text(
+        json.dumps({"context": {"tokenBudget": 500, "keepRecentTurns": "x"}})
+    )
+
+    settings = ContextSettings.for_workspace(str(tmp_path))
+
+    assert settings.token_budget == 500
+    assert settings.keep_recent_turns == ContextSettings().keep_recent_turns
+
+
+@pytest.mark.skipif(agent.USE_AGENT_SDK, reason="exercises the anthropic fallback loop")
+@pytest.mark.asyncio
+async def test_fallback_loop_compacts_and_reports_it(monkeypatch, tmp_path):
+    (tmp_path / ".claude").mkdir()
+    (tmp_path / ".claude" / "settings.json").write_text(
+        json.dumps({"context": {"tokenBudget": 1800, "targetRatio": 0.9, "keepRecentTurns": 1}})
+    )
+    (tmp_path / "big.txt").write_text("b" * 4000)
+    turns = [
+        tool_turn(("t1", "read_file", {"path": "big.txt"})),
+        tool_turn(("t2", "read_file", {"path": "big.txt"})),
+        text_turn("done"),
+    ]
+    monkeypatch.setattr(agent, "WORKSPACES_ROOT", str(tmp_path))
+
+    with FakeAnthropicServer(turns) as server:
+        monkeypatch.setattr(
+            agent, "_anthropic_client",
+            agent.anthropic.AsyncAnthropic(api_key="test", base_url=server.url, max_retries=0)
+        )
+        events = []
+        async for event_str in agent.run_agent_loop("thread-1", "run-1", "read it twice", str(tmp_path)):
+            events.append(json.loads(event_str.rstrip("\n").split("\n", 1)[1][len("data: "):]))
+
+    compacted = [e["payload"] for e in events if e["type"] == "ui.context.compacted"]
+    assert len(compacted) == 1
+    assert compacted[0]["dedupedReads"] == 1 and compacted[0]["droppedTurns"] == 0
+    assert compacted[0]["beforeTokens"] > 1800 >= compacted[0]["afterTokens"]
+    assert events[-1]["type"] == "run.completed"
+    last = server.requests[-1]["messages"]
+    assert "Superseded by a later read of big.txt" in json.dumps(last[2])
+    assert "b" * 4000 in json.dumps(last[4])
@@ -0,0 +1,61 @@
+import json
+import re
+
+from app.events import DeltaCoalescer, EventEncoder, format_sse, make_event
+
+
+def _parse(event_str):
+    assert event_str.endswith("\n\n")
+    header, data = event_str[:-2].split("\n", 1)
+    return header, json.loads(data[len("data: "):])
+
+
+def test_encoder_matches_event_envelope():
+    encoder = EventEncoder("run-1")
+    header, event = _parse(encoder.encode("ui.message.assistant.delta", {"textDelta": "hi"}, 7))
+
+    assert header == "event: ui.message.assistant.delta"
+    expected = make_event("run-1", "ui.message.assistant.delta", {"textDelta": "hi"}, 7)
+    assert {k: v for k, v in event.items() if k != "at"} == {k: v for k, v in expected.items() if k != "at"}
+    assert re.fullmatch(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}\+00:00", event["at"])
+    # Envelopes built as dicts are framed the same way
+    assert _parse(format_sse(expected))[0] == header
+
+
+def test_encoder_output_is_ascii():
+    event_str = EventEncoder("run-1").encode("ui.message.user", {"text": "naïve café ✓", 1: None})
+    assert event_str.isascii()
+    assert _parse(event_str)[1]["payload"] == {"text": "naïve café ✓", "1": None}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_coalescer_merges_deltas_within_window():
+    clock = FakeClock()
+    coalescer = DeltaCoalescer(window_ms=30, max_chars=1024, clock=clock)
+
+    # The first delta goes out at once; the burst behind it is held
+    assert coalescer.add("Hel") == "Hel"
+    assert [coalescer.add(t) for t in ("lo", ", ", "wor")] == ["", "", ""]
+    clock.now += 0.031
+    assert coalescer.add("ld") == "lo, world"
+    assert coalescer.add("!") == ""
+    assert coalescer.flush() == "!"
+    assert coalescer.flush() == ""
+
+
+def test_coalescer_size_cap_and_token_streaming():
+    clock = FakeClock()
+    coalescer = DeltaCoalescer(window_ms=30, max_chars=8, clock=clock)
+    assert coalescer.add("a") == "a"
+    assert coalescer.add("bcdef") == ""
+    assert coalescer.add("ghi") == "bcdefghi"
+
+    per_token = DeltaCoalescer(window_ms=0, clock=clock)
+    assert [per_token.add(t) for t in ("a", "b", "c")] == ["a", "b", "c"]
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from app.hook_engine import HookPatternRegistry, PatternMatcher
+
+
+DEFAULTS = {"blocked_bash": ["sudo rm"], "path_escape": ["../"]}
+
+
+@pytest.fixture
+def patterns_file(tmp_path):
+    path = tmp_path / "hook_patterns.yaml"
+    version = [0]
+
+    def write(text):
+        path.write_text(text)
+        # Distinct mtimes even on filesystems with coarse timestamps
+        version[0] += 1
+        os.utime(path, (1_700_000_000 + version[0], 1_700_000_000 + version[0]))
+
+    write.path = str(path)
+    return write
+
+
+def test_matcher_reports_the_matching_pattern():
+    matcher = PatternMatcher(["a.b", {"regex": r"\bgit\s+push\s+--force\b", "name": "force push"}])
+    assert matcher.search("git push --force origin") == "force push"
+    assert matcher.search("a.b") == "a.b"
+    assert matcher.search("axb") is None  # literals are escaped
+    assert PatternMatcher([]).search("anything") is None
+
+
+def test_file_changes_apply_without_a_restart(patterns_file):
+    patterns_file("blocked_bash:\n  - git push --force\n")
+    registry = HookPatternRegistry(DEFAULTS, path=patterns_file.path, check_interval=0)
+    assert registry.matcher("blocked_bash").search("sudo rm x") == "sudo rm"
+    assert registry.matcher("blocked_bash").search("git push --force") == "git push --force"
+
+    patterns_file("blocked_bash:\n  - git reset --hard\n")
+    assert registry.matcher("blocked_bash").search("git push --force") is None
+    assert registry.matcher("blocked_bash").search("git reset --hard") == "git reset --hard"
+    assert registry.reloads == 2
+
+
+def test_bad_file_keeps_the_previous_set(patterns_file):
+    patterns_file("blocked_bash:\n  - git push --force\n")
+    registry = HookPatternRegistry(DEFAULTS, path=patterns_file.path, check_interval=0)
+    assert registry.matcher("blocked_bash").search("git push --force") == "git push --force"
+
+    patterns_file("blocked_bash:\n  - regex: '(unclosed'\n")
+    assert registry.matcher("blocked_bash").search("git push --force") == "git push --force"
+    patterns_file("blocked_bash: [unclosed\n")
+    assert registry.matcher("blocked_bash").search("git push --force") == "git push --force"
+    assert registry.reload_errors == 2
+    assert registry.reloads == 1
+
+
+def test_tenant_patterns_apply_to_that_tenant_only(patterns_file):
+    patterns_file(
+        "path_escape:\n  - /proc/\n"
+        "tenants:\n  tenant-a:\n    path_escape:\n      - /etc/\n"
+    )
+    registry = HookPatternRegistry(DEFAULTS, path=patterns_file.path, check_interval=0)
+    assert registry.matcher("path_escape", "tenant-a").search("/etc/passwd") == "/etc/"
+    assert registry.matcher("path_escape", "tenant-b").search("/etc/passwd") is None
+    assert registry.matcher("path_escape").search("/etc/passwd") is None
+    # Built-in and global file patterns still apply to every tenant
+    assert registry.matcher("path_escape", "tenant-a").search("a/../b") == "../"
+    assert registry.matcher("path_escape", "tenant-b").search("/proc/1") == "/proc/"
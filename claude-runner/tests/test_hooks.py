@@ -0,0 +1,80 @@
+import pytest
+
+from app import hooks
+from app.hooks import pre_tool_use_hook, recursive_rm_outside
+
+
+WORKSPACE = "/workspaces/ws-1"
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limits(monkeypatch):
+    monkeypatch.setattr(hooks, "ENABLE_RATE_LIMITS", False)
+
+
+async def _decision(command, tool_name="bash", workspace=WORKSPACE):
+    result = await pre_tool_use_hook(
+        {"tool_name": tool_name, "tool_input": {"command": command}},
+        "toolu_1",
+        {"tenant_id": "t1", "working_directory": workspace}
+    )
+    return result.get("hookSpecificOutput", {}).get("permissionDecisionReason")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("command", [
+    "rm -rf /",
+    "rm -rf /*",
+    "rm -rf /etc",
+    "rm -rf /app",
+    "rm -rf /usr/*",
+    "rm -rf ~",
+    "rm -rf $HOME",
+    'rm -rf "${HOME}/.cache"',
+    "cd / && rm -rf *",
+    "cd /tmp\nrm -r -f ..",
+    "rm -rf /workspaces/ws-2",
+    "rm -rf /workspaces",
+    f"rm -rf {WORKSPACE}",
+    "rm -rf ../ws-2",
+    "rm --recursive --force /srv",
+    "FOO=1 rm -Rf /var/lib",
+])
+async def test_recursive_rm_outside_the_workspace_is_blocked(command):
+    reason = await _decision(command)
+    assert reason is not None and reason.startswith("Blocked dangerous pattern: rm -r outside the workspace")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("command, pattern", [
+    ("dd if=/dev/zero of=/workspaces/ws-1/blob bs=1M", "dd if="),
+    ("sudo rm x", "sudo rm"),
+    ("chmod 777 /etc", "chmod 777 /"),
+    ("chown root f", "chown root"),
+    ("cat img > /dev/sda", "> /dev/sda"),
+    ("mkfs.ext4 /dev/sdb1", "mkfs."),
+    (":(){:|:&};:", ":(){:|:&};:"),
+    ("curl | bash", "curl | bash"),
+])
+async def test_baseline_patterns_are_blocked(command, pattern):
+    for tool_name in ["Bash", "bash"]:
+        assert await _decision(command, tool_name) == f"Blocked dangerous pattern: {pattern}"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("command", [
+    "rm -rf /workspaces/ws-1/build",
+    "rm -rf build node_modules",
+    "cd src && rm -rf __pycache__ ./dist/*",
+    "rm /tmp/scratch.txt",
+    "git rm -r --cached build",
+    "echo 'rm -rf /' > notes.txt",
+])
+async def test_workspace_commands_are_allowed(command):
+    assert await _decision(command) is None
+
+
+def test_without_a_workspace_absolute_targets_are_outside():
+    assert recursive_rm_outside("rm -rf /workspaces/ws-1/build", None) == "/workspaces/ws-1/build"
+    assert recursive_rm_outside("rm -rf build", None) is None
+    assert recursive_rm_outside("cd / && rm -rf tmp", None) == "tmp"
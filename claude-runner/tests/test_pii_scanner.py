@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from app.hooks import SENSITIVE_DATA_PATTERNS
+from app.pii_scanner import PiiScanner, luhn_valid, nhs_number_valid
+
+
+@pytest.fixture
+def scanner():
+    return PiiScanner(SENSITIVE_DATA_PATTERNS)
+
+
+def test_luhn():
+    assert luhn_valid("4111111111111111")
+    assert luhn_valid("378282246310005")
+    assert not luhn_valid("4111111111111112")
+
+
+def test_nhs_number_modulus_11_and_issued_range():
+    assert nhs_number_valid("4010232137")
+    assert nhs_number_valid("6000000006")
+    assert not nhs_number_valid("4010232138")
+    # Passes modulus 11, but a Unix timestamp, not an issued NHS number
+    assert not nhs_number_valid("1712345672")
+    assert not nhs_number_valid("401023213")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("card 4111 1111 1111 1111 ok", "card [REDACTED:PAYMENT_CARD] ok"),
+    ("amex 3782-822463-10005", "amex [REDACTED:PAYMENT_CARD]"),
+    ("nhs: 401 023 2137.", "nhs: [REDACTED:NHS_NUMBER]."),
+    ("NI AB 12 34 56 C", "NI [REDACTED:NI_NUMBER]"),
+    ("ni=AB123456C;", "ni=[REDACTED:NI_NUMBER];"),
+])
+def test_redacts_identifiers(scanner, text, expected):
+    assert scanner.redact(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "ts=1712345672 ts=1712345680",          # timestamps passing modulus 11
+    "call 020 7946 0958 or 07700 900123",   # phone numbers
+    "+44 7700 900123",
+    "4111 1111 1111 1112",                  # fails Luhn
+    "QQ 12 34 56 C",                        # QQ is not an NI prefix
+    "XAB123456C",                           # inside a word
+    "id 40102321370",                       # eleven digits
+])
+def test_leaves_lookalikes_alone(scanner, text):
+    assert scanner.redact(text) is text
+
+
+def test_redact_value_returns_the_same_object_when_clean(scanner):
+    clean = {"success": True, "content": "no numbers here", "lines": ["a", "b"]}
+    assert scanner.redact_value(clean) is clean
+    dirty = {"success": True, "lines": ["a", "card 4111111111111111"]}
+    assert scanner.redact_value(dirty) == {"success": True, "lines": ["a", "card [REDACTED:PAYMENT_CARD]"]}
+
+
+def test_dense_numbers_match_sparse_results(scanner):
+    rows = [f"{i},{1700000000 + i},401 023 2137,4111111111111111" for i in range(200)]
+    redacted = scanner.redact("\n".join(rows))
+    assert redacted.count("[REDACTED:NHS_NUMBER]") == 200
+    assert redacted.count("[REDACTED:PAYMENT_CARD]") == 200
+    assert "1700000000" in redacted
+
+
+def test_stream_redactor_matches_redact_across_chunk_boundaries(scanner):
+    rng = random.Random(7)
+    pieces = ["4111 1111 1111 1111", "401 023 2137", "AB 12 34 56 C", "1712345672", "x", " ", "\n", "00", "-"]
+    for _ in range(200):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 120)))
+        stream = scanner.stream()
+        out = []
+        pos = 0
+        while pos < len(text):
+            size = rng.randint(1, 12)
+            out.append(stream.feed(text[pos:pos + size]))
+            pos += size
+        out.append(stream.flush())
+        assert "".join(out) == scanner.redact(text), text
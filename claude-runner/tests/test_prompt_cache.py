@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from app import agent, prompt_cache
+from fake_anthropic import FakeAnthropicServer, text_turn, tool_turn
+
+
+pytestmark = pytest.mark.skipif(agent.USE_AGENT_SDK, reason="exercises the anthropic fallback loop")
+
+
+async def _run(monkeypatch, server, workspace):
+    monkeypatch.setattr(agent, "WORKSPACES_ROOT", str(workspace))
+    monkeypatch.setattr(
+        agent, "_anthropic_client",
+        agent.anthropic.AsyncAnthropic(api_key="test", base_url=server.url, max_retries=0)
+    )
+    events = []
+    async for event_str in agent.run_agent_loop("thread-1", "run-1", "list the files", str(workspace)):
+        header, data = event_str.rstrip("\n").split("\n", 1)
+        event = json.loads(data[len("data: "):])
+        assert header == f"event: {event['type']}"
+        events.append(event)
+    return events
+
+
+def _breakpoints(body):
+    blocks = list(body["tools"]) + list(body["system"])
+    for message in body["messages"]:
+        if isinstance(message["content"], list):
+            blocks += message["content"]
+    return [b for b in blocks if "cache_control" in b]
+
+
+@pytest.mark.asyncio
+async def test_marks_prefix_cacheable_and_reports_cache_usage(monkeypatch, tmp_path):
+    (tmp_path / "README.md").write_text("hello")
+    turns = [tool_turn(("t1", "list_files", {"path": "."})), text_turn("done")]
+
+    with FakeAnthropicServer(turns) as server:
+        events = await _run(monkeypatch, server, tmp_path)
+
+    first, second = server.requests
+    for body in (first, second):
+        assert body["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert body["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert body["messages"][-1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert len(_breakpoints(body)) <= 4
+    # Only the newest message carries the conversation breakpoint
+    assert "cache_control" not in second["messages"][0]["content"][-1]
+
+    usage = [e["payload"] for e in events if e["type"] == "ui.usage"]
+    assert len(usage) == 2
+    assert usage[0]["cacheReadInputTokens"] == 0
+    assert usage[0]["cacheCreationInputTokens"] > 0
+    assert usage[1]["cacheReadInputTokens"] >= usage[0]["cacheCreationInputTokens"]
+
+    completed = events[-1]
+    assert completed["type"] == "run.completed"
+    assert completed["payload"]["usage"]["cacheReadInputTokens"] == usage[1]["total"]["cacheReadInputTokens"]
+
+
+@pytest.mark.asyncio
+async def test_caching_can_be_disabled(monkeypatch, tmp_path):
+    monkeypatch.setattr(prompt_cache, "PROMPT_CACHING_ENABLED", False)
+
+    with FakeAnthropicServer([text_turn("hi")]) as server:
+        events = await _run(monkeypatch, server, tmp_path)
+
+    body = server.requests[0]
+    assert isinstance(body["system"], str)
+    assert all("cache_control" not in tool for tool in body["tools"])
+    assert body["messages"] == [{"role": "user", "content": "list the files"}]
+    assert events[-1]["payload"]["usage"]["cacheReadInputTokens"] == 0
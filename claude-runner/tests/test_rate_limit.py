@@ -0,0 +1,146 @@
+import hashlib
+
+import pytest
+
+from app import hooks, rate_limit
+from app.rate_limit import TOKEN_BUCKET_LUA, LocalBucketStore, RedisBucketStore, ToolRateLimiter
+
+
+class NoScriptError(Exception):
+    pass
+
+
+class FakeRedis:
+    """
+    Local stand-in for the redis.asyncio client: one shared hash store, its
+    own server clock, and TOKEN_BUCKET_LUA evaluated by a Python port of the
+    script.
+    """
+
+    def __init__(self):
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.scripts: dict[str, str] = {}
+        self.time = 1000.0
+        self.fail = False
+
+    def restart(self):
+        """A restart or failover loses the script cache."""
+        self.scripts.clear()
+
+    async def script_load(self, script: str) -> str:
+        sha = hashlib.sha1(script.encode()).hexdigest()
+        self.scripts[sha] = script
+        return sha
+
+    async def evalsha(self, sha: str, numkeys: int, *args):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        if sha not in self.scripts:
+            raise NoScriptError("No matching script. Please use EVAL.")
+        assert self.scripts[sha] == TOKEN_BUCKET_LUA
+        keys, argv = args[:numkeys], args[numkeys:]
+        levels = []
+        for i, key in enumerate(keys):
+            capacity, rate = float(argv[2 * i]), float(argv[2 * i + 1])
+            state = self.hashes.get(key, {})
+            tokens = float(state.get("tokens", capacity))
+            updated_at = float(state.get("updated_at", self.time))
+            tokens = min(capacity, tokens + max(0.0, self.time - updated_at) * rate)
+            if tokens < 1:
+                return [i, str((1 - tokens) / rate).encode()]
+            levels.append(tokens)
+        for key, tokens in zip(keys, levels):
+            self.hashes[key] = {"tokens": str(tokens - 1), "updated_at": str(self.time)}
+        return [-1, b"0"]
+
+
+CONTEXT = {"tenant_id": "t1", "run_id": "r1", "working_directory": "/workspaces/w1"}
+
+
+@pytest.mark.asyncio
+async def test_local_bucket_refills_over_time(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    store = LocalBucketStore()
+    bucket = [("k", 2, 1.0)]
+    assert [await store.take(bucket) for _ in range(2)] == [None, None]
+    index, wait = await store.take(bucket)
+    assert index == 0 and wait == pytest.approx(1.0)
+    now[0] += 1.5
+    assert await store.take(bucket) is None
+
+
+@pytest.mark.asyncio
+async def test_buckets_are_keyed_by_scope():
+    limiter = ToolRateLimiter({"bash_commands_per_minute": 1}, scope="run")
+    assert await limiter.check(["bash_commands_per_minute"], CONTEXT) is None
+    limit, retry_after = await limiter.check(["bash_commands_per_minute"], CONTEXT)
+    assert limit == "bash_commands_per_minute" and retry_after > 0
+    assert await limiter.check(["bash_commands_per_minute"], {**CONTEXT, "run_id": "r2"}) is None
+
+
+@pytest.mark.asyncio
+async def test_denied_calls_do_not_use_up_other_limits():
+    limiter = ToolRateLimiter({"bash_commands_per_minute": 5, "api_calls_per_minute": 1})
+    assert await limiter.check(["bash_commands_per_minute", "api_calls_per_minute"], CONTEXT) is None
+    for _ in range(3):
+        limit, _ = await limiter.check(["bash_commands_per_minute", "api_calls_per_minute"], CONTEXT)
+        assert limit == "api_calls_per_minute"
+    # Only the one allowed call drew from the bash bucket
+    for _ in range(4):
+        assert await limiter.check(["bash_commands_per_minute"], CONTEXT) is None
+    assert (await limiter.check(["bash_commands_per_minute"], CONTEXT))[0] == "bash_commands_per_minute"
+
+
+@pytest.mark.asyncio
+async def test_replicas_share_buckets_through_redis():
+    redis = FakeRedis()
+    replicas = [ToolRateLimiter({"file_writes_per_minute": 3}, shared=RedisBucketStore(redis)) for _ in range(2)]
+    results = [await replicas[i % 2].check(["file_writes_per_minute"], CONTEXT) for i in range(4)]
+    assert results[:3] == [None, None, None]
+    assert results[3][0] == "file_writes_per_minute"
+    assert list(redis.hashes) == ["claude-runner:ratelimit:{workspace:/workspaces/w1}:file_writes_per_minute"]
+
+
+@pytest.mark.asyncio
+async def test_redis_script_is_reloaded_after_a_restart():
+    redis = FakeRedis()
+    store = RedisBucketStore(redis)
+    limiter = ToolRateLimiter({"api_calls_per_minute": 2}, shared=store)
+    assert await limiter.check(["api_calls_per_minute"], CONTEXT) is None
+    redis.restart()
+    assert await limiter.check(["api_calls_per_minute"], CONTEXT) is None
+    assert await limiter.check(["api_calls_per_minute"], CONTEXT) is not None
+    assert store.script_reloads == 1
+    assert limiter.shared_errors == 0
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_local_buckets_when_redis_fails():
+    redis = FakeRedis()
+    redis.fail = True
+    limiter = ToolRateLimiter({"api_calls_per_minute": 1}, shared=RedisBucketStore(redis))
+    assert await limiter.check(["api_calls_per_minute"], CONTEXT) is None
+    assert await limiter.check(["api_calls_per_minute"], CONTEXT) is not None
+    assert limiter.shared_errors == 2
+    assert limiter.stats()["shared_failing"]
+
+    redis.fail = False
+    assert await limiter.check(["api_calls_per_minute"], CONTEXT) is None
+    assert not limiter.stats()["shared_failing"]
+
+
+@pytest.mark.asyncio
+async def test_pre_tool_use_hook_denies_throttled_calls(monkeypatch):
+    monkeypatch.setattr(hooks, "rate_limiter", ToolRateLimiter({"bash_commands_per_minute": 2, "api_calls_per_minute": 100}))
+    call = {"tool_name": "bash", "tool_input": {"command": "ls"}}
+
+    assert await hooks.pre_tool_use_hook(call, "t1", CONTEXT) == {}
+    assert await hooks.pre_tool_use_hook(call, "t2", CONTEXT) == {}
+    denied = await hooks.pre_tool_use_hook(call, "t3", CONTEXT)
+
+    output = denied["hookSpecificOutput"]
+    assert output["permissionDecision"] == "deny"
+    assert output["permissionDecisionReason"].startswith("Rate limit exceeded: bash_commands_per_minute")
+    # Reads only draw from the overall budget
+    assert await hooks.pre_tool_use_hook({"tool_name": "read_file", "tool_input": {"path": "a.py"}}, "t4", CONTEXT) == {}
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from app.run_store import RunRecord, RunStore, ThreadRecord
+
+
+def _run(store, run_id, events=(), status="completed", thread_id="t1"):
+    run = RunRecord(run_id, thread_id, "prompt")
+    store.add_run(run)
+    for event_str in events:
+        store.append_event(run, event_str)
+    run.status = status
+    return run
+
+
+async def _replay(store, run):
+    return "".join([chunk async for chunk in store.replay(run)])
+
+
+@pytest.mark.asyncio
+async def test_ttl_evicts_finished_runs_only():
+    store = RunStore(ttl_seconds=10)
+    stale = _run(store, "stale", ["a"])
+    running = _run(store, "running", ["b"], status="running")
+    fresh = _run(store, "fresh", ["c"])
+    stale.last_access = running.last_access = time.monotonic() - 60
+
+    await store.enforce_limits()
+
+    assert list(store.runs) == ["running", "fresh"]
+    assert store.buffer_bytes == 2
+    assert store.evicted_runs == 1
+    assert fresh.buffer == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_count_limit_evicts_least_recently_used():
+    store = RunStore(max_runs=2)
+    for run_id in ("r1", "r2", "r3"):
+        _run(store, run_id)
+    _run(store, "live", status="running")
+    store.get_run("r1")
+
+    await store.enforce_limits()
+
+    assert set(store.runs) == {"r1", "r3", "live"}
+
+
+@pytest.mark.asyncio
+async def test_memory_limit_drops_buffers_without_spill_dir():
+    store = RunStore(max_buffer_bytes=10, spill_dir="")
+    _run(store, "old", ["x" * 8])
+    _run(store, "live", ["y" * 8], status="running")
+    _run(store, "new", ["z" * 2])
+
+    await store.enforce_limits()
+
+    assert set(store.runs) == {"live", "new"}
+    assert store.buffer_bytes == 10
+
+
+@pytest.mark.asyncio
+async def test_memory_limit_spills_to_disk_and_replays(tmp_path):
+    store = RunStore(max_buffer_bytes=10, spill_dir=str(tmp_path))
+    old = _run(store, "old", ["data: 1\n\n", "data: 2\n\n"])
+    _run(store, "new", ["n"])
+
+    await store.enforce_limits()
+
+    assert "old" in store.runs
+    assert old.buffer == [] and old.spill_path == str(tmp_path / "old.sse")
+    assert store.buffer_bytes == 1
+    assert store.stats()["runs_spilled"] == 1
+    assert await _replay(store, old) == "data: 1\n\ndata: 2\n\n"
+
+    old.last_access = time.monotonic() - store.ttl_seconds - 1
+    await store.enforce_limits()
+    assert "old" not in store.runs
+    assert not (tmp_path / "old.sse").exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_spill_falls_back_to_eviction(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    store = RunStore(max_buffer_bytes=1, spill_dir=str(blocker / "spill"))
+    _run(store, "old", ["abc"])
+
+    await store.enforce_limits()
+
+    assert store.runs == {}
+    assert store.spill_errors == 1 and store.buffer_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_idle_threads_expire_unless_a_run_is_active():
+    store = RunStore(thread_ttl_seconds=10)
+    for thread_id in ("idle", "busy", "recent"):
+        store.add_thread(ThreadRecord(thread_id, "/tmp"))
+    store.threads["idle"].last_access = store.threads["busy"].last_access = time.monotonic() - 60
+    _run(store, "r", status="running", thread_id="busy")
+
+    await store.enforce_limits()
+
+    assert set(store.threads) == {"busy", "recent"}
+    assert store.evicted_threads == 1
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.scheduler import RunScheduler, SchedulerFull
+
+
+class Runs:
+    """Start callbacks that record the order runs start in and block until finished."""
+
+    def __init__(self):
+        self.started: list[str] = []
+        self._done: dict[str, asyncio.Event] = {}
+
+    def start(self, run_id):
+        self._done[run_id] = asyncio.Event()
+
+        async def run():
+            self.started.append(run_id)
+            await self._done[run_id].wait()
+        return run
+
+    async def finish(self, run_id):
+        self._done[run_id].set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+
+def _submit(scheduler, runs, run_id, tenant, priority=0, thread=None, workspace=None):
+    return scheduler.submit(
+        run_id,
+        thread_id=thread or run_id,
+        workspace=workspace or run_id,
+        start=runs.start(run_id),
+        tenant=tenant,
+        priority=priority
+    )
+
+
+async def _drain(runs, first):
+    """Finish runs one at a time, starting with `first`, until nothing new starts."""
+    finished = 0
+    await runs.finish(first)
+    finished += 1
+    while finished < len(runs.started):
+        await runs.finish(runs.started[finished])
+        finished += 1
+    return runs.started
+
+
+@pytest.mark.asyncio
+async def test_tenants_take_turns_after_a_burst():
+    scheduler = RunScheduler(max_concurrent=1, max_per_thread=1, max_per_workspace=1, max_queued=10, tenant_weights={})
+    runs = Runs()
+    assert _submit(scheduler, runs, "a0", "a") is None
+    await asyncio.sleep(0)
+    for i in range(1, 4):
+        _submit(scheduler, runs, f"a{i}", "a")
+    _submit(scheduler, runs, "b0", "b")
+    _submit(scheduler, runs, "b1", "b")
+
+    assert await _drain(runs, "a0") == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+
+@pytest.mark.asyncio
+async def test_priority_reorders_only_within_a_tenant():
+    scheduler = RunScheduler(max_concurrent=1, max_per_thread=1, max_per_workspace=1, max_queued=10, tenant_weights={})
+    runs = Runs()
+    _submit(scheduler, runs, "a0", "a")
+    await asyncio.sleep(0)
+    _submit(scheduler, runs, "b0", "b")
+    _submit(scheduler, runs, "a1", "a")
+    _submit(scheduler, runs, "a2", "a", priority=100)
+
+    # a2 jumps a1, but not tenant b's turn
+    assert await _drain(runs, "a0") == ["a0", "b0", "a2", "a1"]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_only_runs_that_cannot_start():
+    scheduler = RunScheduler(max_concurrent=2, max_per_thread=1, max_per_workspace=1, max_queued=1, tenant_weights={})
+    runs = Runs()
+    assert _submit(scheduler, runs, "r0", "a", workspace="w1") is None
+    # Blocked by its workspace, so it queues and fills the queue
+    assert _submit(scheduler, runs, "r1", "a", workspace="w1") == 1
+
+    # A free slot: starts straight away even though the queue is full
+    assert _submit(scheduler, runs, "r2", "a", workspace="w2") is None
+    with pytest.raises(SchedulerFull):
+        _submit(scheduler, runs, "r3", "a", workspace="w3")
+    assert scheduler.stats()["rejected"] == 1
+    await asyncio.sleep(0)
+    assert runs.started == ["r0", "r2"]
+
+    await runs.finish("r0")
+    assert runs.started == ["r0", "r2", "r1"]
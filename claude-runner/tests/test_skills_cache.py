@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from app import skills
+from app.api import skills_router
+from app.skills import build_system_prompt, invalidate_skills_cache, load_skills_cached
+
+
+def _write_skill(skills_dir, name, description):
+    skill_dir = skills_dir / name
+    skill_dir.mkdir(parents=True, exist_ok=True)
+    (skill_dir / "SKILL.md").write_text(f"---\nname: {name}\ndescription: {description}\n---\nDo {name}.\n")
+    return skill_dir / "SKILL.md"
+
+
+def _descriptions(skills_dir):
+    return {s["name"]: s["description"] for s in load_skills_cached(skills_dir, "global")}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    invalidate_skills_cache()
+    yield
+    invalidate_skills_cache()
+
+
+def test_unchanged_directory_is_parsed_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(skills, "SKILLS_CACHE_CHECK_SECONDS", 0)
+    _write_skill(tmp_path, "review", "v1")
+    loads = skills.skills_cache_stats()["loads"]
+
+    first = load_skills_cached(tmp_path, "global")
+    assert load_skills_cached(tmp_path, "global") is first
+    assert skills.skills_cache_stats()["loads"] == loads + 1
+
+
+def test_changed_skill_is_reloaded_after_the_check_interval(tmp_path, monkeypatch):
+    monkeypatch.setattr(skills, "SKILLS_CACHE_CHECK_SECONDS", 0)
+    skill_md = _write_skill(tmp_path, "review", "v1")
+    assert _descriptions(tmp_path) == {"review": "v1"}
+
+    _write_skill(tmp_path, "review", "version 2")
+    st = os.stat(skill_md)
+    os.utime(skill_md, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    _write_skill(tmp_path, "audit", "new")
+
+    assert _descriptions(tmp_path) == {"review": "version 2", "audit": "new"}
+
+
+def test_invalidate_reloads_before_the_check_interval(tmp_path, monkeypatch):
+    monkeypatch.setattr(skills, "SKILLS_CACHE_CHECK_SECONDS", 3600)
+    _write_skill(tmp_path, "review", "v1")
+    assert _descriptions(tmp_path) == {"review": "v1"}
+
+    _write_skill(tmp_path, "review", "v2")
+    assert _descriptions(tmp_path) == {"review": "v1"}
+
+    invalidate_skills_cache(tmp_path)
+    assert _descriptions(tmp_path) == {"review": "v2"}
+
+
+@pytest.mark.asyncio
+async def test_reload_endpoint_invalidates_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(skills, "SKILLS_CACHE_CHECK_SECONDS", 3600)
+    monkeypatch.setattr(skills_router, "PLATFORM_SKILLS_DIR", tmp_path)
+    _write_skill(tmp_path, "review", "v1")
+    assert _descriptions(tmp_path) == {"review": "v1"}
+    _write_skill(tmp_path, "review", "v2")
+
+    await skills_router.reload_skill("review", scope="platform", tenant_id=None, project_id=None)
+
+    assert _descriptions(tmp_path) == {"review": "v2"}
+
+
+def test_system_prompt_follows_skill_changes(tmp_path):
+    _write_skill(tmp_path, "review", "v1")
+    before = build_system_prompt(load_skills_cached(tmp_path, "global"))
+    _write_skill(tmp_path, "review", "v2")
+    invalidate_skills_cache(tmp_path)
+    after = build_system_prompt(load_skills_cached(tmp_path, "global"))
+
+    assert "**Description**: v1" in before
+    assert "**Description**: v2" in after
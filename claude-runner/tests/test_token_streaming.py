@@ -0,0 +1,64 @@
+import functools
+import json
+
+import pytest
+
+from app import agent, main
+from app.events import DeltaCoalescer
+from app.run_store import RunRecord, ThreadRecord
+from fake_anthropic import FakeAnthropicServer, streamed_text_turn
+
+
+pytestmark = pytest.mark.skipif(agent.USE_AGENT_SDK, reason="exercises the anthropic fallback loop")
+
+# Longer than the redactor's look-ahead, so each delta can be released as it arrives
+DELTAS = [f"Sentence {i} of the answer, long enough to clear the PII look-ahead window. " for i in range(8)]
+
+
+async def _deltas(monkeypatch, workspace, **kwargs):
+    monkeypatch.setattr(agent, "WORKSPACES_ROOT", str(workspace))
+    # A frozen clock: every delta after the first lands inside the coalescing window
+    monkeypatch.setattr(agent, "DeltaCoalescer", functools.partial(DeltaCoalescer, clock=lambda: 0.0))
+    with FakeAnthropicServer([streamed_text_turn(*DELTAS)]) as server:
+        monkeypatch.setattr(
+            agent, "_anthropic_client",
+            agent.anthropic.AsyncAnthropic(api_key="test", base_url=server.url, max_retries=0)
+        )
+        events = [
+            json.loads(event_str.rstrip("\n").split("\n", 1)[1][len("data: "):])
+            async for event_str in agent.run_agent_loop("thread-1", "run-1", "hi", str(workspace), **kwargs)
+        ]
+    assert events[-1]["type"] == "run.completed"
+    return [e["payload"]["textDelta"] for e in events if e["type"] == "ui.message.assistant.delta"]
+
+
+@pytest.mark.asyncio
+async def test_deltas_are_coalesced_by_default(monkeypatch, tmp_path):
+    deltas = await _deltas(monkeypatch, tmp_path)
+
+    assert "".join(deltas) == "".join(DELTAS)
+    assert len(deltas) <= 2
+
+
+@pytest.mark.asyncio
+async def test_token_streaming_sends_every_delta(monkeypatch, tmp_path):
+    deltas = await _deltas(monkeypatch, tmp_path, token_streaming=True)
+
+    assert "".join(deltas) == "".join(DELTAS)
+    assert len(deltas) >= len(DELTAS)
+
+
+@pytest.mark.asyncio
+async def test_run_request_option_reaches_the_agent_loop(monkeypatch, tmp_path):
+    seen = {}
+
+    async def fake_loop(*args, token_streaming=False, **kwargs):
+        seen["token_streaming"] = token_streaming
+        return
+        yield
+
+    monkeypatch.setattr(main, "run_agent_loop", fake_loop)
+    await main._execute_run(RunRecord("run-1", "thread-1", "hi"), ThreadRecord("thread-1", str(tmp_path)), None, True)
+
+    assert seen == {"token_streaming": True}
+    assert main.CreateRunRequest(threadId="t", prompt="p").tokenStreaming is False
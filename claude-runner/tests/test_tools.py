@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from app import agent, tools
+from app.tools import execute_tool, execute_tool_async, execute_tool_stream
+from fake_anthropic import FakeAnthropicServer, text_turn, tool_turn
+
+
+def _alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.asyncio
+async def test_bash_streams_output_and_returns_result(tmp_path):
+    items = [
+        item async for item in execute_tool_stream(
+            "bash", {"command": "echo out; echo err >&2; exit 3"}, str(tmp_path), str(tmp_path)
+        )
+    ]
+
+    kind, result = items[-1]
+    assert kind == "result"
+    assert result["stdout"] == "out\n" and result["stderr"] == "err\n"
+    assert result["exit_code"] == 3 and not result["success"]
+    streamed = {(data["stream"], data["text"]) for kind, data in items[:-1]}
+    assert streamed == {("stdout", "out\n"), ("stderr", "err\n")}
+
+
+@pytest.mark.asyncio
+async def test_bash_timeout_kills_the_process_group(tmp_path):
+    command = "sleep 30 & echo $! > child.pid; sleep 30"
+    started = time.monotonic()
+    items = [item async for item in tools._run_bash(command, str(tmp_path), timeout=0.5)]
+    result = items[-1][1]
+
+    assert time.monotonic() - started < 5
+    assert not result["success"]
+    assert "timed out" in result["error"]
+    child = int((tmp_path / "child.pid").read_text())
+    for _ in range(50):
+        if not _alive(child):
+            break
+        await asyncio.sleep(0.05)
+    assert not _alive(child)
+
+
+@pytest.mark.asyncio
+async def test_bash_output_keeps_head_and_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "BASH_OUTPUT_MAX_BYTES", 100)
+    command = "printf 'H%.0s' $(seq 50); printf 'x%.0s' $(seq 1000); printf 'T%.0s' $(seq 50)"
+    result = await execute_tool_async("bash", {"command": command}, str(tmp_path), str(tmp_path))
+
+    assert result["stdout"].startswith("H" * 50 + "\n... [1000 bytes truncated] ...\n")
+    assert result["stdout"].endswith("T" * 50)
+    assert result["truncated_bytes"] == {"stdout": 1000, "stderr": 0}
+
+
+@pytest.mark.asyncio
+async def test_bash_live_output_is_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "BASH_STREAM_MAX_BYTES", 10)
+    items = [
+        item async for item in execute_tool_stream(
+            "bash", {"command": "printf '%0100d' 0"}, str(tmp_path), str(tmp_path)
+        )
+    ]
+
+    streamed = "".join(data["text"] for kind, data in items if kind == "output")
+    assert streamed == "0" * 10
+    assert items[-1][1]["stdout"] == "0" * 100
+
+
+def test_execute_tool_runs_bash_synchronously(tmp_path):
+    result = execute_tool("bash", {"command": "pwd"}, str(tmp_path), str(tmp_path))
+
+    assert result["success"]
+    assert result["stdout"].strip() == os.path.realpath(tmp_path)
+
+
+def _blocks(*names):
+    return [{"id": f"t{i}", "name": name, "input": {}} for i, name in enumerate(names)]
+
+
+def test_batches_group_consecutive_reads_only():
+    batches = tools.batch_tool_calls(_blocks("read_file", "list_files", "write_file", "read_file", "bash", "bash"))
+
+    assert [[b["id"] for b in batch] for batch in batches] == [["t0", "t1"], ["t2"], ["t3"], ["t4"], ["t5"]]
+
+
+@pytest.mark.asyncio
+async def test_read_only_calls_run_concurrently_within_the_limit(monkeypatch, tmp_path):
+    active = peak = 0
+    lock = threading.Lock()
+
+    def slow_tool(tool_name, tool_input, working_directory, workspaces_root):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.1)
+        with lock:
+            active -= 1
+        return {"success": True, "path": tool_input["path"]}
+
+    monkeypatch.setattr(tools, "execute_tool", slow_tool)
+    calls = [("read_file", {"path": str(i)}) for i in range(6)]
+    started = time.monotonic()
+    results = await tools.execute_tools_concurrently(calls, str(tmp_path), str(tmp_path), limit=3)
+
+    assert [r["path"] for r in results] == [str(i) for i in range(6)]
+    assert peak == 3
+    assert time.monotonic() - started < 0.5
+
+
+def test_workspace_lock_is_shared_per_directory(tmp_path):
+    (tmp_path / "a").mkdir()
+    lock = tools.workspace_lock(str(tmp_path / "a"))
+
+    assert tools.workspace_lock(str(tmp_path / "a" / ".." / "a")) is lock
+    assert tools.workspace_lock(str(tmp_path)) is not lock
+
+
+@pytest.mark.skipif(agent.USE_AGENT_SDK, reason="exercises the anthropic fallback loop")
+@pytest.mark.asyncio
+async def test_agent_keeps_block_order_around_writes(monkeypatch, tmp_path):
+    (tmp_path / "a.txt").write_text("before")
+    turns = [
+        tool_turn(
+            ("t1", "read_file", {"path": "a.txt"}),
+            ("t2", "list_files", {"path": "."}),
+            ("t3", "write_file", {"path": "a.txt", "content": "after"}),
+            ("t4", "read_file", {"path": "a.txt"}),
+        ),
+        text_turn("done"),
+    ]
+    monkeypatch.setattr(agent, "WORKSPACES_ROOT", str(tmp_path))
+
+    with FakeAnthropicServer(turns) as server:
+        monkeypatch.setattr(
+            agent, "_anthropic_client",
+            agent.anthropic.AsyncAnthropic(api_key="test", base_url=server.url, max_retries=0)
+        )
+        events = [
+            json.loads(event_str.rstrip("\n").split("\n", 1)[1][len("data: "):])
+            async for event_str in agent.run_agent_loop("thread-1", "run-1", "edit", str(tmp_path))
+        ]
+
+    results = [e["payload"] for e in events if e["type"] == "ui.tool.result"]
+    assert [r["toolId"] for r in results] == ["t1", "t2", "t3", "t4"]
+    assert results[0]["output"]["content"] == "before"
+    assert results[3]["output"]["content"] == "after"
+    sent = server.requests[1]["messages"][-1]["content"]
+    assert [block["tool_use_id"] for block in sent] == ["t1", "t2", "t3", "t4"]
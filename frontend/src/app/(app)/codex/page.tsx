@@ -350,8 +350,25 @@ function CodexPageContent() {
       return;
     }
 
-    const data = await r.json();
-    setSelectedWorkspaceId(data.workspace_id);
+    // The backend queues the clone and returns an import job; poll it until it finishes
+    let job = await r.json();
+    while (job.status === "queued" || job.status === "running") {
+      setStatus(`importing${job.message ? `: ${job.message}` : ""}`);
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const jr = await fetch(`/api/workspaces/import-jobs/${job.job_id}`);
+      if (!jr.ok) {
+        setStatus(`error: ${await jr.text()}`);
+        return;
+      }
+      job = await jr.json();
+    }
+
+    if (job.status !== "completed") {
+      setStatus(`error: ${job.error || `import ${job.status}`}`);
+      return;
+    }
+
+    setSelectedWorkspaceId(job.workspace_id);
     setShowImportForm(false);
     setRepoUrl("");
     setStatus("idle");
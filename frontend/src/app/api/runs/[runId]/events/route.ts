@@ -3,12 +3,19 @@ export const dynamic = "force-dynamic";
 
 const BACKEND_URL = process.env.BACKEND_URL || "http://backend:8080";
 
-export async function GET(_req: Request, ctx: { params: { runId: string } }) {
+export async function GET(req: Request, ctx: { params: { runId: string } }) {
+  const headers: Record<string, string> = {
+    Accept: "text/event-stream"
+  };
+  // Forward EventSource reconnect position so the backend only replays missed events
+  const lastEventId = req.headers.get("last-event-id");
+  if (lastEventId) {
+    headers["Last-Event-ID"] = lastEventId;
+  }
+
   const upstream = await fetch(`${BACKEND_URL}/api/runs/${ctx.params.runId}/events`, {
     method: "GET",
-    headers: {
-      Accept: "text/event-stream"
-    }
+    headers
   });
 
   const contentType = upstream.headers.get("content-type") || "text/event-stream";